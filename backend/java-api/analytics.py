@@ -0,0 +1,383 @@
+"""
+ANUFA AI E-commerce Platform - User behavior analytics
+Rollup tables kept current by triggers on users, orders, order_items and cart
+"""
+
+from schema_indexes import index_sql
+
+ROLLUP_TABLES = ('analytics_totals', 'user_stats', 'user_category_stats', 'category_stats', 'last_order_days')
+
+# Category id used for products without a category (or deleted since the sale)
+UNCATEGORIZED = 0
+
+TOP_CATEGORIES = 5
+
+ROLLUP_SCHEMA = [
+    # Platform-wide counters (single row)
+    '''
+    CREATE TABLE IF NOT EXISTS analytics_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_users INTEGER NOT NULL DEFAULT 0,
+        buyers INTEGER NOT NULL DEFAULT 0,
+        total_orders INTEGER NOT NULL DEFAULT 0,
+        total_revenue REAL NOT NULL DEFAULT 0,
+        items_sold INTEGER NOT NULL DEFAULT 0,
+        item_revenue REAL NOT NULL DEFAULT 0,
+        recommended_items_sold INTEGER NOT NULL DEFAULT 0,
+        recommended_revenue REAL NOT NULL DEFAULT 0
+    )
+    ''',
+
+    # Per-user spend, recency and cart size
+    '''
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER PRIMARY KEY,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        total_spent REAL NOT NULL DEFAULT 0,
+        last_order_at TIMESTAMP,
+        cart_quantity INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+
+    # Per-user category affinity
+    '''
+    CREATE TABLE IF NOT EXISTS user_category_stats (
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        items INTEGER NOT NULL DEFAULT 0,
+        spent REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, category_id)
+    ) WITHOUT ROWID
+    ''',
+
+    '''
+    CREATE TABLE IF NOT EXISTS category_stats (
+        category_id INTEGER PRIMARY KEY,
+        items_sold INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    index_sql('idx_category_stats_revenue'),
+
+    # Users by the day of their latest order; recency buckets sum a few of these rows
+    '''
+    CREATE TABLE IF NOT EXISTS last_order_days (
+        day TEXT PRIMARY KEY,
+        users INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+
+    # Lookups the triggers below run on every write
+    index_sql('idx_orders_user'),
+    index_sql('idx_ai_recommendations_user_product'),
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_users_insert AFTER INSERT ON users BEGIN
+        UPDATE analytics_totals SET total_users = total_users + 1;
+        INSERT OR IGNORE INTO user_stats (user_id) VALUES (new.id);
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_users_delete AFTER DELETE ON users BEGIN
+        UPDATE analytics_totals SET total_users = total_users - 1;
+    END
+    ''',
+
+    # The user's recency day is moved by taking it out before the update and
+    # adding the resulting day back afterwards
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_orders_insert AFTER INSERT ON orders BEGIN
+        UPDATE analytics_totals SET
+            total_orders = total_orders + 1,
+            total_revenue = total_revenue + new.total_amount,
+            buyers = buyers + NOT EXISTS (
+                SELECT 1 FROM user_stats WHERE user_id = new.user_id AND order_count > 0
+            );
+        UPDATE last_order_days SET users = users - 1
+        WHERE day = (SELECT date(last_order_at) FROM user_stats WHERE user_id = new.user_id);
+        INSERT INTO user_stats (user_id, order_count, total_spent, last_order_at)
+        VALUES (new.user_id, 1, new.total_amount, new.created_at)
+        ON CONFLICT (user_id) DO UPDATE SET
+            order_count = order_count + 1,
+            total_spent = total_spent + excluded.total_spent,
+            last_order_at = max(COALESCE(last_order_at, excluded.last_order_at), excluded.last_order_at);
+        INSERT INTO last_order_days (day, users)
+        SELECT date(last_order_at), 1 FROM user_stats WHERE user_id = new.user_id
+        ON CONFLICT (day) DO UPDATE SET users = users + 1;
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_orders_delete AFTER DELETE ON orders BEGIN
+        UPDATE last_order_days SET users = users - 1
+        WHERE day = (SELECT date(last_order_at) FROM user_stats WHERE user_id = old.user_id);
+        UPDATE user_stats SET
+            order_count = order_count - 1,
+            total_spent = total_spent - old.total_amount,
+            last_order_at = (SELECT MAX(created_at) FROM orders WHERE user_id = old.user_id)
+        WHERE user_id = old.user_id;
+        INSERT INTO last_order_days (day, users)
+        SELECT date(last_order_at), 1 FROM user_stats
+        WHERE user_id = old.user_id AND last_order_at IS NOT NULL
+        ON CONFLICT (day) DO UPDATE SET users = users + 1;
+        UPDATE analytics_totals SET
+            total_orders = total_orders - 1,
+            total_revenue = total_revenue - old.total_amount,
+            buyers = buyers - EXISTS (
+                SELECT 1 FROM user_stats WHERE user_id = old.user_id AND order_count = 0
+            );
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_orders_amount AFTER UPDATE OF total_amount ON orders BEGIN
+        UPDATE analytics_totals SET total_revenue = total_revenue - old.total_amount + new.total_amount;
+        UPDATE user_stats SET total_spent = total_spent - old.total_amount + new.total_amount
+        WHERE user_id = new.user_id;
+    END
+    ''',
+
+    f'''
+    CREATE TRIGGER IF NOT EXISTS analytics_order_items_insert AFTER INSERT ON order_items BEGIN
+        INSERT INTO category_stats (category_id, items_sold, revenue)
+        VALUES (
+            COALESCE((SELECT category_id FROM products WHERE id = new.product_id), {UNCATEGORIZED}),
+            new.quantity, new.quantity * new.price
+        )
+        ON CONFLICT (category_id) DO UPDATE SET
+            items_sold = items_sold + excluded.items_sold,
+            revenue = revenue + excluded.revenue;
+        INSERT INTO user_category_stats (user_id, category_id, items, spent)
+        SELECT o.user_id,
+               COALESCE((SELECT category_id FROM products WHERE id = new.product_id), {UNCATEGORIZED}),
+               new.quantity, new.quantity * new.price
+        FROM orders o WHERE o.id = new.order_id
+        ON CONFLICT (user_id, category_id) DO UPDATE SET
+            items = items + excluded.items,
+            spent = spent + excluded.spent;
+        UPDATE analytics_totals SET
+            items_sold = items_sold + new.quantity,
+            item_revenue = item_revenue + new.quantity * new.price,
+            recommended_items_sold = recommended_items_sold + new.quantity * r.hit,
+            recommended_revenue = recommended_revenue + new.quantity * new.price * r.hit
+        FROM (
+            SELECT EXISTS (
+                SELECT 1 FROM ai_recommendations
+                WHERE product_id = new.product_id
+                  AND user_id = (SELECT user_id FROM orders WHERE id = new.order_id)
+            ) AS hit
+        ) AS r;
+    END
+    ''',
+
+    f'''
+    CREATE TRIGGER IF NOT EXISTS analytics_order_items_delete AFTER DELETE ON order_items BEGIN
+        UPDATE category_stats SET
+            items_sold = items_sold - old.quantity,
+            revenue = revenue - old.quantity * old.price
+        WHERE category_id = COALESCE((SELECT category_id FROM products WHERE id = old.product_id), {UNCATEGORIZED});
+        UPDATE user_category_stats SET
+            items = items - old.quantity,
+            spent = spent - old.quantity * old.price
+        WHERE user_id = (SELECT user_id FROM orders WHERE id = old.order_id)
+          AND category_id = COALESCE((SELECT category_id FROM products WHERE id = old.product_id), {UNCATEGORIZED});
+        UPDATE analytics_totals SET
+            items_sold = items_sold - old.quantity,
+            item_revenue = item_revenue - old.quantity * old.price,
+            recommended_items_sold = recommended_items_sold - old.quantity * r.hit,
+            recommended_revenue = recommended_revenue - old.quantity * old.price * r.hit
+        FROM (
+            SELECT EXISTS (
+                SELECT 1 FROM ai_recommendations
+                WHERE product_id = old.product_id
+                  AND user_id = (SELECT user_id FROM orders WHERE id = old.order_id)
+            ) AS hit
+        ) AS r;
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_cart_insert AFTER INSERT ON cart BEGIN
+        INSERT INTO user_stats (user_id, cart_quantity) VALUES (new.user_id, new.quantity)
+        ON CONFLICT (user_id) DO UPDATE SET cart_quantity = cart_quantity + excluded.cart_quantity;
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_cart_update AFTER UPDATE OF user_id, quantity ON cart BEGIN
+        UPDATE user_stats SET cart_quantity = cart_quantity - old.quantity WHERE user_id = old.user_id;
+        UPDATE user_stats SET cart_quantity = cart_quantity + new.quantity WHERE user_id = new.user_id;
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS analytics_cart_delete AFTER DELETE ON cart BEGIN
+        UPDATE user_stats SET cart_quantity = cart_quantity - old.quantity WHERE user_id = old.user_id;
+    END
+    ''',
+]
+
+BACKFILL_SQL = [
+    *[f'DELETE FROM {table}' for table in ROLLUP_TABLES],
+
+    '''
+    INSERT INTO user_stats (user_id, order_count, total_spent, last_order_at)
+    SELECT user_id, COUNT(*), SUM(total_amount), MAX(created_at) FROM orders GROUP BY user_id
+    ''',
+    '''
+    INSERT INTO user_stats (user_id, cart_quantity)
+    SELECT user_id, SUM(quantity) FROM cart GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET cart_quantity = excluded.cart_quantity
+    ''',
+    'INSERT OR IGNORE INTO user_stats (user_id) SELECT id FROM users',
+
+    '''
+    INSERT INTO last_order_days (day, users)
+    SELECT date(last_order_at), COUNT(*) FROM user_stats
+    WHERE last_order_at IS NOT NULL
+    GROUP BY date(last_order_at)
+    ''',
+
+    f'''
+    INSERT INTO category_stats (category_id, items_sold, revenue)
+    SELECT COALESCE(p.category_id, {UNCATEGORIZED}), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+    FROM order_items oi
+    LEFT JOIN products p ON p.id = oi.product_id
+    GROUP BY COALESCE(p.category_id, {UNCATEGORIZED})
+    ''',
+
+    f'''
+    INSERT INTO user_category_stats (user_id, category_id, items, spent)
+    SELECT o.user_id, COALESCE(p.category_id, {UNCATEGORIZED}), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+    FROM order_items oi
+    JOIN orders o ON o.id = oi.order_id
+    LEFT JOIN products p ON p.id = oi.product_id
+    GROUP BY o.user_id, COALESCE(p.category_id, {UNCATEGORIZED})
+    ''',
+
+    '''
+    INSERT INTO analytics_totals (
+        id, total_users, buyers, total_orders, total_revenue,
+        items_sold, item_revenue, recommended_items_sold, recommended_revenue
+    )
+    SELECT 1,
+           (SELECT COUNT(*) FROM users),
+           (SELECT COUNT(*) FROM user_stats WHERE order_count > 0),
+           (SELECT COUNT(*) FROM orders),
+           (SELECT COALESCE(SUM(total_amount), 0) FROM orders),
+           COALESCE(SUM(oi.quantity), 0),
+           COALESCE(SUM(oi.quantity * oi.price), 0),
+           COALESCE(SUM(oi.quantity * COALESCE(r.hit, 0)), 0),
+           COALESCE(SUM(oi.quantity * oi.price * COALESCE(r.hit, 0)), 0)
+    FROM order_items oi
+    LEFT JOIN orders o ON o.id = oi.order_id
+    LEFT JOIN (SELECT DISTINCT user_id, product_id, 1 AS hit FROM ai_recommendations) r
+        ON r.user_id = o.user_id AND r.product_id = oi.product_id
+    ''',
+]
+
+
+def ensure_rollups(conn):
+    """Create the rollup tables and triggers, then backfill them from existing rows"""
+    for statement in ROLLUP_SCHEMA:
+        conn.execute(statement)
+    rebuild_rollups(conn)
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup from users, orders, order_items and cart.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    for statement in BACKFILL_SQL:
+        conn.execute(statement)
+
+
+def _percent(part, whole):
+    return f'{part / whole * 100:.1f}%' if whole else '0.0%'
+
+
+def behavior_summary(conn, user_id=None):
+    """Analytics payload built from rollup rows only.
+
+    Revenue figures and the caller's own details are only included when
+    user_id (an authenticated caller) is given.
+    """
+    totals = conn.execute('''
+        SELECT total_users, buyers, total_orders, total_revenue,
+               items_sold, item_revenue, recommended_items_sold, recommended_revenue
+        FROM analytics_totals WHERE id = 1
+    ''').fetchone() or (0,) * 8
+    (total_users, buyers, total_orders, total_revenue,
+     items_sold, item_revenue, recommended_items_sold, recommended_revenue) = totals
+
+    recent_7, recent_30, recent_90, older = conn.execute('''
+        SELECT COALESCE(SUM(CASE WHEN day >= date('now', '-7 days') THEN users END), 0),
+               COALESCE(SUM(CASE WHEN day < date('now', '-7 days') AND day >= date('now', '-30 days') THEN users END), 0),
+               COALESCE(SUM(CASE WHEN day < date('now', '-30 days') AND day >= date('now', '-90 days') THEN users END), 0),
+               COALESCE(SUM(CASE WHEN day < date('now', '-90 days') THEN users END), 0)
+        FROM last_order_days
+    ''').fetchone()
+
+    top_categories = [
+        {'category_id': category_id, 'name': name, 'items_sold': items, 'revenue': round(revenue, 2)}
+        if user_id else {'category_id': category_id, 'name': name, 'items_sold': items}
+        for category_id, name, items, revenue in conn.execute('''
+            SELECT cs.category_id, COALESCE(c.name, 'Uncategorized'), cs.items_sold, cs.revenue
+            FROM category_stats cs
+            LEFT JOIN categories c ON c.id = cs.category_id
+            WHERE cs.items_sold > 0
+            ORDER BY cs.revenue DESC
+            LIMIT ?
+        ''', (TOP_CATEGORIES,)).fetchall()
+    ]
+
+    summary = {
+        'user_behavior': {
+            'total_users': total_users,
+            'buyers': buyers,
+            'total_orders': total_orders,
+            'items_sold': items_sold,
+            'recency': {
+                'last_7_days': recent_7,
+                'last_30_days': recent_30,
+                'last_90_days': recent_90,
+                'older': older,
+                'never_ordered': max(total_users - buyers, 0),
+            },
+            'top_categories': top_categories,
+        },
+        'ai_insights': {
+            # Items sold to a buyer who had been recommended that product (ai_recommendations)
+            'recommended_items_share': _percent(recommended_items_sold, items_sold),
+            'conversion_rate': _percent(buyers, total_users),
+        },
+    }
+
+    if user_id:
+        summary['user_behavior']['total_revenue'] = round(total_revenue, 2)
+        summary['user_behavior']['avg_order_value'] = round(total_revenue / total_orders, 2) if total_orders else 0.0
+        summary['ai_insights']['recommended_revenue_share'] = _percent(recommended_revenue, item_revenue)
+        row = conn.execute(
+            'SELECT order_count, total_spent, last_order_at, cart_quantity FROM user_stats WHERE user_id = ?',
+            (user_id,)
+        ).fetchone() or (0, 0.0, None, 0)
+        summary['user'] = {
+            'order_count': row[0],
+            'total_spent': round(row[1], 2),
+            'last_order_at': row[2],
+            'cart_quantity': row[3],
+            'category_affinity': [
+                {'category_id': category_id, 'name': name, 'items': items, 'spent': round(spent, 2)}
+                for category_id, name, items, spent in conn.execute('''
+                    SELECT ucs.category_id, COALESCE(c.name, 'Uncategorized'), ucs.items, ucs.spent
+                    FROM user_category_stats ucs
+                    LEFT JOIN categories c ON c.id = ucs.category_id
+                    WHERE ucs.user_id = ? AND ucs.items > 0
+                    ORDER BY ucs.spent DESC
+                    LIMIT ?
+                ''', (user_id, TOP_CATEGORIES)).fetchall()
+            ],
+        }
+    return summary
@@ -1,12 +1,33 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 import sqlite3
-import hashlib
-import jwt
 import datetime
+import json
 import os
+from db_pool import ConnectionPool, is_busy_error
+import search_index
+import pagination
+import catalog_cache
+import migrations
+import sample_data
+import cart
+import orders
+import recommendations
+import analytics
+import similar_products
+import product_filters
+import suggest
+import catalog_snapshot
+import write_queue
+import passwords
+import auth
+import metrics
+from single_flight import SingleFlight
+from serializers import PRODUCT, CATEGORY, envelope, json_rows, json_text
 
 app = Flask(__name__)
+# jsonify() bodies are timed as serialization
+app.json = metrics.JSONProvider(app)
 CORS(app)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'anufa-secret-key-2024')
 
@@ -15,103 +36,93 @@ DATABASE = 'ecommerce.db'
 
 def init_db():
     conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            price REAL NOT NULL,
-            category_id INTEGER,
-            sku TEXT UNIQUE NOT NULL,
-            stock_quantity INTEGER DEFAULT 0,
-            is_featured INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (category_id) REFERENCES categories (id)
-        )
-    ''')
-
-    # Insert sample data
-    categories = [
-        (1, 'Electronics', 'Electronic devices and gadgets'),
-        (2, 'Clothing', 'Fashion and apparel'),
-        (3, 'Books', 'Books and educational materials'),
-        (4, 'Home & Garden', 'Home improvement supplies'),
-        (5, 'Sports', 'Sports and fitness equipment')
-    ]
-    
-    cursor.executemany('INSERT OR IGNORE INTO categories (id, name, description) VALUES (?, ?, ?)', categories)
-    
-    products = [
-        (1, 'Smartphone Pro Max', 'Latest flagship smartphone', 999.99, 1, 'PHONE-001', 50, 1),
-        (2, 'Wireless Headphones', 'Premium noise-cancelling headphones', 299.99, 1, 'AUDIO-001', 25, 1),
-        (3, 'Ultra-Slim Laptop', 'High-performance laptop', 1299.99, 1, 'LAPTOP-001', 15, 1),
-        (4, 'Smart Watch', 'Advanced smartwatch', 399.99, 1, 'WATCH-001', 30, 0),
-        (5, 'Organic Cotton T-Shirt', 'Comfortable organic cotton t-shirt', 29.99, 2, 'SHIRT-001', 100, 0),
-        (6, 'Designer Jeans', 'Premium denim jeans', 89.99, 2, 'JEANS-001', 75, 0),
-        (7, 'Running Shoes Pro', 'Professional running shoes', 149.99, 2, 'SHOES-001', 60, 1),
-        (8, 'Programming Book', 'Learn modern programming', 49.99, 3, 'BOOK-001', 40, 0),
-        (9, 'AI Guide', 'Complete AI guide', 59.99, 3, 'BOOK-002', 35, 0),
-        (10, 'Garden Tools Set', 'Professional gardening tools', 129.99, 4, 'GARDEN-001', 20, 0)
-    ]
-    
-    cursor.executemany('''
-        INSERT OR IGNORE INTO products 
-        (id, name, description, price, category_id, sku, stock_quantity, is_featured) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', products)
-    
-    # Insert sample users
-    users = [
-        (1, 'johndoe', 'john@example.com', hashlib.sha256('password123'.encode()).hexdigest(), 'John', 'Doe'),
-        (2, 'janesmit', 'jane@example.com', hashlib.sha256('password123'.encode()).hexdigest(), 'Jane', 'Smith')
-    ]
-    
-    cursor.executemany('''
-        INSERT OR IGNORE INTO users 
-        (id, username, email, password_hash, first_name, last_name) 
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', users)
-    
-    conn.commit()
+    
+    # Warm start: a single PRAGMA user_version read when already up to date
+    applied = migrations.migrate(conn)
+    for description in applied:
+        print(f"Applied migration: {description}")
+    
+    # Sample data is opt-in (or use `python database_setup.py init`)
+    if os.environ.get('SEED_SAMPLE_DATA', '').lower() in ('1', 'true', 'yes'):
+        sample_data.insert_sample_data(conn)
+        print("Sample data loaded")
+    
     conn.close()
-    print("Database initialized successfully!")
 
 # Initialize database on startup
 init_db()
 
+# Per-worker pool of tuned connections (WAL, mmap, statement cache)
+pool = ConnectionPool(DATABASE)
+
+# Bearer tokens: rotating signing keys (JWT_KEYS_FILE) and a cache of verified tokens
+tokens = auth.TokenVerifier(auth.KeyRing(app.config['SECRET_KEY']))
+require_auth = tokens.required
+
+# Password KDF runs on its own bounded pool so login storms cannot starve catalog reads
+hasher = passwords.Hasher()
+
+# Optional group commit: one writer thread batches write transactions (WRITE_QUEUE=1)
+if write_queue.ENABLED:
+    pool.write_queue = write_queue.WriteQueue(pool)
+
+# Identical concurrent requests share one query (cache misses, search)
+flights = SingleFlight()
+
+# Catalog responses cached until products/categories change
+catalog = catalog_cache.CatalogCache(catalog_cache.VersionTracker(DATABASE), flights=flights)
+
+# Per-product JSON, bounded separately from the response cache
+product_cache = catalog_cache.CatalogCache(catalog.tracker, max_entries=catalog_cache.PRODUCT_CACHE_SIZE)
+
+# Co-purchase neighbours, built on first use and refreshed as orders arrive
+recommender = recommendations.RecommendationEngine(connect=pool.acquire)
+
+# Content-based neighbours (hashed TF-IDF), refreshed from the product change log
+similarity = similar_products.SimilarityIndex(connect=pool.acquire)
+
+# Typeahead prefix index over product names, SKUs and categories
+suggestions = suggest.SuggestIndex()
+
+# Optional per-worker in-memory copy of the database for catalog reads (CATALOG_SNAPSHOT=1)
+snapshot = catalog_snapshot.CatalogSnapshot(DATABASE, pool, catalog.tracker) if catalog_snapshot.ENABLED else None
+
 def get_db():
-    return sqlite3.connect(DATABASE)
+    return pool.acquire()
+
+def get_read_db():
+    return snapshot.acquire() if snapshot is not None else pool.acquire()
+
+def json_body(body, status=200):
+    return Response(body, status=status, mimetype='application/json')
 
-def generate_token(user_id):
-    payload = {
-        'user_id': user_id,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
+@app.before_request
+def start_request_timer():
+    # Labelled by URL rule, so /products/1 and /products/2 share a series
+    metrics.start_request(request.url_rule.rule if request.url_rule is not None else 'unmatched')
+
+@app.after_request
+def record_request_time(response):
+    metrics.finish_request(request.method, response.status_code)
+    return response
+
+def component_stats():
+    """stats() of every per-worker component, shared by /actuator/health and /metrics"""
+    return {
+        'pool': pool.stats(),
+        'password_hashing': hasher.stats(),
+        'auth': tokens.stats(),
+        'write_queue': pool.write_queue.stats() if pool.write_queue is not None else {'enabled': False},
+        'cache': catalog.stats(),
+        'product_cache': product_cache.stats(),
+        'single_flight': flights.stats(),
+        'snapshot': snapshot.stats() if snapshot is not None else {'enabled': False},
+        'recommendations': recommender.stats(),
+        'similar_products': similarity.stats(),
+        'suggest': suggestions.stats(),
+        'asgi': app.extensions['asgi'].stats() if 'asgi' in app.extensions else None,
+        'slow_queries': metrics.slow_queries.stats()
     }
-    return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
 
 # API Routes
 @app.route('/actuator/health', methods=['GET'])
@@ -120,9 +131,14 @@ def health_check():
         'status': 'UP',
         'service': 'ecommerce-java-api',
         'timestamp': datetime.datetime.now().isoformat(),
-        'database': 'SQLite'
+        'database': 'SQLite',
+        **component_stats()
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(component_stats()), mimetype='text/plain; version=0.0.4')
+
 @app.route('/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -132,14 +148,25 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username and password required'}), 400
     
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, username, password_hash FROM users WHERE username = ?', (username,))
-    user = cursor.fetchone()
-    conn.close()
+    with get_db() as conn:
+        user = conn.execute('SELECT id, username, password_hash FROM users WHERE username = ?',
+                            (username,)).fetchone()
     
-    if user and user[2] == hashlib.sha256(password.encode()).hexdigest():
-        token = generate_token(user[0])
+    try:
+        matches, needs_rehash = hasher.verify(password, user[2] if user else None)
+        if matches and needs_rehash:
+            # Upgrade legacy SHA-256 (or outdated KDF parameters) now that we know the password
+            new_hash = hasher.hash(password)
+            pool.write_transaction(lambda conn: conn.execute(
+                'UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?',
+                (new_hash, user[0], user[2])
+            ))
+            hasher.record_rehash()
+    except passwords.HashingBusy:
+        return jsonify({'error': 'Too many login attempts in progress, please retry'}), 503
+    
+    if matches:
+        token = tokens.issue(user[0])
         return jsonify({
             'token': token,
             'user': {
@@ -162,138 +189,225 @@ def register():
     if not all([username, email, password, first_name, last_name]):
         return jsonify({'error': 'All fields required'}), 400
     
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('''
+        password_hash = hasher.hash(password)
+    except passwords.HashingBusy:
+        return jsonify({'error': 'Too many sign-ups in progress, please retry'}), 503
+    
+    def insert_user(conn):
+        cursor = conn.execute('''
             INSERT INTO users (username, email, password_hash, first_name, last_name)
             VALUES (?, ?, ?, ?, ?)
         ''', (username, email, password_hash, first_name, last_name))
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        token = generate_token(user_id)
-        return jsonify({
-            'message': 'User created successfully',
-            'token': token,
-            'user': {
-                'id': user_id,
-                'username': username
-            }
-        }), 201
-        
+        return cursor.lastrowid
+    
+    try:
+        user_id = pool.write_transaction(insert_user)
     except sqlite3.IntegrityError:
         return jsonify({'error': 'Username or email already exists'}), 409
+    except sqlite3.OperationalError as e:
+        if is_busy_error(e):
+            return jsonify({'error': 'Store is busy, please retry'}), 503
+        raise
+    
+    token = tokens.issue(user_id)
+    return jsonify({
+        'message': 'User created successfully',
+        'token': token,
+        'user': {
+            'id': user_id,
+            'username': username
+        }
+    }), 201
 
 @app.route('/products', methods=['GET'])
 def get_products():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT p.*, c.name as category_name 
-        FROM products p 
-        LEFT JOIN categories c ON p.category_id = c.id
-        WHERE p.stock_quantity > 0
-    ''')
-    products = cursor.fetchall()
-    conn.close()
+    try:
+        conditions, params, sort = product_filters.parse_listing_args(request.args)
+        scope = product_filters.cursor_scope(sort, conditions, params)
+        limit, after, stream = pagination.parse_page_args(
+            request.args, arity=product_filters.cursor_arity(sort), default_limit=100, scope=scope)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    product_list = []
-    for product in products:
-        product_list.append({
-            'id': product[0],
-            'name': product[1],
-            'description': product[2],
-            'price': product[3],
-            'category_id': product[4],
-            'sku': product[5],
-            'stock_quantity': product[6],
-            'is_featured': bool(product[7]),
-            'category_name': product[9] if len(product) > 9 else None
-        })
+    sql, sql_params = product_filters.listing_sql(PRODUCT.json_column, conditions, params, sort, after)
+    
+    if stream:
+        conn = get_read_db()
+        try:
+            cursor = conn.execute(sql, sql_params)
+        except BaseException:
+            conn.close()
+            raise
+        # The stream owns the connection from here and closes it when done
+        return pagination.stream_response(conn, cursor, json_text, 'products', stream)
     
-    return jsonify({'products': product_list})
+    def load():
+        with get_read_db() as conn:
+            products = conn.execute(sql + ' LIMIT ?', sql_params + [limit + 1]).fetchall()
+            facets = product_filters.facet_counts(conn)
+        
+        page = products[:limit]
+        next_cursor = None
+        if len(products) > limit:
+            next_cursor = pagination.encode_cursor(
+                *product_filters.next_cursor_values(sort, page[-1]), scope=scope)
+        return envelope('products', json_rows(page), next_cursor=next_cursor, limit=limit, facets=facets)
+    
+    cache_key = ('products', sort, tuple(conditions), tuple(params), limit, after)
+    return catalog.get_prepared(cache_key, load).to_response(request)
+
+# Ids per IN (...) lookup, well under SQLite's bound-parameter limit
+PRODUCT_LOOKUP_CHUNK = 500
+MAX_BATCH_IDS = 500
+
+def product_json(product_ids):
+    """{product_id: JSON text or None}, served from per-product cache entries where possible"""
+    def load(keys):
+        ids = [product_id for _, product_id in keys]
+        found = {}
+        conn = get_read_db()
+        try:
+            for start in range(0, len(ids), PRODUCT_LOOKUP_CHUNK):
+                chunk = ids[start:start + PRODUCT_LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                for row_json, product_id in conn.execute(f'''
+                    SELECT {PRODUCT.json_column}, p.id
+                    FROM products p 
+                    LEFT JOIN categories c ON p.category_id = c.id
+                    WHERE p.id IN ({placeholders})
+                ''', chunk).fetchall():
+                    found[('product_json', product_id)] = row_json
+        finally:
+            conn.close()
+        return found
+    
+    values = product_cache.get_many([('product_json', product_id) for product_id in product_ids], load)
+    return {product_id: values[('product_json', product_id)] for product_id in product_ids}
 
 @app.route('/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT p.*, c.name as category_name 
-        FROM products p 
-        LEFT JOIN categories c ON p.category_id = c.id
-        WHERE p.id = ?
-    ''', (product_id,))
-    product = cursor.fetchone()
-    conn.close()
+    # Ids SQLite cannot bind cannot name a product
+    if not pagination.is_sql_value(product_id):
+        return jsonify({'error': 'Product not found'}), 404
+    
+    def load():
+        product = product_json([product_id])[product_id]
+        if product is None:
+            return {'error': 'Product not found'}, 404
+        return ('{"product":' + product + '}').encode()
+    
+    return catalog.get_prepared(('product', product_id), load).to_response(request)
+
+@app.route('/products/batch', methods=['GET', 'POST'])
+def get_products_batch():
+    if request.method == 'POST':
+        raw_ids = (request.get_json(silent=True) or {}).get('ids')
+        if not isinstance(raw_ids, list):
+            return jsonify({'error': 'ids must be a list'}), 400
+    else:
+        # ids=1,2,3 or ids=1&ids=2
+        raw_ids = [part for value in request.args.getlist('ids') for part in value.split(',') if part.strip()]
+    
+    try:
+        # Request order, first occurrence of each id
+        product_ids = list(dict.fromkeys(map(pagination.parse_int64, raw_ids)))
+    except ValueError:
+        return jsonify({'error': 'ids must be 64-bit integers'}), 400
+    if not product_ids:
+        return jsonify({'error': 'ids required'}), 400
+    if len(product_ids) > MAX_BATCH_IDS:
+        return jsonify({'error': f'At most {MAX_BATCH_IDS} ids per request'}), 400
+    
+    products = product_json(product_ids)
+    found = [products[product_id] for product_id in product_ids if products[product_id] is not None]
+    missing = [product_id for product_id in product_ids if products[product_id] is None]
+    return json_body(envelope('products', ','.join(found), missing=missing))
+
+@app.route('/products/<int:product_id>/similar', methods=['GET'])
+def get_similar_products(product_id):
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), similarity.k))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     
-    if not product:
+    # Ids SQLite cannot bind cannot name a product
+    if not pagination.is_sql_value(product_id):
         return jsonify({'error': 'Product not found'}), 404
     
-    return jsonify({
-        'product': {
-            'id': product[0],
-            'name': product[1],
-            'description': product[2],
-            'price': product[3],
-            'category_id': product[4],
-            'sku': product[5],
-            'stock_quantity': product[6],
-            'is_featured': bool(product[7]),
-            'category_name': product[9] if len(product) > 9 else None
-        }
-    })
+    similarity.ensure_fresh()
+    conn = get_db()
+    try:
+        # The index lags behind deletes until its next refresh
+        if not conn.execute('SELECT 1 FROM products WHERE id = ?', (product_id,)).fetchone():
+            return jsonify({'error': 'Product not found'}), 404
+        # None: added since the last refresh
+        neighbours = similarity.similar(product_id, limit) or []
+        
+        products = {}
+        if neighbours:
+            placeholders = ','.join('?' * len(neighbours))
+            cursor = conn.execute(f'''
+                SELECT {PRODUCT.select_list}
+                FROM products p 
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE p.id IN ({placeholders})
+            ''', [neighbour_id for neighbour_id, _ in neighbours])
+            products = {row[0]: PRODUCT.to_dict(row) for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    
+    similar = []
+    for neighbour_id, score in neighbours:
+        product = products.get(neighbour_id)
+        if product:
+            product['similarity_score'] = score
+            similar.append(product)
+    return jsonify({'product_id': product_id, 'similar_products': similar})
 
 @app.route('/categories', methods=['GET'])
 def get_categories():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM categories')
-    categories = cursor.fetchall()
-    conn.close()
-    
-    category_list = []
-    for category in categories:
-        category_list.append({
-            'id': category[0],
-            'name': category[1],
-            'description': category[2]
-        })
+    def load():
+        with get_read_db() as conn:
+            categories = conn.execute(f'SELECT {CATEGORY.json_column} FROM categories').fetchall()
+        return envelope('categories', json_rows(categories))
     
-    return jsonify({'categories': category_list})
+    return catalog.get_prepared(('categories',), load, depends=('categories',)).to_response(request)
 
 @app.route('/products/featured', methods=['GET'])
 def get_featured_products():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT p.*, c.name as category_name 
+    try:
+        limit, after, stream = pagination.parse_page_args(request.args, arity=1, default_limit=10)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    sql = f'''
+        SELECT {PRODUCT.json_column}, p.id
         FROM products p 
         LEFT JOIN categories c ON p.category_id = c.id
-        WHERE p.is_featured = 1 AND p.stock_quantity > 0
-        LIMIT 10
-    ''')
-    products = cursor.fetchall()
-    conn.close()
+        WHERE p.is_featured = 1 AND p.stock_quantity > 0 AND p.id > ?
+        ORDER BY p.id
+    '''
+    after_id = after[0] if after else 0
     
-    product_list = []
-    for product in products:
-        product_list.append({
-            'id': product[0],
-            'name': product[1],
-            'description': product[2],
-            'price': product[3],
-            'category_id': product[4],
-            'sku': product[5],
-            'stock_quantity': product[6],
-            'is_featured': bool(product[7]),
-            'category_name': product[9] if len(product) > 9 else None
-        })
+    if stream:
+        conn = get_read_db()
+        try:
+            cursor = conn.execute(sql, (after_id,))
+        except BaseException:
+            conn.close()
+            raise
+        return pagination.stream_response(conn, cursor, json_text, 'featured_products', stream)
+    
+    def load():
+        with get_read_db() as conn:
+            products = conn.execute(sql + ' LIMIT ?', (after_id, limit + 1)).fetchall()
+        
+        page = products[:limit]
+        next_cursor = pagination.encode_cursor(page[-1][1]) if len(products) > limit else None
+        return envelope('featured_products', json_rows(page), next_cursor=next_cursor, limit=limit)
     
-    return jsonify({'featured_products': product_list})
+    return catalog.get_prepared(('featured', limit, after_id), load).to_response(request)
 
 @app.route('/search', methods=['GET'])
 def search_products():
@@ -301,33 +415,255 @@ def search_products():
     if not query:
         return jsonify({'products': []})
     
+    try:
+        limit, after, stream = pagination.parse_page_args(request.args, arity=2, default_limit=20, max_limit=100)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    in_stock = request.args.get('in_stock', 'true').lower() not in ('0', 'false', 'no')
+    
+    if stream:
+        conn = get_read_db()
+        try:
+            cursor = search_index.search_products(conn, query, after=after, in_stock=in_stock)
+        except BaseException:
+            conn.close()
+            raise
+        if cursor is not None:
+            return pagination.stream_response(conn, cursor, json_text, 'products', stream)
+        conn.close()
+        return jsonify({'products': [], 'query': query})
+    
+    def load():
+        with get_read_db() as conn:
+            # Fetch one extra row to know whether another page exists
+            cursor = search_index.search_products(conn, query, limit=limit + 1, after=after, in_stock=in_stock)
+            products = cursor.fetchall() if cursor is not None else []
+        
+        page = products[:limit]
+        next_cursor = None
+        if len(products) > limit:
+            next_cursor = pagination.encode_cursor(page[-1][2], page[-1][1])
+        return envelope('products', json_rows(page), query=query, next_cursor=next_cursor, limit=limit)
+    
+    # Not cached: callers that arrive while the same search runs share its result
+    key = (query, limit, tuple(after) if after else None, in_stock)
+    return json_body(flights.do('search', key, load))
+
+@app.route('/search/suggest', methods=['GET'])
+def suggest_completions():
+    query = request.args.get('q', '')
+    try:
+        limit = max(1, min(int(request.args.get('limit', 8)), suggest.MAX_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT p.*, c.name as category_name 
-        FROM products p 
-        LEFT JOIN categories c ON p.category_id = c.id
-        WHERE p.name LIKE ? OR p.description LIKE ?
-        AND p.stock_quantity > 0
-    ''', (f'%{query}%', f'%{query}%'))
-    products = cursor.fetchall()
-    conn.close()
+    try:
+        suggestions.ensure_fresh(conn)
+    finally:
+        conn.close()
+    return jsonify({'query': query, 'suggestions': suggestions.suggest(query, limit)})
+
+@app.route('/cart', methods=['GET'])
+@require_auth
+def get_cart():
+    user_id = g.user_id
     
-    product_list = []
-    for product in products:
-        product_list.append({
-            'id': product[0],
-            'name': product[1],
-            'description': product[2],
-            'price': product[3],
-            'category_id': product[4],
-            'sku': product[5],
-            'stock_quantity': product[6],
-            'is_featured': bool(product[7]),
-            'category_name': product[9] if len(product) > 9 else None
-        })
+    with get_db() as conn:
+        body = cart.get_cart(conn, user_id)
+    
+    return json_body(body)
+
+@app.route('/cart/add', methods=['POST'])
+@require_auth
+def add_to_cart():
+    user_id = g.user_id
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        product_id = pagination.parse_int64(data.get('product_id'))
+        quantity = pagination.parse_int64(data.get('quantity', 1))
+    except ValueError:
+        return jsonify({'error': 'product_id and quantity must be 64-bit integers'}), 400
     
-    return jsonify({'products': product_list, 'query': query})
+    try:
+        line = pool.write_transaction(lambda conn: cart.add_item(conn, user_id, product_id, quantity))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except sqlite3.OperationalError as e:
+        if is_busy_error(e):
+            return jsonify({'error': 'Store is busy, please retry'}), 503
+        raise
+    if line is None:
+        return jsonify({'error': 'Product not found'}), 404
+    
+    cart_id, new_quantity = line
+    return jsonify({
+        'message': 'Item added to cart' if new_quantity else 'Item removed from cart',
+        'cart_item': {
+            'id': cart_id,
+            'product_id': product_id,
+            'quantity': new_quantity
+        }
+    })
+
+@app.route('/cart', methods=['PUT'])
+@require_auth
+def update_cart():
+    user_id = g.user_id
+    
+    data = request.get_json(silent=True) or {}
+    lines = data.get('items')
+    if not isinstance(lines, list) or not lines:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    
+    items = {}
+    try:
+        for line in lines:
+            product_id = pagination.parse_int64(line['product_id'])
+            quantity = pagination.parse_int64(line['quantity'])
+            if not 0 <= quantity <= cart.MAX_LINE_QUANTITY:
+                return jsonify({'error': f'quantity must be between 0 and {cart.MAX_LINE_QUANTITY}'}), 400
+            items[product_id] = quantity
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each item needs integer product_id and quantity'}), 400
+    
+    # All line changes commit together
+    try:
+        missing = pool.write_transaction(lambda conn: cart.set_items(conn, user_id, items))
+    except sqlite3.OperationalError as e:
+        if is_busy_error(e):
+            return jsonify({'error': 'Store is busy, please retry'}), 503
+        raise
+    conn = get_db()
+    try:
+        body = cart.get_cart(conn, user_id)
+    finally:
+        conn.close()
+    
+    if missing:
+        body = body[:-1] + (',"missing_product_ids":' + json.dumps(missing) + '}').encode()
+    return json_body(body)
+
+@app.route('/cart/remove/<int:cart_id>', methods=['DELETE'])
+@require_auth
+def remove_from_cart(cart_id):
+    user_id = g.user_id
+    if not pagination.is_sql_value(cart_id):
+        return jsonify({'error': 'Cart item not found'}), 404
+    
+    try:
+        removed = pool.write_transaction(lambda conn: cart.remove_line(conn, user_id, cart_id))
+    except sqlite3.OperationalError as e:
+        if is_busy_error(e):
+            return jsonify({'error': 'Store is busy, please retry'}), 503
+        raise
+    if not removed:
+        return jsonify({'error': 'Cart item not found'}), 404
+    return jsonify({'message': 'Item removed from cart'})
+
+@app.route('/orders', methods=['POST'])
+@require_auth
+def create_order():
+    user_id = g.user_id
+    
+    data = request.get_json(silent=True) or {}
+    payment_method = data.get('payment_method') or data.get('paymentMethod')
+    shipping_address = data.get('shipping_address') or data.get('shippingAddress')
+    if not shipping_address:
+        return jsonify({'error': 'Shipping address required'}), 400
+    if not isinstance(shipping_address, str) or not isinstance(payment_method, (str, type(None))):
+        return jsonify({'error': 'shipping_address and payment_method must be strings'}), 400
+    
+    # One BEGIN IMMEDIATE transaction: stock decrements, order rows and cart cleanup
+    try:
+        order = pool.write_transaction(
+            lambda conn: orders.place_order(conn, user_id, payment_method, shipping_address)
+        )
+    except orders.EmptyCart:
+        return jsonify({'error': 'Cart is empty'}), 400
+    except orders.InsufficientStock as e:
+        return jsonify({'error': 'Insufficient stock', 'product_ids': e.product_ids}), 409
+    except sqlite3.OperationalError as e:
+        if is_busy_error(e):
+            return jsonify({'error': 'Store is busy, please retry'}), 503
+        raise
+    
+    return jsonify({'message': 'Order placed successfully', 'order': order}), 201
+
+@app.route('/ai/analytics/user-behavior', methods=['GET'])
+def get_user_behavior():
+    conn = get_db()
+    try:
+        summary = analytics.behavior_summary(conn, tokens.current_user_id())
+    finally:
+        conn.close()
+    return jsonify(summary)
+
+def recommendation_response(user_id, seed_ids, limit):
+    recommender.ensure_fresh()
+    conn = get_db()
+    try:
+        seeds = list(seed_ids)
+        if user_id:
+            seeds.extend(recommendations.user_seed_products(conn, user_id))
+        # Over-fetch a little so out-of-stock products can be dropped
+        ranked = recommender.recommend(seeds, limit=limit + 10)
+        
+        products = {}
+        if ranked:
+            placeholders = ','.join('?' * len(ranked))
+            cursor = conn.execute(f'''
+                SELECT {PRODUCT.select_list}
+                FROM products p 
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE p.id IN ({placeholders}) AND p.stock_quantity > 0
+            ''', [product_id for product_id, _, _ in ranked])
+            products = {row[0]: PRODUCT.to_dict(row) for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    
+    results = []
+    for product_id, score, reason in ranked:
+        product = products.get(product_id)
+        if product:
+            product['recommendation_score'] = score
+            product['reason'] = reason
+            results.append(product)
+            if len(results) >= limit:
+                break
+    return jsonify({'recommendations': results})
+
+def recommendation_limit(value, default):
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, 50))
+
+@app.route('/recommendations', methods=['POST'])
+def post_recommendations():
+    data = request.get_json(silent=True) or {}
+    try:
+        limit = recommendation_limit(data.get('limit'), 8)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    raw_ids = data.get('product_ids') or []
+    try:
+        if not isinstance(raw_ids, list):
+            raise ValueError
+        seed_ids = [pagination.parse_int64(product_id) for product_id in raw_ids]
+    except ValueError:
+        return jsonify({'error': 'product_ids must be a list of 64-bit integers'}), 400
+    return recommendation_response(tokens.current_user_id(), seed_ids, limit)
+
+@app.route('/ai/recommendations', methods=['GET'])
+def get_ai_recommendations():
+    try:
+        limit = recommendation_limit(request.args.get('limit'), 4)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return recommendation_response(tokens.current_user_id(), [], limit)
 
 if __name__ == '__main__':
     import os
@@ -0,0 +1,213 @@
+"""
+ANUFA AI E-commerce Platform - ASGI entry point
+Serves the same Flask routes from an event loop, running each request's blocking work on a bounded thread pool
+Run: uvicorn asgi:app --host 0.0.0.0 --port 8080 --workers 4
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import app_sqlite
+
+# Threads running Flask handlers (SQLite queries, password hashing waits) per worker
+THREADS = int(os.environ.get('ASGI_THREADS', 8))
+# Requests waiting for a thread beyond this get 503 instead of queueing without bound
+MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 4096))
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 10 * 1024 * 1024))
+
+
+class WsgiBridge:
+    """Minimal ASGI -> WSGI adapter (HTTP and lifespan only).
+
+    Connections are held by the event loop, so idle and waiting clients
+    cost no threads; only requests being handled occupy one of `threads`.
+    Response bodies are forwarded chunk by chunk, so streamed listings stay
+    streamed.
+    """
+
+    def __init__(self, wsgi_app, threads=THREADS, max_pending=MAX_PENDING):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix='asgi')
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self.max_waiting = 0
+        self.handled = 0
+        self.rejected = 0
+        self.disconnected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=True)
+                app_sqlite.pool.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if len(body) > MAX_BODY_BYTES:
+                await _plain(send, 413, b'Request body too large')
+                return
+            if not message.get('more_body'):
+                break
+
+        with self._lock:
+            if self._waiting >= self.max_pending:
+                self.rejected += 1
+                full = True
+            else:
+                self._waiting += 1
+                self.max_waiting = max(self.max_waiting, self._waiting)
+                full = False
+        if full:
+            await _plain(send, 503, b'Server busy, please retry')
+            return
+
+        loop = asyncio.get_running_loop()
+        environ = _environ(scope, bytes(body))
+        await loop.run_in_executor(self._executor, self._run, environ, loop, send)
+
+    def _run(self, environ, loop, send):
+        """Call the WSGI app on a pool thread, forwarding its output to the event loop"""
+        with self._lock:
+            self._waiting -= 1
+            self._active += 1
+        status_headers = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and status_headers and status_headers[0][2]:
+                raise exc_info[1].with_traceback(exc_info[2])
+            status_headers[:] = [(int(status.split(' ', 1)[0]), headers, False)]
+            return lambda data: None
+
+        def emit(body, more_body):
+            # One hop to the event loop per chunk; the first also carries the status line
+            messages = []
+            status, headers, started = status_headers[0]
+            if not started:
+                status_headers[0] = (status, headers, True)
+                messages.append({
+                    'type': 'http.response.start',
+                    'status': status,
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+                })
+            messages.append({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+            asyncio.run_coroutine_threadsafe(_send_all(send, messages), loop).result()
+
+        result = ()
+        try:
+            result = self.wsgi_app(environ, start_response)
+            # Hold one chunk back so a single-chunk body goes out in one message
+            pending = b''
+            for chunk in result:
+                if chunk:
+                    if pending:
+                        emit(pending, True)
+                    pending = chunk
+            emit(pending, False)
+        except OSError:
+            # The client went away mid-response; stop generating the rest
+            with self._lock:
+                self.disconnected += 1
+        except Exception:
+            if status_headers and status_headers[0][2]:
+                raise
+            status_headers[:] = [(500, [('Content-Type', 'text/plain')], False)]
+            emit(b'Internal Server Error', False)
+            raise
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+            with self._lock:
+                self._active -= 1
+                self.handled += 1
+
+    def stats(self):
+        """Thread pool occupancy for this worker"""
+        with self._lock:
+            return {
+                'threads': self.threads,
+                'active': self._active,
+                'waiting': self._waiting,
+                'max_waiting': self.max_waiting,
+                'max_pending': self.max_pending,
+                'handled': self.handled,
+                'rejected': self.rejected,
+                'disconnected': self.disconnected,
+            }
+
+
+def _environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    # WSGI carries the raw path bytes as latin-1 text
+    path = scope.get('raw_path') or scope['path'].encode('utf-8')
+    path = path.split(b'?', 1)[0].decode('latin-1')
+    root_path = scope.get('root_path', '')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path,
+        'PATH_INFO': path[len(root_path):] if root_path and path.startswith(root_path) else path,
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def _send_all(send, messages):
+    for message in messages:
+        await send(message)
+
+
+async def _plain(send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = WsgiBridge(app_sqlite.app)
+app_sqlite.app.extensions['asgi'] = app
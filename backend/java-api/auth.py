@@ -0,0 +1,208 @@
+"""
+ANUFA AI E-commerce Platform - Authentication
+HS256 bearer tokens with rotating signing keys and a bounded cache of verified tokens
+"""
+
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import g, jsonify, request
+
+TOKEN_LIFETIME = datetime.timedelta(hours=24)
+TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+# JSON file {"active": "<kid>", "keys": {"<kid>": "<secret>", ...}}; re-read when it changes
+KEYS_FILE = os.environ.get('JWT_KEYS_FILE')
+KEYS_CHECK_SECONDS = float(os.environ.get('JWT_KEYS_CHECK_SECONDS', 5))
+DEFAULT_KID = 'default'
+
+
+class KeyRing:
+    """Signing keys by id: new tokens use the active key, any listed key still verifies.
+
+    Rotation without a restart: add the new key to the keys file, make it
+    active, and drop the old one once its tokens have expired. Tokens issued
+    before key ids existed carry no kid and verify against the default key.
+
+    Readers take the current (active kid, keys) snapshot without locking; a
+    reload builds a new snapshot and replaces it in one assignment, and the
+    thread that checks the file does so without making others wait.
+    """
+
+    def __init__(self, default_secret, keys_file=KEYS_FILE, check_interval=KEYS_CHECK_SECONDS):
+        self.keys_file = keys_file
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = (DEFAULT_KID, {DEFAULT_KID: default_secret})
+        self._default_secret = default_secret
+        self._mtime = None
+        self._last_check = float('-inf')
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def _maybe_reload(self):
+        if not self.keys_file:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        # Whoever holds the lock is already checking; everyone else keeps the current keys
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            try:
+                mtime = os.stat(self.keys_file).st_mtime_ns
+                if mtime == self._mtime:
+                    return
+                # A broken file is reported once, not re-parsed until it changes again
+                self._mtime = mtime
+                with open(self.keys_file) as f:
+                    config = json.load(f)
+                keys = {str(kid): str(secret) for kid, secret in config['keys'].items()}
+                active = str(config['active'])
+                if active not in keys:
+                    raise ValueError(f'active key {active!r} is not listed')
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                # Keep serving with the last good keys rather than locking everyone out
+                self.reload_errors += 1
+                return
+            self._snapshot = (active, keys)
+            self.reloads += 1
+        finally:
+            self._lock.release()
+
+    def active(self):
+        """(kid, secret) for signing new tokens"""
+        self._maybe_reload()
+        active, keys = self._snapshot
+        return active, keys[active]
+
+    def secret(self, kid):
+        """Secret for a token's kid, or None when that key has been retired"""
+        self._maybe_reload()
+        return self._snapshot[1].get(kid or DEFAULT_KID)
+
+    def kids(self):
+        self._maybe_reload()
+        return sorted(self._snapshot[1])
+
+
+class TokenVerifier:
+    """Verifies bearer tokens, remembering successes in an LRU until each token's exp"""
+
+    def __init__(self, keyring, max_entries=TOKEN_CACHE_SIZE):
+        self.keyring = keyring
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.evictions = 0
+        self._time_total = 0.0
+        self._time_max = 0.0
+        self._timed = 0
+
+    def issue(self, user_id):
+        """Signed token for user_id, valid for TOKEN_LIFETIME"""
+        kid, secret = self.keyring.active()
+        payload = {
+            'user_id': user_id,
+            'exp': datetime.datetime.now(datetime.timezone.utc) + TOKEN_LIFETIME,
+        }
+        return jwt.encode(payload, secret, algorithm='HS256', headers={'kid': kid})
+
+    def verify(self, token):
+        """user_id for a valid token, else None"""
+        started = time.perf_counter()
+        try:
+            return self._verify(token)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._timed += 1
+                self._time_total += elapsed
+                self._time_max = max(self._time_max, elapsed)
+
+    def _verify(self, token):
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(token)
+        if entry is not None:
+            user_id, expires_at, kid, secret = entry
+            # A retired key, or a new secret under the same kid, invalidates its cached tokens as well.
+            # The key ring may stat its file, so it is consulted outside the cache lock.
+            valid = expires_at > now and self.keyring.secret(kid) == secret
+            with self._lock:
+                if valid:
+                    if token in self._cache:
+                        self._cache.move_to_end(token)
+                    self.hits += 1
+                    return user_id
+                self._cache.pop(token, None)
+        with self._lock:
+            self.misses += 1
+
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+            secret = self.keyring.secret(kid)
+            if secret is None:
+                raise jwt.InvalidTokenError(f'Unknown signing key {kid!r}')
+            payload = jwt.decode(token, secret, algorithms=['HS256'], options={'require': ['exp']})
+        except jwt.InvalidTokenError:
+            with self._lock:
+                self.failures += 1
+            return None
+
+        user_id = payload.get('user_id')
+        if user_id is None:
+            return None
+        with self._lock:
+            self._cache[token] = (user_id, payload['exp'], kid, secret)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return user_id
+
+    def current_user_id(self):
+        """user_id from the request's Authorization: Bearer header, or None"""
+        if 'user_id' not in g:
+            header = request.headers.get('Authorization', '')
+            g.user_id = self.verify(header[7:]) if header.startswith('Bearer ') else None
+        return g.user_id
+
+    def required(self, view):
+        """Decorator: answer 401 unless the request carries a valid token; sets g.user_id"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.current_user_id() is None:
+                return jsonify({'error': 'Authentication required'}), 401
+            return view(*args, **kwargs)
+        return wrapper
+
+    def stats(self):
+        """Cache counters and the time verification adds per authenticated request"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cached_tokens': len(self._cache),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'failures': self.failures,
+                'evictions': self.evictions,
+                'avg_verify_us': round(self._time_total / self._timed * 1e6, 2) if self._timed else 0.0,
+                'max_verify_us': round(self._time_max * 1e6, 2),
+                'signing_keys': self.keyring.kids(),
+                'key_reloads': self.keyring.reloads,
+                'key_reload_errors': self.keyring.reload_errors,
+            }
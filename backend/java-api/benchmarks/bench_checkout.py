@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Flash-sale checkout benchmark: many buyers in several processes race for one hot SKU
+Usage: python benchmarks/bench_checkout.py [--buyers 2000] [--stock 500] [--processes 4] [--threads 8]
+
+First checks that threads racing for the last few units never drive stock
+below zero and buy exactly the units left; exits 1 if not.
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOT_PRODUCT_ID = 1
+# Seconds to wait for a buyer process's results before giving up on it
+RESULT_TIMEOUT = 600
+# Units left when the last-units check starts
+LAST_UNITS = 3
+
+
+def load_app(db_dir):
+    # app_sqlite uses a database path relative to the working directory
+    os.chdir(db_dir)
+    sys.path.insert(0, API_DIR)
+    import app_sqlite
+    return app_sqlite
+
+
+def setup(db_dir, buyers, stock):
+    app_sqlite = load_app(db_dir)
+    conn = sqlite3.connect(app_sqlite.DATABASE)
+    conn.execute("INSERT INTO categories (id, name) VALUES (1, 'Flash Sale')")
+    conn.execute('''
+        INSERT INTO products (id, name, description, price, category_id, sku, stock_quantity, is_featured)
+        VALUES (?, 'Limited Edition Console', 'Flash sale item', 499.99, 1, 'HOT-001', ?, 1)
+    ''', (HOT_PRODUCT_ID, stock))
+    conn.executemany('INSERT INTO cart (user_id, product_id, quantity) VALUES (?, ?, 1)',
+                     [(user_id, HOT_PRODUCT_ID) for user_id in range(1, buyers + 1)])
+    conn.commit()
+    conn.close()
+
+
+def last_units_check(db_dir, buyers, units):
+    """buyers threads check out the last units of one product at once; asserts the stock accounting"""
+    setup(db_dir, buyers, units)
+    app_sqlite = load_app(db_dir)
+    client_app = app_sqlite.app
+    start = threading.Barrier(buyers)
+    done = threading.Event()
+    seen = []
+
+    def watch_stock():
+        conn = sqlite3.connect(app_sqlite.DATABASE)
+        query = 'SELECT stock_quantity FROM products WHERE id = ?'
+        while not done.is_set():
+            seen.append(conn.execute(query, (HOT_PRODUCT_ID,)).fetchone()[0])
+        seen.append(conn.execute(query, (HOT_PRODUCT_ID,)).fetchone()[0])
+        conn.close()
+
+    def checkout(user_id):
+        client = client_app.test_client()
+        headers = {'Authorization': f'Bearer {app_sqlite.tokens.issue(user_id)}'}
+        start.wait()
+        return client.post('/orders', json={'shipping_address': 'Check St'}, headers=headers).status_code
+
+    watcher = threading.Thread(target=watch_stock)
+    watcher.start()
+    with ThreadPoolExecutor(max_workers=buyers) as executor:
+        statuses = list(executor.map(checkout, range(1, buyers + 1)))
+    done.set()
+    watcher.join()
+
+    conn = sqlite3.connect(app_sqlite.DATABASE)
+    sold = conn.execute('SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE product_id = ?',
+                        (HOT_PRODUCT_ID,)).fetchone()[0]
+    conn.close()
+    assert min(seen) >= 0, f'stock went negative: {min(seen)}'
+    assert seen[-1] == 0, f'{seen[-1]} units left unsold'
+    assert sold == units, f'sold {sold} of {units} units'
+    assert statuses.count(201) == units, f'{statuses.count(201)} orders placed for {units} units'
+    assert set(statuses) <= {201, 409}, f'unexpected responses {sorted(set(statuses))}'
+    print(f"✅ Last units: {buyers} threads, {units} units, {statuses.count(201)} sold, "
+          f"{statuses.count(409)} refused, stock never below {min(seen)}")
+
+
+def buyer_process(db_dir, user_ids, threads, results, ready, go):
+    app_sqlite = load_app(db_dir)
+    client_app = app_sqlite.app
+    ready.release()
+    go.wait()
+
+    def checkout(user_id):
+        client = client_app.test_client()
+        headers = {'Authorization': f'Bearer {app_sqlite.tokens.issue(user_id)}'}
+        started = time.perf_counter()
+        response = client.post('/orders', json={'shipping_address': 'Benchmark St'}, headers=headers)
+        return response.status_code, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        outcomes = list(executor.map(checkout, user_ids))
+    results.put((outcomes, app_sqlite.pool.stats()['busy_retries']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--buyers', type=int, default=2000)
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    check_process = ctx.Process(target=last_units_check,
+                                args=(tempfile.mkdtemp(prefix='anufa-last-units-'), args.threads * 4, LAST_UNITS))
+    check_process.start()
+    check_process.join()
+    if check_process.exitcode != 0:
+        sys.exit('❌ Last-units check failed (see the traceback above)')
+
+    db_dir = tempfile.mkdtemp(prefix='anufa-checkout-')
+    setup_process = ctx.Process(target=setup, args=(db_dir, args.buyers, args.stock))
+    setup_process.start()
+    setup_process.join()
+
+    user_ids = list(range(1, args.buyers + 1))
+    results = ctx.Queue()
+    ready = ctx.Semaphore(0)
+    go = ctx.Event()
+    processes = [
+        ctx.Process(target=buyer_process,
+                    args=(db_dir, user_ids[i::args.processes], args.threads, results, ready, go))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    # Start the clock once every process has imported the app
+    for _ in processes:
+        ready.acquire()
+    started = time.perf_counter()
+    go.set()
+    try:
+        collected = [results.get(timeout=RESULT_TIMEOUT) for _ in processes]
+    except queue.Empty:
+        # A buyer process died (see its traceback above) or hung
+        for process in processes:
+            process.terminate()
+        sys.exit(f'❌ No results from a buyer process within {RESULT_TIMEOUT}s')
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    outcomes = [outcome for batch, _ in collected for outcome in batch]
+    busy_retries = sum(retries for _, retries in collected)
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(latency for _, latency in outcomes)
+
+    conn = sqlite3.connect(os.path.join(db_dir, 'ecommerce.db'))
+    final_stock = conn.execute('SELECT stock_quantity FROM products WHERE id = ?', (HOT_PRODUCT_ID,)).fetchone()[0]
+    sold = conn.execute('SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE product_id = ?',
+                        (HOT_PRODUCT_ID,)).fetchone()[0]
+    conn.close()
+    oversell = max(sold - args.stock, 0)
+
+    print(f"🛒 {args.buyers:,} buyers, {args.processes} processes x {args.threads} threads, stock {args.stock:,}")
+    print(f"  responses      {dict(sorted(statuses.items()))}")
+    print(f"  orders placed  {statuses.get(201, 0):,} in {elapsed:.2f}s "
+          f"({statuses.get(201, 0) / elapsed:,.0f} orders/s, {len(outcomes) / elapsed:,.0f} requests/s)")
+    print(f"  latency        p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"  busy retries   {busy_retries:,}")
+    print(f"  final stock    {final_stock:,} (sold {sold:,})")
+    print(f"  oversell       {oversell}")
+
+    if oversell or final_stock < 0 or sold + final_stock != args.stock or statuses.get(201, 0) != sold:
+        print("❌ Stock accounting is inconsistent")
+        sys.exit(1)
+    print("✅ No oversell")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Every API route against a synthetic database: throughput and p50/p95/p99 latency, saved as JSON and checked against a baseline
+Usage: python benchmarks/bench_endpoints.py [--data-dir DIR] [--products 10000] [--users 1000] [--order-items 30000]
+                                            [--url http://127.0.0.1:8080] [--threads 1] [--requests 200] [--repeat 3] [--only search]
+                                            [--output results.json] [--baseline baseline.json] [--tolerance 0.25]
+
+Without --url the routes run in-process through Flask's test client, against a
+fresh copy of the database each run, so write routes cannot skew later runs.
+With --url they are sent to a server already running on a copy of the same
+data (e.g. `cd COPY && gunicorn -c .../gunicorn.conf.py --pythonpath ... app_sqlite:app`);
+restart it on a new copy between runs. The database is generated with
+synthetic_data.py unless DIR already holds an ecommerce.db, so large data
+sets can be built once and reused. One thread keeps latencies comparable
+between runs; more threads mainly measure scheduling unless the server has
+cores to spare. Exits with status 1 when --baseline is given and any route regressed.
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+import synthetic_data
+
+# Absolute slack on latency checks, so sub-millisecond routes do not flap on scheduler noise
+NOISE_MS = 1.0
+# p99 over a few hundred requests is a handful of samples; it is reported but not gated
+GATED_LATENCIES = ('p50_ms', 'p95_ms')
+
+
+class TestClient:
+    """Requests in-process through Flask's test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def call(self, method, path, body=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        # Reading the body drains streamed responses, as a real client would
+        return response.status_code, response.get_data()
+
+
+class HttpClient:
+    """One keep-alive HTTP/1.1 connection to a running server"""
+
+    def __init__(self, url):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.connection = None
+
+    def call(self, method, path, body=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+
+
+def load_fixtures(path):
+    """Ids and words the scenarios draw from, read straight from the database"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    fixtures = {
+        'product_ids': [row[0] for row in conn.execute('SELECT id FROM products')],
+        'in_stock_ids': [row[0] for row in conn.execute('SELECT id FROM products WHERE stock_quantity >= 100')],
+        'category_ids': [row[0] for row in conn.execute('SELECT id FROM categories')],
+        'usernames': [row[0] for row in conn.execute("SELECT username FROM users WHERE username LIKE 'shopper%'")],
+    }
+    conn.close()
+    if not (fixtures['in_stock_ids'] and fixtures['usernames']):
+        raise SystemExit('The database has no generated products/users; use an empty --data-dir to generate them')
+    return fixtures
+
+
+def scenarios(fixtures, run_tag):
+    """{name: prepare(client, rng, session) -> (method, path, body, token, expected statuses)}
+
+    prepare may make untimed setup calls (e.g. filling a cart before checkout).
+    """
+    product_ids = fixtures['product_ids']
+    in_stock_ids = fixtures['in_stock_ids']
+    category_ids = fixtures['category_ids']
+    usernames = fixtures['usernames']
+    words = synthetic_data.WORDS
+    ok = {200}
+
+    def add_line(client, rng, session):
+        status, body = client.call('POST', '/cart/add', {'product_id': rng.choice(in_stock_ids), 'quantity': 1},
+                                   session['token'])
+        return json.loads(body)['cart_item']['id'] if status == 200 else 0
+
+    def register(client, rng, session):
+        session['registered'] = session.get('registered', 0) + 1
+        username = f"bench-{run_tag}-{session['index']}-{session['registered']}"
+        body = {'username': username, 'email': f'{username}@example.com', 'password': synthetic_data.PASSWORD,
+                'first_name': 'Bench', 'last_name': 'User'}
+        return 'POST', '/auth/register', body, None, {201}
+
+    def products_filtered(client, rng, session):
+        low = rng.randint(5, 200)
+        return ('GET', f'/products?category_id={rng.choice(category_ids)}&min_price={low}&max_price={low * 2}'
+                       f'&sort={rng.choice(["price_asc", "price_desc", "name"])}&limit=20', None, None, ok)
+
+    def products_stream(client, rng, session):
+        low = rng.randint(5, 200)
+        return ('GET', f'/products?stream=ndjson&category_id={rng.choice(category_ids)}'
+                       f'&min_price={low}&max_price={low + 1}', None, None, ok)
+
+    def products_batch_post(client, rng, session):
+        return 'POST', '/products/batch', {'ids': rng.sample(product_ids, min(50, len(product_ids)))}, None, ok
+
+    def cart_update(client, rng, session):
+        items = [{'product_id': rng.choice(in_stock_ids), 'quantity': rng.randint(0, 3)} for _ in range(3)]
+        return 'PUT', '/cart', {'items': items}, session['token'], ok
+
+    def cart_remove(client, rng, session):
+        return 'DELETE', f'/cart/remove/{add_line(client, rng, session)}', None, session['token'], ok
+
+    def checkout(client, rng, session):
+        add_line(client, rng, session)
+        body = {'payment_method': 'credit_card', 'shipping_address': '1 Bench St'}
+        # 409 is a correct answer when another thread bought the last units
+        return 'POST', '/orders', body, session['token'], {201, 409}
+
+    def recommendations(client, rng, session):
+        body = {'product_ids': rng.sample(product_ids, min(3, len(product_ids))), 'limit': 8}
+        return 'POST', '/recommendations', body, None, ok
+
+    return {
+        'health': lambda client, rng, session: ('GET', '/actuator/health', None, None, ok),
+        'login': lambda client, rng, session: (
+            'POST', '/auth/login', {'username': rng.choice(usernames), 'password': synthetic_data.PASSWORD}, None, ok),
+        'register': register,
+        'products': lambda client, rng, session: ('GET', '/products?limit=20', None, None, ok),
+        'products_filtered': products_filtered,
+        'products_stream': products_stream,
+        'product': lambda client, rng, session: ('GET', f'/products/{rng.choice(product_ids)}', None, None, ok),
+        'products_batch': lambda client, rng, session: (
+            'GET', '/products/batch?ids=' + ','.join(map(str, rng.sample(product_ids, min(20, len(product_ids))))),
+            None, None, ok),
+        'products_batch_post': products_batch_post,
+        'similar': lambda client, rng, session: (
+            'GET', f'/products/{rng.choice(product_ids)}/similar', None, None, ok),
+        'categories': lambda client, rng, session: ('GET', '/categories', None, None, ok),
+        'featured': lambda client, rng, session: ('GET', '/products/featured', None, None, ok),
+        'search': lambda client, rng, session: (
+            'GET', f'/search?q={rng.choice(words)}+{rng.choice(words)}', None, None, ok),
+        'suggest': lambda client, rng, session: (
+            'GET', f'/search/suggest?q={rng.choice(words)[:rng.randint(1, 4)]}', None, None, ok),
+        'cart': lambda client, rng, session: ('GET', '/cart', None, session['token'], ok),
+        'cart_add': lambda client, rng, session: (
+            'POST', '/cart/add', {'product_id': rng.choice(in_stock_ids), 'quantity': 1}, session['token'], ok),
+        'cart_update': cart_update,
+        'cart_remove': cart_remove,
+        'orders': checkout,
+        'user_behavior': lambda client, rng, session: (
+            'GET', '/ai/analytics/user-behavior', None, session['token'], ok),
+        'recommendations': recommendations,
+        'ai_recommendations': lambda client, rng, session: (
+            'GET', '/ai/recommendations', None, session['token'], ok),
+    }
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def run_scenario(prepare, clients, sessions, requests, warmup, seed):
+    # Warm-up requests build lazy indexes (similarity, suggest, co-purchase) and fill caches untimed
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        method, path, body, token, _ = prepare(clients[0], rng, sessions[0])
+        clients[0].call(method, path, body, token)
+    warmup_seconds = time.perf_counter() - started
+
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client, session = clients[index], sessions[index]
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            method, path, body, token, expected = prepare(client, rng, session)
+            sent = time.perf_counter()
+            try:
+                status = client.call(method, path, body, token)[0]
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - sent
+            with lock:
+                if status in expected:
+                    latencies.append(elapsed)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(clients))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'ok': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round((latencies[-1] if latencies else 0.0) * 1000, 3),
+        'warmup_s': round(warmup_seconds, 3),
+    }
+
+
+def median_result(rounds):
+    """Per-metric median over repeated rounds of one route; errors are summed"""
+    result = {}
+    for key, value in rounds[0].items():
+        if key == 'errors':
+            errors = {}
+            for round_ in rounds:
+                for status, count in round_['errors'].items():
+                    errors[status] = errors.get(status, 0) + count
+            result[key] = errors
+        elif key in ('requests', 'ok', 'warmup_s'):
+            result[key] = sum(round_[key] for round_ in rounds)
+        else:
+            result[key] = sorted(round_[key] for round_ in rounds)[len(rounds) // 2]
+    result['rounds'] = len(rounds)
+    return result
+
+
+def compare(results, baseline, tolerance, noise_ms=NOISE_MS):
+    """Regression messages for routes slower (p50/p95) or lower-throughput than the baseline"""
+    regressions = []
+    for name, current in results['routes'].items():
+        base = baseline['routes'].get(name)
+        if base is None:
+            continue
+        for metric in GATED_LATENCIES:
+            limit = base[metric] * (1 + tolerance) + noise_ms
+            if current[metric] > limit:
+                regressions.append(f'{name}: {metric} {current[metric]:.2f} > {limit:.2f} (baseline {base[metric]:.2f})')
+        floor = base['throughput_rps'] * (1 - tolerance)
+        if current['throughput_rps'] < floor:
+            regressions.append(f'{name}: throughput {current["throughput_rps"]:.1f} req/s < {floor:.1f} '
+                               f'(baseline {base["throughput_rps"]:.1f})')
+        if current['errors'] and not base['errors']:
+            regressions.append(f'{name}: errors {current["errors"]}')
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', help='Directory holding (or receiving) ecommerce.db; default: a temporary one')
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--order-items', type=int, default=30000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help='Benchmark a running server instead of the in-process test client')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per route first')
+    parser.add_argument('--repeat', type=int, default=3, help='Rounds per route; the median round counts')
+    parser.add_argument('--only', nargs='+', help='Route names (or substrings) to run')
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--baseline', help='Results JSON to compare against; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown (default 0.25)')
+    args = parser.parse_args()
+    # The test client mode changes into the data directory
+    output = args.output and os.path.abspath(args.output)
+    baseline_path = args.baseline and os.path.abspath(args.baseline)
+
+    scratch = tempfile.TemporaryDirectory()
+    directory = args.data_dir or scratch.name
+    os.makedirs(directory, exist_ok=True)
+    database = os.path.join(directory, 'ecommerce.db')
+    generated = None
+    if not os.path.exists(database):
+        started = time.perf_counter()
+        conn = sqlite3.connect(database)
+        generated = synthetic_data.generate(conn, products=args.products, users=args.users,
+                                            order_items=args.order_items, seed=args.seed)
+        conn.close()
+        print(f'generated {generated} in {time.perf_counter() - started:.1f}s')
+    fixtures = load_fixtures(database)
+
+    if args.url:
+        clients = [HttpClient(args.url) for _ in range(args.threads)]
+    else:
+        if directory != scratch.name:
+            source = sqlite3.connect(database)
+            copy = sqlite3.connect(os.path.join(scratch.name, 'ecommerce.db'))
+            source.backup(copy)
+            copy.close()
+            source.close()
+        # app_sqlite opens ./ecommerce.db on import
+        os.chdir(scratch.name)
+        import app_sqlite
+        clients = [TestClient(app_sqlite.app) for _ in range(args.threads)]
+
+    # One logged-in shopper per thread, so cart and checkout traffic does not contend on a single cart
+    sessions = []
+    shoppers = random.Random(args.seed).sample(fixtures['usernames'], min(args.threads, len(fixtures['usernames'])))
+    for index, username in enumerate(shoppers):
+        status, body = clients[index].call('POST', '/auth/login', {'username': username,
+                                                                   'password': synthetic_data.PASSWORD})
+        if status != 200:
+            raise SystemExit(f'login as {username} failed with {status}: {body[:200]!r}')
+        sessions.append({'index': index, 'token': json.loads(body)['token']})
+    if len(sessions) < args.threads:
+        raise SystemExit(f'--threads {args.threads} needs as many generated users')
+
+    routes = scenarios(fixtures, run_tag=f'{os.getpid()}{int(time.time())}')
+    if args.only:
+        routes = {name: prepare for name, prepare in routes.items() if any(part in name for part in args.only)}
+
+    results = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'target': args.url or 'flask-test-client',
+            'threads': args.threads,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'repeat': args.repeat,
+            'products': len(fixtures['product_ids']),
+            'users': len(fixtures['usernames']),
+            'seed': args.seed,
+            'generated': generated,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'routes': {},
+    }
+    print(f'{"route":<20} {"req/s":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}  errors')
+    for seed, (name, prepare) in enumerate(routes.items(), start=args.seed):
+        result = median_result([
+            run_scenario(prepare, clients, sessions, args.requests, args.warmup if round_ == 0 else 0,
+                         seed * 100 + round_)
+            for round_ in range(args.repeat)
+        ])
+        results['routes'][name] = result
+        print(f'{name:<20} {result["throughput_rps"]:8.1f} {result["p50_ms"]:9.2f} {result["p95_ms"]:9.2f} '
+              f'{result["p99_ms"]:9.2f}  {sum(result["errors"].values()) or ""}')
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+    os.chdir(BACKEND)
+    scratch.cleanup()
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        for key in ('target', 'threads', 'products', 'users'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                print(f'warning: baseline {key} {baseline["meta"].get(key)!r} differs from {results["meta"][key]!r}')
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f'REGRESSION {message}')
+        if regressions:
+            sys.exit(1)
+        print(f'no regressions against {args.baseline} (tolerance {args.tolerance:.0%})')
+
+
+if __name__ == '__main__':
+    main()
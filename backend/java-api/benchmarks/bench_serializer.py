@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Per-row cost of product serialization: the old tuple-index loop vs serializers.PRODUCT
+Usage: python benchmarks/bench_serializer.py [rows]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from serializers import PRODUCT, envelope, json_rows
+
+FROM = '''
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    WHERE p.stock_quantity > 0
+    ORDER BY p.id
+'''
+
+
+def build_database(count):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT, description TEXT, created_at TIMESTAMP)')
+    conn.execute('''
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL, description TEXT, price REAL NOT NULL,
+            category_id INTEGER, sku TEXT UNIQUE NOT NULL, stock_quantity INTEGER DEFAULT 0,
+            is_featured INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany('INSERT INTO categories (id, name) VALUES (?, ?)',
+                     [(i, f'Category {i}') for i in range(1, 6)])
+    conn.executemany(
+        'INSERT INTO products (id, name, description, price, category_id, sku, stock_quantity, is_featured) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [(i, f'Product {i}', f'Description for product number {i} with "quotes"', round(9.99 + i, 2),
+          i % 5 + 1, f'SKU-{i:07d}', i % 100 + 1, int(i % 7 == 0)) for i in range(1, count + 1)]
+    )
+    return conn
+
+
+def legacy(conn):
+    # The loop each handler used before serializers.PRODUCT existed
+    products = conn.execute('SELECT p.*, c.name as category_name' + FROM).fetchall()
+    product_list = []
+    for product in products:
+        product_list.append({
+            'id': product[0],
+            'name': product[1],
+            'description': product[2],
+            'price': product[3],
+            'category_id': product[4],
+            'sku': product[5],
+            'stock_quantity': product[6],
+            'is_featured': bool(product[7]),
+            'category_name': product[9] if len(product) > 9 else None
+        })
+    return json.dumps({'products': product_list}, separators=(',', ':')).encode()
+
+
+def compiled_python(conn):
+    rows = conn.execute(f'SELECT {PRODUCT.select_list}' + FROM).fetchall()
+    return envelope('products', PRODUCT.encode_rows(rows))
+
+
+def sqlite_json(conn):
+    rows = conn.execute(f'SELECT {PRODUCT.json_column}' + FROM).fetchall()
+    return envelope('products', json_rows(rows))
+
+
+def fetch_only(conn):
+    return conn.execute('SELECT p.*, c.name as category_name' + FROM).fetchall()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    conn = build_database(count)
+    expected = json.loads(legacy(conn))
+    assert json.loads(compiled_python(conn)) == expected
+    assert json.loads(sqlite_json(conn)) == expected
+
+    print(f"📊 Serializing {count:,} product rows (times include the query)")
+    results = {}
+    for name, func in (('fetch only', fetch_only), ('legacy loop', legacy),
+                       ('compiled python', compiled_python), ('sqlite json', sqlite_json)):
+        runs, _ = timeit.Timer(lambda: func(conn)).autorange()
+        best = min(timeit.repeat(lambda: func(conn), number=runs, repeat=5)) / runs
+        results[name] = best
+        print(f"  {name:<16} {best / count * 1e6:8.3f} µs/row  {best * 1000:8.2f} ms/response")
+
+    baseline = results['legacy loop'] - results['fetch only']
+    for name in ('compiled python', 'sqlite json'):
+        overhead = results[name] - results['fetch only']
+        print(f"  {name:<16} serialization overhead vs legacy: {overhead / baseline:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+gunicorn (sync workers, gthread) vs uvicorn + asgi.py: throughput and latency under many open connections
+Usage: python benchmarks/bench_servers.py [--workers 1] [--connections 10 100 1000] [--seconds 10] [--login-every 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+import migrations
+import sample_data
+
+PRODUCTS = 20000
+REQUEST_TIMEOUT = 30
+WORDS = [f'w{i}' for i in range(1, 200)]
+
+
+def build_database(path, seed=42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    sample_data.insert_sample_data(conn)
+    conn.executemany(
+        'INSERT INTO products (name, description, price, category_id, sku, stock_quantity, is_featured) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((' '.join(rng.choices(WORDS, k=3)), ' '.join(rng.choices(WORDS, k=12)), round(rng.uniform(1, 500), 2),
+          rng.randint(1, 5), f'BENCH-{i:06d}', rng.randint(0, 50), int(rng.random() < 0.02))
+         for i in range(PRODUCTS))
+    )
+    conn.commit()
+    conn.close()
+
+
+def server_command(kind, port, workers):
+    if kind == 'gunicorn':
+        return ['gunicorn', '-c', os.path.join(BACKEND, 'gunicorn.conf.py'), '--pythonpath', BACKEND,
+                '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning', 'app_sqlite:app']
+    return ['uvicorn', 'asgi:app', '--app-dir', BACKEND, '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning', '--backlog', '4096']
+
+
+async def request(reader, writer, method, path, body=None):
+    """One HTTP/1.1 keep-alive request; returns the status code"""
+    head = f'{method} {path} HTTP/1.1\r\nHost: bench\r\n'
+    if body is not None:
+        head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+    writer.write(head.encode() + b'\r\n' + (body or b''))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(port, deadline, latencies, errors, login_every, rng):
+    login = json.dumps({'username': 'johndoe', 'password': sample_data.SAMPLE_PASSWORD}).encode()
+    reader = writer = None
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+        if login_every and count % login_every == 0:
+            method, path, body = 'POST', '/auth/login', login
+        else:
+            method, body = 'GET', None
+            path = rng.choice([
+                '/products?limit=20',
+                f'/products?limit=20&sort=price_asc&category_id={rng.randint(1, 5)}',
+                '/categories',
+                '/products/featured',
+                f'/search?q={rng.choice(WORDS)}',
+            ])
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            status = await asyncio.wait_for(request(reader, writer, method, path, body), REQUEST_TIMEOUT)
+            if status >= 400:
+                errors.append(status)
+            latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, connections, seconds, login_every):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    rng = random.Random(1)
+    await asyncio.gather(*[
+        client(port, deadline, latencies, errors, login_every, random.Random(rng.random()))
+        for _ in range(connections)
+    ])
+    return latencies, errors, time.perf_counter() - started
+
+
+def wait_ready(port, timeout=30):
+    async def probe():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        status = await request(reader, writer, 'GET', '/actuator/health')
+        writer.close()
+        return status
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if asyncio.run(probe()) == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def run(kind, directory, port, workers, connections, seconds, login_every):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers))
+    server = subprocess.Popen(server_command(kind, port, workers), cwd=directory, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        asyncio.run(load(port, min(connections, 50), 2, login_every))  # warm caches and pools
+        latencies, errors, elapsed = asyncio.run(load(port, connections, seconds, login_every))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies.sort()
+    if not latencies:
+        print(f'{kind:<9} {connections:>5} conns  no successful requests, errors {len(errors)}')
+        return
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f'{kind:<9} {connections:>5} conns  {len(latencies) / elapsed:7.0f} req/s  '
+          f'p50 {p50:8.1f}ms  p99 {p99:8.1f}ms  errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--connections', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--login-every', type=int, default=20, help='every Nth request is a login (0: none)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_database(os.path.join(directory, 'ecommerce.db'))
+        port = 18000 + os.getpid() % 1000
+        for connections in args.connections:
+            for kind in ('gunicorn', 'uvicorn'):
+                port += 1
+                run(kind, directory, port, args.workers, connections, args.seconds, args.login_every)
+
+
+if __name__ == '__main__':
+    main()
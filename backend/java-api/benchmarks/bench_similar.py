@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Similar-products index: full build time, lookup latency and incremental refresh cost
+Usage: python benchmarks/bench_similar.py [products ...] [--verify]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import similar_products
+
+VOCABULARY = 30000
+CHANGES = 100
+
+
+def words(rng, count):
+    # Log-uniform ranks give Zipf (1/rank) word frequencies, as in real product copy
+    return ' '.join(f'w{int(VOCABULARY ** rng.random())}' for _ in range(count))
+
+
+def build_database(count, seed=42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, description TEXT, category_id INTEGER)')
+    similar_products.ensure_change_log(conn)
+    conn.executemany('INSERT INTO categories (id, name) VALUES (?, ?)', [(i, f'Category {i}') for i in range(1, 51)])
+    conn.executemany(
+        'INSERT INTO products (id, name, description, category_id) VALUES (?, ?, ?, ?)',
+        ((i, words(rng, rng.randint(2, 5)), words(rng, rng.randint(8, 20)), rng.randint(1, 50))
+         for i in range(1, count + 1))
+    )
+    conn.commit()
+    return conn
+
+
+def run(count, verify):
+    conn = build_database(count)
+    index = similar_products.SimilarityIndex()
+
+    started = time.perf_counter()
+    index.build(conn)
+    build = time.perf_counter() - started
+
+    ids = np.random.default_rng(0).integers(1, count + 1, 10000)
+    started = time.perf_counter()
+    for product_id in ids:
+        index.similar(int(product_id), 10)
+    lookup_us = (time.perf_counter() - started) / len(ids) * 1e6
+
+    rng = random.Random(7)
+    changed = rng.sample(range(1, count + 1), CHANGES)
+    conn.executemany('UPDATE products SET description = ? WHERE id = ?',
+                     [(words(rng, 12), product_id) for product_id in changed])
+    conn.execute("INSERT INTO products (name, description, category_id) VALUES ('w1 w2 w3', 'w4 w5 w6', 1)")
+    conn.execute('DELETE FROM products WHERE id = ?', (changed[0],))
+    conn.commit()
+    started = time.perf_counter()
+    index.refresh(conn)
+    refresh = time.perf_counter() - started
+
+    stats = index.stats()
+    print(f'{count:>9,} products  build {build:7.2f}s  lookup {lookup_us:6.1f}us  '
+          f'refresh({CHANGES + 2} changes) {refresh * 1000:7.1f}ms  '
+          f'nnz {stats["vector_nnz"]:,}  table {stats["index_bytes"] / 1e6:.0f} MB')
+
+    if verify:
+        # The incremental table must match a rebuild that uses the same IDF weights
+        vectors = index._vectors
+        _, expected = similar_products.top_neighbours(vectors, vectors.T.tocsr(), np.arange(len(index.item_ids)))
+        # Compare scores: equally similar neighbours may legitimately swap places
+        mismatched = int((np.abs(expected - index.scores) > 1e-6).any(axis=1).sum())
+        print(f'           incremental vs recomputed: {mismatched} rows differ')
+
+
+def main():
+    verify = '--verify' in sys.argv
+    sizes = [int(arg) for arg in sys.argv[1:] if arg != '--verify'] or [100000, 1000000]
+    for count in sizes:
+        run(count, verify)
+
+
+if __name__ == '__main__':
+    main()
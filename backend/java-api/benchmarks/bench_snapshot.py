@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Catalog read latency: pooled connections to the database file vs the in-memory snapshot
+Usage: python benchmarks/bench_snapshot.py [products ...] [--writer]
+
+--writer keeps a thread committing cart rows (not catalog tables) during the
+reads, so the file path reads through a growing WAL while the snapshot stays current.
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import catalog_cache
+import catalog_snapshot
+import migrations
+import product_filters
+import search_index
+from db_pool import ConnectionPool
+from serializers import PRODUCT
+
+VOCABULARY = 5000
+ROUNDS = 1000
+
+
+def word(rng):
+    # Log-uniform ranks give Zipf (1/rank) word frequencies, as in real product copy
+    return f'w{int(VOCABULARY ** rng.random())}'
+
+
+def build_database(path, count, seed=42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.executemany('INSERT INTO categories (id, name) VALUES (?, ?)', [(i, f'Category {i}') for i in range(1, 51)])
+    conn.executemany(
+        'INSERT INTO products (name, description, price, category_id, sku, stock_quantity, is_featured) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((' '.join(word(rng) for _ in range(3)), ' '.join(word(rng) for _ in range(15)),
+          round(rng.uniform(1, 3000), 2), rng.randint(1, 50), f'SKU-{i:07d}', rng.randint(0, 50),
+          int(rng.random() < 0.02))
+         for i in range(1, count + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+def queries(count, rng):
+    """(label, fn(conn)) pairs shaped like the catalog endpoints"""
+    def listing(sort, args):
+        conditions, params, _ = product_filters.parse_listing_args(args)
+        sql, params = product_filters.listing_sql(PRODUCT.json_column, conditions, params, sort, None)
+        return lambda conn: conn.execute(sql + ' LIMIT 101', params).fetchall()
+
+    def facets(conn):
+        return product_filters.facet_counts(conn)
+
+    def search(conn):
+        cursor = search_index.search_products(conn, word(rng), limit=21)
+        return cursor.fetchall() if cursor is not None else []
+
+    def batch(conn):
+        ids = [rng.randint(1, count) for _ in range(50)]
+        return conn.execute(
+            f'SELECT {PRODUCT.json_column} FROM products p LEFT JOIN categories c ON p.category_id = c.id '
+            f'WHERE p.id IN ({",".join("?" * len(ids))})', ids
+        ).fetchall()
+
+    return [
+        ('products page', listing('id', {})),
+        ('category by price', listing('price_asc', {'category_id': '7'})),
+        ('featured', listing('id', {'featured': 'true'})),
+        ('facets', facets),
+        ('search', search),
+        ('batch of 50', batch),
+    ]
+
+
+def write_carts(path, stop):
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute('INSERT OR IGNORE INTO users (id, username, email, password_hash, first_name, last_name) '
+                 "VALUES (1, 'bench', 'bench@example.com', 'x', 'Bench', 'User')")
+    conn.commit()
+    product_id = 1
+    while not stop.is_set():
+        product_id += 1
+        conn.execute('INSERT OR IGNORE INTO cart (user_id, product_id, quantity) VALUES (1, ?, 1)', (product_id,))
+        conn.commit()
+        time.sleep(0.001)
+    conn.close()
+
+
+def timed(acquire, fn):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        conn = acquire()
+        fn(conn)
+        conn.close()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+
+
+def run(count, writer):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        build_database(path, count)
+        pool = ConnectionPool(path)
+        snapshot = catalog_snapshot.CatalogSnapshot(path, pool, catalog_cache.VersionTracker(path))
+        snapshot.refresh()
+        stats = snapshot.stats()
+        print(f'{count:,} products: snapshot copy {stats["build_seconds"] * 1000:.0f}ms, '
+              f'{stats["bytes"] / 1e6:.0f} MB')
+
+        stop = threading.Event()
+        if writer:
+            threading.Thread(target=write_carts, args=(path, stop), daemon=True).start()
+
+        for label, fn in queries(count, random.Random(0)):
+            # Warm both paths (page cache, statement cache) before measuring
+            timed(pool.acquire, fn)
+            timed(snapshot.acquire, fn)
+            file_p50, file_p99 = timed(pool.acquire, fn)
+            memory_p50, memory_p99 = timed(snapshot.acquire, fn)
+            print(f'  {label:<18} file p50 {file_p50:8.1f}us p99 {file_p99:8.1f}us   '
+                  f'snapshot p50 {memory_p50:8.1f}us p99 {memory_p99:8.1f}us   '
+                  f'x{file_p50 / memory_p50:.2f}')
+        stop.set()
+        print(f'  snapshot reads {snapshot.snapshot_reads}, fallbacks {snapshot.fallback_reads}')
+        pool.close()
+
+
+def main():
+    writer = '--writer' in sys.argv
+    sizes = [int(arg) for arg in sys.argv[1:] if arg != '--writer'] or [10000, 100000]
+    for count in sizes:
+        run(count, writer)
+
+
+if __name__ == '__main__':
+    main()
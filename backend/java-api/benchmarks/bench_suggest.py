@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Search suggestions: build time, memory, prefix latency and incremental refresh cost
+Usage: python benchmarks/bench_suggest.py [products ...]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import similar_products
+import suggest
+
+VOCABULARY = 30000
+CHANGES = 100
+QUERIES = 10000
+
+
+def word(rng):
+    # Log-uniform ranks give Zipf (1/rank) word frequencies, as in real product names
+    return f'w{int(VOCABULARY ** rng.random())}'
+
+
+def build_database(count, seed=42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute('CREATE TABLE catalog_versions (name TEXT PRIMARY KEY, version INTEGER)')
+    conn.execute('''CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, description TEXT, sku TEXT,
+                    category_id INTEGER, stock_quantity INTEGER, is_featured INTEGER)''')
+    similar_products.ensure_change_log(conn)
+    conn.execute("INSERT INTO catalog_versions VALUES ('categories', 1)")
+    conn.executemany('INSERT INTO categories (id, name) VALUES (?, ?)', [(i, f'Category {i}') for i in range(1, 51)])
+    conn.executemany(
+        'INSERT INTO products (id, name, sku, category_id, stock_quantity, is_featured) VALUES (?, ?, ?, ?, ?, ?)',
+        ((i, ' '.join(word(rng) for _ in range(rng.randint(2, 5))), f'SKU-{i:07d}', rng.randint(1, 50),
+          rng.randint(0, 20), int(rng.random() < 0.05))
+         for i in range(1, count + 1))
+    )
+    conn.commit()
+    return conn
+
+
+def run(count):
+    conn = build_database(count)
+    index = suggest.SuggestIndex(max_products=count)
+
+    started = time.perf_counter()
+    index.build(conn)
+    build = time.perf_counter() - started
+
+    # Typed prefixes of 1-6 characters, from real keys so most of them match
+    rng = random.Random(0)
+    keys = index._main.keys
+    queries = [keys[rng.randrange(len(keys))][:rng.randint(1, 6)] for _ in range(QUERIES)]
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.suggest(query, 8)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1e6
+    p99 = timings[int(len(timings) * 0.99)] * 1e6
+
+    changed = rng.sample(range(1, count + 1), CHANGES)
+    conn.executemany('UPDATE products SET name = ? WHERE id = ?',
+                     [(f'{word(rng)} {word(rng)}', product_id) for product_id in changed])
+    conn.execute("INSERT INTO products (name, sku, stock_quantity) VALUES ('w1 w2', 'NEW-1', 1)")
+    conn.execute('DELETE FROM products WHERE id = ?', (changed[0],))
+    conn.commit()
+    started = time.perf_counter()
+    index.refresh(conn)
+    refresh = time.perf_counter() - started
+
+    stats = index.stats()
+    print(f'{count:>9,} products  build {build:6.2f}s  suggest p50 {p50:6.1f}us p99 {p99:7.1f}us  '
+          f'refresh({CHANGES + 2} changes) {refresh * 1000:6.1f}ms  '
+          f'entries {stats["entries"]:,}  memory {stats["approx_bytes"] / 1e6:.0f} MB')
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 200000]
+    for count in sizes:
+        run(count)
+
+
+if __name__ == '__main__':
+    main()
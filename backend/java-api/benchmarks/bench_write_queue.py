@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Registration and cart writes: one transaction per request vs the group-commit write queue
+Usage: python benchmarks/bench_write_queue.py [--threads 16] [--ops 4000] [--synchronous NORMAL FULL] [--delay-ms 0 2]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cart
+import db_pool
+import migrations
+import write_queue
+from db_pool import ConnectionPool
+
+PRODUCTS = 1000
+
+
+def build_database(path):
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.executemany(
+        'INSERT INTO products (id, name, price, sku, stock_quantity) VALUES (?, ?, 9.99, ?, 100)',
+        [(i, f'Product {i}', f'SKU-{i:05d}') for i in range(1, PRODUCTS + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def operation(i):
+    """Mix shaped like signup traffic: a registration, then cart adds by that user"""
+    if i % 4 == 0:
+        def register(conn):
+            return conn.execute(
+                'INSERT INTO users (username, email, password_hash, first_name, last_name) VALUES (?, ?, ?, ?, ?)',
+                (f'user{i}', f'user{i}@example.com', 'x', 'First', 'Last')
+            ).lastrowid
+        return register
+    user_id = i // 4 + 1
+    return lambda conn: cart.add_item(conn, user_id, i % PRODUCTS + 1, 1)
+
+
+def run(mode, synchronous, threads, ops, delay_ms=0.0):
+    db_pool.SYNCHRONOUS = synchronous
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        build_database(path)
+        pool = ConnectionPool(path, max_size=threads)
+        if mode == 'queue':
+            pool.write_queue = write_queue.WriteQueue(pool, max_delay=delay_ms / 1000)
+
+        latencies = []
+        errors = []
+        counter = iter(range(ops))
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    pool.write_transaction(operation(i))
+                except sqlite3.Error as e:
+                    errors.append(e)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        extra = ''
+        if pool.write_queue is not None:
+            extra = f'  avg batch {pool.write_queue.stats()["avg_batch"]}'
+        if mode == 'queue':
+            mode = f'queue {delay_ms:g}ms'
+        print(f'{mode:<12} synchronous={synchronous:<6} {ops / elapsed:8.0f} writes/s  '
+              f'p50 {p50:6.2f}ms  p99 {p99:7.2f}ms  errors {len(errors)}{extra}')
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=4000)
+    parser.add_argument('--synchronous', nargs='+', default=['NORMAL', 'FULL'])
+    parser.add_argument('--delay-ms', type=float, nargs='+', default=[0.0, 2.0])
+    args = parser.parse_args()
+    for synchronous in args.synchronous:
+        run('transaction', synchronous, args.threads, args.ops)
+        for delay_ms in args.delay_ms:
+            run('queue', synchronous, args.threads, args.ops, delay_ms)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+ANUFA AI E-commerce Platform - Shopping cart
+One row per (user, product), written with UPSERTs and read back in a single join
+"""
+
+from schema_indexes import index_sql
+from serializers import RowSerializer
+
+MAX_LINE_QUANTITY = 999
+
+CART_ITEM = RowSerializer([
+    ('id', 'ci.id', 'int'),
+    ('product_id', 'ci.product_id', 'int'),
+    ('name', 'p.name', 'str'),
+    ('description', 'p.description', 'str'),
+    ('price', 'p.price', 'float'),
+    ('quantity', 'ci.quantity', 'int'),
+    ('item_total', 'ROUND(p.price * ci.quantity, 2)', 'float'),
+    ('stock_quantity', 'p.stock_quantity', 'int'),
+    ('sku', 'p.sku', 'str'),
+    ('added_at', 'ci.added_at', 'str'),
+])
+
+# Cart lines plus whole-cart totals (window aggregates) in one round trip
+CART_SQL = f'''
+    SELECT {CART_ITEM.json_column},
+           ROUND(SUM(p.price * ci.quantity) OVER (), 2),
+           SUM(ci.quantity) OVER ()
+    FROM cart ci
+    JOIN products p ON p.id = ci.product_id
+    WHERE ci.user_id = ?
+    ORDER BY ci.id
+'''
+
+# Adds a delta to an existing line; the SELECT skips unknown products
+ADD_SQL = '''
+    INSERT INTO cart (user_id, product_id, quantity)
+    SELECT ?, id, ? FROM products WHERE id = ?
+    ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = cart.quantity + excluded.quantity
+'''
+
+SET_SQL = '''
+    INSERT INTO cart (user_id, product_id, quantity)
+    SELECT ?, id, ? FROM products WHERE id = ?
+    ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = excluded.quantity
+'''
+
+
+def ensure_unique_cart_lines(conn):
+    """Merge duplicate (user_id, product_id) rows, then enforce uniqueness"""
+    conn.execute('''
+        UPDATE cart SET quantity = (
+            SELECT SUM(dup.quantity) FROM cart dup
+            WHERE dup.user_id = cart.user_id AND dup.product_id = cart.product_id
+        )
+        WHERE id IN (SELECT MIN(id) FROM cart GROUP BY user_id, product_id HAVING COUNT(*) > 1)
+    ''')
+    conn.execute('''
+        DELETE FROM cart
+        WHERE id NOT IN (SELECT MIN(id) FROM cart GROUP BY user_id, product_id)
+    ''')
+    conn.execute(index_sql('idx_cart_user_product'))
+
+
+def get_cart(conn, user_id):
+    """Cart payload for user_id as JSON bytes"""
+    rows = conn.execute(CART_SQL, (user_id,)).fetchall()
+    total = rows[0][1] if rows else 0
+    item_count = rows[0][2] if rows else 0
+    items = ','.join([row[0] for row in rows])
+    return (f'{{"cart_items":[{items}],"total":{float(total)!r},"item_count":{item_count}}}').encode()
+
+
+def add_item(conn, user_id, product_id, quantity):
+    """Add quantity (may be negative) to a line; returns (cart_id, quantity) or None.
+
+    A line whose quantity drops to zero or below is removed and reported
+    with quantity 0. Runs in the caller's transaction.
+    """
+    cursor = conn.execute(ADD_SQL, (user_id, quantity, product_id))
+    if cursor.rowcount == 0:
+        return None
+    cart_id, new_quantity = conn.execute(
+        'SELECT id, quantity FROM cart WHERE user_id = ? AND product_id = ?', (user_id, product_id)
+    ).fetchone()
+    if new_quantity <= 0:
+        conn.execute('DELETE FROM cart WHERE id = ?', (cart_id,))
+        new_quantity = 0
+    elif new_quantity > MAX_LINE_QUANTITY:
+        raise ValueError(f'quantity cannot exceed {MAX_LINE_QUANTITY}')
+    return cart_id, new_quantity
+
+
+def set_items(conn, user_id, items):
+    """Apply absolute quantities {product_id: quantity}; 0 removes the line.
+
+    Returns the product ids that do not exist. Runs in the caller's transaction.
+    """
+    known = set()
+    product_ids = list(items)
+    for start in range(0, len(product_ids), 500):
+        chunk = product_ids[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        known.update(row[0] for row in conn.execute(
+            f'SELECT id FROM products WHERE id IN ({placeholders})', chunk).fetchall())
+
+    conn.executemany(SET_SQL, [
+        (user_id, quantity, product_id)
+        for product_id, quantity in items.items() if quantity > 0 and product_id in known
+    ])
+    conn.executemany('DELETE FROM cart WHERE user_id = ? AND product_id = ?', [
+        (user_id, product_id) for product_id, quantity in items.items() if quantity == 0
+    ])
+    return sorted(set(product_ids) - known)
+
+
+def remove_line(conn, user_id, cart_id):
+    """Delete one cart line owned by user_id; returns False if there was none"""
+    cursor = conn.execute('DELETE FROM cart WHERE id = ? AND user_id = ?', (cart_id, user_id))
+    return cursor.rowcount > 0
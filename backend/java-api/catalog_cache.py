@@ -0,0 +1,215 @@
+"""
+ANUFA AI E-commerce Platform - In-process catalog cache
+Bounded LRU/TTL cache whose entries are invalidated by per-table change counters
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from prepared_response import PreparedResponse
+
+CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 1024))
+CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', 300))
+# Per-product JSON entries (/products/{id}, /products/batch) live in their own cache so
+# large batches cannot evict cached listings
+PRODUCT_CACHE_SIZE = int(os.environ.get('PRODUCT_CACHE_SIZE', 4096))
+
+# Tables whose rows feed catalog responses
+CATALOG_TABLES = ('products', 'categories')
+
+# Change counters bumped by triggers on every row write, from any connection or process
+VERSION_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS catalog_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    *[
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+            UPDATE catalog_versions SET version = version + 1 WHERE name = '{table}';
+        END
+        '''
+        for table in CATALOG_TABLES
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+]
+
+
+def ensure_catalog_versions(conn):
+    """Create the change-counter table and its triggers"""
+    for statement in VERSION_SCHEMA:
+        conn.execute(statement)
+    conn.executemany(
+        'INSERT OR IGNORE INTO catalog_versions (name, version) VALUES (?, 0)',
+        [(table,) for table in CATALOG_TABLES]
+    )
+
+
+class VersionTracker:
+    """Reads catalog change counters, re-querying only when PRAGMA data_version moves"""
+
+    def __init__(self, database):
+        self.database = database
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._versions = {}
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._inherited = self._conn
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+
+    def current(self):
+        """Return {table: version} as of the latest commit by any connection"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.database, check_same_thread=False)
+            # data_version only changes when another connection commits, so the
+            # common case costs one pragma and no table read
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                self._versions = dict(self._conn.execute('SELECT name, version FROM catalog_versions'))
+                self._data_version = data_version
+            return self._versions
+
+
+class CatalogCache:
+    """LRU cache with a TTL whose entries remember the table versions they were built from"""
+
+    def __init__(self, tracker, max_entries=CACHE_SIZE, ttl=CACHE_TTL, flights=None):
+        self.tracker = tracker
+        # Optional SingleFlight: concurrent misses for the same key and versions share one load
+        self.flights = flights
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def get_or_load(self, key, loader, depends=CATALOG_TABLES):
+        """Return the cached value for key, calling loader() on a miss"""
+        return self._get(key, lambda stamp: loader(), depends)
+
+    def get_prepared(self, key, loader, depends=CATALOG_TABLES):
+        """Return a cached PreparedResponse for key.
+
+        loader() returns a JSON payload or already-encoded bytes, optionally
+        as a (payload, status) tuple, and is only called on a miss; the body
+        is encoded and compressed once.
+        """
+        def build(stamp):
+            result = loader()
+            payload, status = result if isinstance(result, tuple) else (result, 200)
+            if isinstance(payload, bytes):
+                return PreparedResponse(payload, stamp, status)
+            return PreparedResponse.from_payload(payload, stamp, status)
+        return self._get(key, build, depends)
+
+    def get_many(self, keys, loader, depends=CATALOG_TABLES):
+        """Return {key: value} for keys, calling loader(missing_keys) once for all misses.
+
+        loader returns {key: value} for the keys it could resolve; keys it
+        leaves out are cached as None, so repeated lookups of missing rows
+        stay cheap until the tables change.
+        """
+        stamp = self._stamp(depends)
+        now = time.monotonic()
+        values = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                found, value = self._lookup(key, stamp, now)
+                if found:
+                    values[key] = value
+                else:
+                    missing.append(key)
+
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                for key in missing:
+                    values[key] = loaded.get(key)
+                    self._store(key, stamp, now, values[key])
+        return values
+
+    def _stamp(self, depends):
+        versions = self.tracker.current()
+        return tuple(versions.get(table) for table in depends)
+
+    def _lookup(self, key, stamp, now):
+        """(True, value) for a current entry, else drop any stale one and count a miss; needs the lock"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry_stamp, expires_at, value = entry
+            if entry_stamp == stamp and expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+            if entry_stamp != stamp:
+                self.invalidations += 1
+            else:
+                self.expirations += 1
+        self.misses += 1
+        return False, None
+
+    def _store(self, key, stamp, now, value):
+        """Insert an entry and evict the least recently used beyond max_entries; needs the lock"""
+        self._entries[key] = (stamp, now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get(self, key, build, depends):
+        stamp = self._stamp(depends)
+        now = time.monotonic()
+
+        with self._lock:
+            found, value = self._lookup(key, stamp, now)
+            if found:
+                return value
+
+        # Load outside the lock; the stamp was read first, so a concurrent
+        # write can only make this entry look older than it is, never newer
+        if self.flights is not None:
+            # Metrics are grouped by the first key element, the endpoint name
+            value = self.flights.do(key[0], (key, stamp), lambda: build(stamp))
+        else:
+            value = build(stamp)
+
+        with self._lock:
+            self._store(key, stamp, now, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters for this worker"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,164 @@
+"""
+ANUFA AI E-commerce Platform - In-memory catalog snapshot
+Optional per-worker read-only copy of the database for catalog reads, swapped when the catalog changes
+"""
+
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import metrics
+from catalog_cache import CATALOG_TABLES
+from db_pool import PooledConnection
+
+ENABLED = os.environ.get('CATALOG_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+# Minimum seconds between snapshot copies; reads fall back to the database in between
+MIN_INTERVAL = float(os.environ.get('CATALOG_SNAPSHOT_MIN_INTERVAL', 1.0))
+
+_names = itertools.count(1)
+
+
+class _Generation:
+    """One in-memory copy; reader connections share its pages through the shared cache"""
+
+    def __init__(self, uri, holder, stamp):
+        self.uri = uri
+        self.holder = holder
+        self.stamp = stamp
+        page_size = holder.execute('PRAGMA page_size').fetchone()[0]
+        self.bytes = holder.execute('PRAGMA page_count').fetchone()[0] * page_size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._retired = False
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False,
+                                   factory=metrics.InstrumentedConnection)
+            conn.execute('PRAGMA query_only=1')
+        return PooledConnection(conn, self)
+
+    def release(self, conn):
+        with self._lock:
+            if not self._retired:
+                self._idle.put(conn)
+                return
+        conn.close()
+
+    def retire(self):
+        """Close idle readers and the holder; the copy is freed once the last busy reader closes"""
+        with self._lock:
+            self._retired = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self.holder.close()
+
+
+class CatalogSnapshot:
+    """Serves read connections from an in-memory copy of the database.
+
+    The copy is taken with the backup API in a background thread and its
+    catalog_versions row is the stamp it was taken at. acquire() hands out a
+    snapshot connection only while that stamp matches the live versions;
+    otherwise it schedules a new copy and returns a pooled connection to the
+    database file, so readers never see data older than the catalog cache
+    would.
+    """
+
+    def __init__(self, database, pool, tracker, depends=CATALOG_TABLES, min_interval=MIN_INTERVAL):
+        self.database = database
+        self.pool = pool
+        self.tracker = tracker
+        self.depends = depends
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._reset_state()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset_state(self):
+        self._generation = None
+        self._building = False
+        self._last_build = float('-inf')
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.snapshot_reads = 0
+        self.fallback_reads = 0
+
+    def _after_fork(self):
+        # The copy lives in the parent's memory; the child takes its own
+        self._inherited = self._generation
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def acquire(self):
+        """A read-only connection to a current snapshot, or a pool connection while none is"""
+        versions = self.tracker.current()
+        stamp = tuple(versions.get(table) for table in self.depends)
+        generation = self._generation
+        if generation is not None and generation.stamp == stamp:
+            self.snapshot_reads += 1
+            return generation.acquire()
+
+        self.fallback_reads += 1
+        self._schedule()
+        return self.pool.acquire()
+
+    def _schedule(self):
+        with self._lock:
+            if self._building or time.monotonic() - self._last_build < self.min_interval:
+                return
+            self._building = True
+            self._last_build = time.monotonic()
+        threading.Thread(target=self._build, name='catalog-snapshot', daemon=True).start()
+
+    def _build(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._building = False
+
+    def refresh(self):
+        """Copy the database into a new in-memory generation and swap it in"""
+        started = time.perf_counter()
+        uri = f'file:catalog_snapshot_{os.getpid()}_{next(_names)}?mode=memory&cache=shared'
+        holder = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(self.database)
+        try:
+            # One step copies under a single read transaction, so the copy is consistent
+            source.backup(holder)
+        finally:
+            source.close()
+        # The stamp comes from the copy itself, so it describes exactly what was copied
+        versions = dict(holder.execute('SELECT name, version FROM catalog_versions'))
+        generation = _Generation(uri, holder, tuple(versions.get(table) for table in self.depends))
+
+        with self._lock:
+            previous, self._generation = self._generation, generation
+            self.builds += 1
+            self.build_seconds = time.perf_counter() - started
+        if previous is not None:
+            previous.retire()
+
+    def stats(self):
+        """Snapshot size and how many reads it served for this worker"""
+        generation = self._generation
+        reads = self.snapshot_reads + self.fallback_reads
+        return {
+            'enabled': True,
+            'stamp': list(generation.stamp) if generation else None,
+            'bytes': generation.bytes if generation else 0,
+            'builds': self.builds,
+            'build_seconds': round(self.build_seconds, 4),
+            'snapshot_reads': self.snapshot_reads,
+            'fallback_reads': self.fallback_reads,
+            'snapshot_read_rate': round(self.snapshot_reads / reads, 4) if reads else 0.0,
+        }
@@ -0,0 +1,267 @@
+"""
+ANUFA AI E-commerce Platform - SQLite connection pool
+Keeps tuned connections open across requests instead of reconnecting per request
+"""
+
+import atexit
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+
+import metrics
+
+# Connection tuning (overridable through the environment)
+POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 8))
+POOL_TIMEOUT = float(os.environ.get('SQLITE_POOL_TIMEOUT', 5.0))
+BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5.0))
+STATEMENT_CACHE = int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+# NORMAL skips the fsync on each WAL commit; FULL makes every commit durable
+SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+# Retry policy for write transactions that lose the race for the write lock
+WRITE_RETRIES = int(os.environ.get('SQLITE_WRITE_RETRIES', 5))
+WRITE_BACKOFF = float(os.environ.get('SQLITE_WRITE_BACKOFF', 0.01))
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no connection frees up within the pool timeout"""
+
+
+def is_busy_error(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED and pool timeouts, which are worth retrying"""
+    if isinstance(error, PoolTimeout):
+        return True
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+class PooledConnection:
+    """Connection proxy that hands the connection back to its pool on close().
+
+    Used as a context manager it is returned on exit, like close(); one that
+    is dropped without either is returned when it is garbage collected.
+    """
+
+    __slots__ = ('_conn', '_pool', '_pid')
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+        self._pid = os.getpid()
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            if self._pid == os.getpid():
+                self._pool.release(conn)
+
+
+class ConnectionPool:
+    """Bounded pool of pre-configured SQLite connections for one worker process"""
+
+    def __init__(self, database, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        # Optional write_queue.WriteQueue; when set, write_transaction() goes through it
+        self.write_queue = None
+        # Optional set_trace_callback() target for new connections (the query plan check)
+        self.trace = None
+        self._lock = threading.Lock()
+        self._reset_state()
+        os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self.close)
+
+    def _reset_state(self):
+        # LIFO so the most recently used (warmest) connection is handed out first
+        self._idle = queue.LifoQueue()
+        self._size = 0
+        self._closed = False
+        self._pid = os.getpid()
+        self._acquired = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._busy_retries = 0
+
+    def _after_fork(self):
+        # SQLite handles must never cross a fork. Keep the inherited ones
+        # referenced (closing them would release the parent's file locks)
+        # and start over with an empty pool in the child.
+        self._inherited = getattr(self, '_inherited', []) + list(self._idle.queue)
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE,
+            factory=metrics.InstrumentedConnection,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={SYNCHRONOUS}')
+        conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+        conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        if self.trace is not None:
+            conn.set_trace_callback(self.trace)
+        return conn
+
+    def dedicated_connection(self):
+        """A new connection tuned like the pooled ones but owned by the caller (e.g. the write queue's writer)"""
+        return self._connect()
+
+    def acquire(self):
+        """Borrow a connection; call close() on it to return it"""
+        if self._closed:
+            raise sqlite3.ProgrammingError('Connection pool is closed')
+
+        start = time.perf_counter()
+        waited = False
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._size < self.max_size:
+                    self._size += 1
+                    grow = True
+                else:
+                    grow = False
+            if grow:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                    raise
+            else:
+                waited = True
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s')
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._acquired += 1
+            if waited:
+                self._waits += 1
+                self._wait_total += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+        return PooledConnection(conn, self)
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction"""
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def write_transaction(self, fn, retries=WRITE_RETRIES, backoff=WRITE_BACKOFF):
+        """Run fn(conn) inside BEGIN IMMEDIATE ... COMMIT and return its result.
+
+        Taking the write lock up front means the transaction can never fail
+        half way through on a lock upgrade. If the lock cannot be obtained
+        (SQLITE_BUSY after the busy timeout) the whole transaction is retried
+        with jittered exponential backoff; any other exception rolls back
+        and propagates.
+
+        With a write queue attached, fn instead runs on the queue's writer
+        connection, sharing a group commit with other queued operations, and
+        must not commit or roll back itself.
+        """
+        if self.write_queue is not None:
+            return self.write_queue.run(fn)
+        conn = self.acquire()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    result = fn(conn)
+                    conn.commit()
+                    return result
+                except sqlite3.OperationalError as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    if not is_busy_error(e) or attempt == retries:
+                        raise
+                    with self._lock:
+                        self._busy_retries += 1
+                    time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+        finally:
+            conn.close()
+
+    def _discard(self, conn):
+        conn.close()
+        with self._lock:
+            self._size = max(self._size - 1, 0)
+
+    def close(self):
+        """Close every idle connection; busy ones are closed when released"""
+        if self._pid != os.getpid():
+            return
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        """Pool size and wait-time counters for this worker"""
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                'size': self._size,
+                'max_size': self.max_size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'acquired': self._acquired,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'avg_wait_ms': round(self._wait_total / self._waits * 1000, 3) if self._waits else 0.0,
+                'max_wait_ms': round(self._wait_max * 1000, 3),
+                'busy_retries': self._busy_retries,
+            }
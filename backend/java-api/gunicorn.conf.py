@@ -0,0 +1,13 @@
+# Gunicorn settings for the ANUFA API
+# Usage: gunicorn -c gunicorn.conf.py app_sqlite:app
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def worker_exit(server, worker):
+    # Close this worker's pooled SQLite connections before it goes away
+    import app_sqlite
+    app_sqlite.pool.close()
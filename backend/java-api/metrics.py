@@ -0,0 +1,376 @@
+"""
+ANUFA AI E-commerce Platform - Metrics
+Request, SQL and serialization histograms plus component counters in Prometheus text format, and a slow-query log
+"""
+
+import contextvars
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+from flask.json.provider import DefaultJSONProvider
+
+# Statements at least this slow are logged with their query plan; unset or 0 disables the log
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0) or 0)
+# A statement's plan is looked up at most once per this many seconds
+SLOW_QUERY_PLAN_TTL = 60.0
+
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+SERIALIZATION_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25)
+
+logger = logging.getLogger('anufa.slow_query')
+
+# (route, started) for the request being handled on this thread; SQL outside a request is 'background'
+_request = contextvars.ContextVar('request', default=('background', None))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, Prometheus style"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text}{"," if label_text else ""}le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label_text}{"," if label_text else ""}le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount, labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{{{_labels(self.label_names, labels)}}} {value}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'anufa_http_request_duration_seconds',
+    'Time to handle a request until its response is returned (first byte for streamed responses)',
+    ('method', 'route', 'status'), REQUEST_BUCKETS)
+SQL_SECONDS = Histogram(
+    'anufa_sql_statement_duration_seconds',
+    'SQLite statement time from execute() until its rows are fetched, including COMMIT',
+    ('route', 'operation', 'table'), SQL_BUCKETS)
+SQL_ROWS = Counter(
+    'anufa_sql_rows_returned_total', 'Rows fetched from SQLite statements',
+    ('route', 'operation', 'table'))
+SERIALIZATION_SECONDS = Histogram(
+    'anufa_serialization_duration_seconds', 'Time spent encoding response bodies',
+    ('kind',), SERIALIZATION_BUCKETS)
+METRICS = (REQUEST_SECONDS, SQL_SECONDS, SQL_ROWS, SERIALIZATION_SECONDS)
+
+
+def _reset_metrics():
+    # Each worker reports its own traffic, not what the parent did before forking
+    for metric in METRICS:
+        metric.reset()
+    slow_queries._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_metrics)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE(?:\s+OR\s+\w+)?|JOIN)\s+"?(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def statement_labels(sql):
+    """(operation, table) for a statement, e.g. ('SELECT', 'products'); cached per SQL text"""
+    words = sql.split(None, 1)
+    operation = words[0].upper() if words else ''
+    match = _TABLE.search(sql)
+    return operation, match.group(1).lower() if match else ''
+
+
+def start_request(route):
+    """Mark the start of a request for route (the URL rule, not the raw path)"""
+    _request.set((route, time.perf_counter()))
+
+
+def finish_request(method, status):
+    route, started = _request.get()
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, (method, route, str(status)))
+
+
+def observe_serialization(kind, started):
+    SERIALIZATION_SECONDS.observe(time.perf_counter() - started, (kind,))
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, timing every jsonify() body"""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            observe_serialization('jsonify', started)
+
+
+class SlowQueryLog:
+    """Logs statements slower than the threshold with their EXPLAIN QUERY PLAN.
+
+    Parameters are never logged; they can hold password hashes and tokens.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, plan_ttl=SLOW_QUERY_PLAN_TTL):
+        self.threshold = threshold_ms / 1000 if threshold_ms else None
+        self.plan_ttl = plan_ttl
+        self._plans = {}
+        self._lock = threading.Lock()
+        self.logged = 0
+
+    def record(self, conn, sql, parameters, elapsed, rows, route):
+        plan = self._plan(conn, sql, parameters)
+        with self._lock:
+            self.logged += 1
+        logger.warning('slow query %.1f ms, %d rows, route %s: %s\n  plan: %s',
+                       elapsed * 1000, rows, route, ' '.join(sql.split()), plan)
+
+    def _plan(self, conn, sql, parameters):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._plans.get(sql)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+        if statement_labels(sql)[0] not in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE'):
+            return 'n/a'
+        try:
+            # The base class execute(), so the EXPLAIN itself is not timed or logged
+            rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+            plan = '; '.join(row[-1] for row in rows)
+        except sqlite3.Error as e:
+            plan = f'unavailable ({e})'
+        with self._lock:
+            if len(self._plans) >= 1024:
+                self._plans.clear()
+            self._plans[sql] = (now + self.plan_ttl, plan)
+        return plan
+
+    def stats(self):
+        return {
+            'enabled': self.threshold is not None,
+            'threshold_ms': self.threshold * 1000 if self.threshold else 0.0,
+            'logged': self.logged,
+        }
+
+
+slow_queries = SlowQueryLog()
+
+
+def _record_statement(conn, sql, parameters, elapsed, rows):
+    route = _request.get()[0]
+    labels = (route,) + statement_labels(sql)
+    SQL_SECONDS.observe(elapsed, labels)
+    if rows:
+        SQL_ROWS.inc(rows, labels)
+    if slow_queries.threshold is not None and elapsed >= slow_queries.threshold:
+        slow_queries.record(conn, sql, parameters, elapsed, rows, route)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute() through the fetch calls that drain it.
+
+    A statement is recorded once its rows are exhausted, or when the cursor
+    is re-executed, closed or collected. Rows are counted by fetchone(),
+    fetchmany() and fetchall(); iterating a cursor directly is not
+    intercepted (a Python __next__ would cost more per row than it measures),
+    so such statements are timed up to the first row only.
+    """
+
+    __slots__ = ('_pending',)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._pending = None
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            _record_statement(self.connection, *pending)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except BaseException:
+            _record_statement(self.connection, sql, parameters, time.perf_counter() - started, 0)
+            raise
+        self._pending = [sql, parameters, time.perf_counter() - started, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(self.connection, sql, (), time.perf_counter() - started, 0)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - started
+            if row is None:
+                self._finish()
+            else:
+                pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - started
+            pending[3] += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - started
+            pending[3] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose statements and commits are recorded in SQL_SECONDS"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _record_statement(self, 'COMMIT', (), time.perf_counter() - started, 0)
+
+
+def _flatten(prefix, value, labels, out):
+    """Numeric leaves of a stats() dict as (name, labels, value); dicts of dicts become labelled series"""
+    if isinstance(value, bool):
+        out.append((prefix, labels, int(value)))
+    elif isinstance(value, (int, float)):
+        out.append((prefix, labels, value))
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, dict) and all(isinstance(v, dict) for v in value.values()):
+                # e.g. single_flight endpoints: {'search': {...}} -> endpoint="search"
+                _flatten(prefix, item, labels + ((prefix.rsplit('_', 1)[-1].rstrip('s'), key),), out)
+            else:
+                _flatten(f'{prefix}_{key}', item, labels, out)
+
+
+def render(components):
+    """Prometheus text exposition of the histograms plus every numeric field of components' stats"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    samples = []
+    for component, stats in components.items():
+        if stats is not None:
+            _flatten(f'anufa_{component}', stats, (), samples)
+    # A metric's samples must be contiguous; sort is stable, so label order is kept
+    samples.sort(key=lambda sample: sample[0])
+    seen = set()
+    for name, labels, value in samples:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f'# TYPE {name} gauge')
+        label_text = ','.join(f'{key}="{_escape(item)}"' for key, item in labels)
+        lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,179 @@
+"""
+ANUFA AI E-commerce Platform - Schema migrations
+Versioned, idempotent schema steps shared by the API server and database_setup.py
+"""
+
+import analytics
+import cart
+import catalog_cache
+import product_filters
+import recommendations
+import search_index
+import similar_products
+from schema_indexes import INDEXES, index_sql
+
+CORE_TABLES = [
+    # Users table
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+
+    # Categories table
+    '''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+
+    # Products table
+    '''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        price REAL NOT NULL,
+        category_id INTEGER,
+        sku TEXT UNIQUE NOT NULL,
+        stock_quantity INTEGER DEFAULT 0,
+        is_featured INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES categories (id)
+    )
+    ''',
+
+    # Cart table
+    '''
+    CREATE TABLE IF NOT EXISTS cart (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER DEFAULT 1,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+    ''',
+
+    # Orders table
+    '''
+    CREATE TABLE IF NOT EXISTS orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        total_amount REAL NOT NULL,
+        status TEXT DEFAULT 'pending',
+        payment_method TEXT,
+        payment_status TEXT DEFAULT 'pending',
+        shipping_address TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''',
+
+    # Order items table
+    '''
+    CREATE TABLE IF NOT EXISTS order_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        price REAL NOT NULL,
+        FOREIGN KEY (order_id) REFERENCES orders (id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+    ''',
+
+    # AI Recommendations table
+    '''
+    CREATE TABLE IF NOT EXISTS ai_recommendations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        product_id INTEGER NOT NULL,
+        recommendation_type TEXT NOT NULL,
+        confidence_score REAL DEFAULT 0.0,
+        reasoning TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+    '''
+]
+
+
+def _create_core_tables(conn):
+    for table_sql in CORE_TABLES:
+        conn.execute(table_sql)
+
+
+def missing_indexes(conn):
+    """Names of declared indexes the database does not have"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [name for name in INDEXES if name not in existing]
+
+
+def create_indexes(conn):
+    """Create the declared indexes that do not exist yet; returns their names"""
+    missing = missing_indexes(conn)
+    for name in missing:
+        conn.execute(index_sql(name))
+    return missing
+
+
+# (version, description, step). Steps must be idempotent so databases created
+# before versioning existed (user_version 0) can be brought forward safely.
+# Append new steps; never edit or reorder released ones.
+MIGRATIONS = [
+    (1, 'Core tables', _create_core_tables),
+    (2, 'Product full-text search index', search_index.ensure_search_index),
+    (3, 'Catalog change counters', catalog_cache.ensure_catalog_versions),
+    (4, 'Unique cart lines per user and product', cart.ensure_unique_cart_lines),
+    (5, 'Product change log for the similarity index', similar_products.ensure_change_log),
+    (6, 'User behavior analytics rollups', analytics.ensure_rollups),
+    (7, 'Product listing indexes and facet counters', product_filters.ensure_product_facets),
+    (8, 'Declared secondary indexes (order items by order)', create_indexes),
+    (9, 'Cart change log for the recommendation engine', recommendations.ensure_cart_change_log),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the schema up to SCHEMA_VERSION; returns the descriptions of applied steps.
+
+    An up-to-date database costs a single PRAGMA read. Otherwise the steps
+    run in one write transaction, so concurrent workers wait for whichever
+    one migrates first and then find nothing left to do.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+
+    applied = []
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        current = schema_version(conn)
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(conn)
+            # user_version lives in the database header and is transactional
+            conn.execute(f'PRAGMA user_version = {version}')
+            applied.append(description)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return applied
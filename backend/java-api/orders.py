@@ -0,0 +1,73 @@
+"""
+ANUFA AI E-commerce Platform - Checkout
+Turns a cart into an order with conditional stock decrements, so stock can never go negative
+"""
+
+
+class CheckoutError(Exception):
+    """Checkout cannot proceed; the transaction must be rolled back"""
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class InsufficientStock(CheckoutError):
+    def __init__(self, product_ids):
+        super().__init__(f'Insufficient stock for products {product_ids}')
+        self.product_ids = product_ids
+
+
+def place_order(conn, user_id, payment_method=None, shipping_address=None):
+    """Create an order from the user's cart; returns the order as a dict.
+
+    Must run inside a write transaction (BEGIN IMMEDIATE). Each stock
+    decrement only applies while enough stock remains, so when any line
+    fails InsufficientStock is raised and the caller rolls everything back.
+    """
+    lines = conn.execute('''
+        SELECT ci.product_id, ci.quantity, p.price
+        FROM cart ci
+        JOIN products p ON p.id = ci.product_id
+        WHERE ci.user_id = ? AND ci.quantity > 0
+        ORDER BY ci.product_id
+    ''', (user_id,)).fetchall()
+    if not lines:
+        raise EmptyCart('Cart is empty')
+
+    short = []
+    for product_id, quantity, _ in lines:
+        cursor = conn.execute(
+            'UPDATE products SET stock_quantity = stock_quantity - ? WHERE id = ? AND stock_quantity >= ?',
+            (quantity, product_id, quantity)
+        )
+        if cursor.rowcount == 0:
+            short.append(product_id)
+    if short:
+        raise InsufficientStock(short)
+
+    total = round(sum(quantity * price for _, quantity, price in lines), 2)
+    order_id = conn.execute('''
+        INSERT INTO orders (user_id, total_amount, status, payment_method, payment_status, shipping_address)
+        VALUES (?, ?, 'pending', ?, 'pending', ?)
+    ''', (user_id, total, payment_method, shipping_address)).lastrowid
+
+    conn.executemany(
+        'INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)',
+        [(order_id, product_id, quantity, price) for product_id, quantity, price in lines]
+    )
+    conn.execute('DELETE FROM cart WHERE user_id = ?', (user_id,))
+
+    return {
+        'id': order_id,
+        'user_id': user_id,
+        'total_amount': total,
+        'status': 'pending',
+        'payment_method': payment_method,
+        'payment_status': 'pending',
+        'shipping_address': shipping_address,
+        'items': [
+            {'product_id': product_id, 'quantity': quantity, 'price': price}
+            for product_id, quantity, price in lines
+        ]
+    }
@@ -0,0 +1,120 @@
+"""
+ANUFA AI E-commerce Platform - Keyset pagination and streamed responses
+Opaque cursors over (sort key, id) and generators that never hold a full result set
+"""
+
+import base64
+import binascii
+import json
+import math
+
+from flask import Response
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+STREAM_BATCH_SIZE = 500
+
+# SQLite integers are signed 64-bit; larger Python ints overflow when bound
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def is_sql_value(value):
+    """True for a str, a finite float or an int that SQLite can bind as a parameter"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return INT64_MIN <= value <= INT64_MAX
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return isinstance(value, str)
+
+
+def parse_int64(value):
+    """int for a JSON integer or decimal string SQLite can bind; raises ValueError otherwise.
+
+    Unlike int(), booleans and floats such as 1.7 are rejected instead of
+    being truncated.
+    """
+    if isinstance(value, str) and value.strip().lstrip('+-').isdecimal():
+        value = int(value)
+    if type(value) is not int or not is_sql_value(value):
+        raise ValueError('not a 64-bit integer')
+    return value
+
+
+def encode_cursor(*values, scope=None):
+    """Encode the sort key values of the last row on a page as an opaque token.
+
+    scope, if given, names the ordering and filters the values belong to;
+    decode_cursor() then rejects the token for any other scope.
+    """
+    payload = list(values) if scope is None else {'scope': scope, 'after': values}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, arity, scope=None):
+    """Decode a token produced by encode_cursor(); raises ValueError if it is invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if scope is not None:
+        if not isinstance(values, dict) or values.get('scope') != scope:
+            raise ValueError('Cursor does not match the requested sort and filters')
+        values = values.get('after')
+    if not isinstance(values, list) or len(values) != arity or not all(map(is_sql_value, values)):
+        raise ValueError('Invalid cursor')
+    return tuple(values)
+
+
+def parse_page_args(args, arity, default_limit, max_limit=500, scope=None):
+    """Read limit/cursor/stream query parameters; raises ValueError on bad input"""
+    try:
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    limit = min(max(limit, 1), max_limit)
+
+    token = args.get('cursor')
+    after = decode_cursor(token, arity, scope) if token else None
+
+    stream = args.get('stream')
+    if stream and stream not in STREAM_FORMATS:
+        raise ValueError(f"stream must be one of: {', '.join(STREAM_FORMATS)}")
+
+    return limit, after, stream
+
+
+def stream_response(conn, cursor, encode, collection, fmt):
+    """Stream rows from an executed cursor as NDJSON or a chunked JSON document.
+
+    encode(row) renders one row as JSON text. The pooled connection is
+    released once the generator finishes or the client goes away.
+    """
+    def generate():
+        try:
+            if fmt == 'json':
+                yield '{"%s":[' % collection
+            first = True
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                if fmt == 'ndjson':
+                    yield ''.join(encode(row) + '\n' for row in rows)
+                else:
+                    chunk = ','.join(map(encode, rows))
+                    yield chunk if first else ',' + chunk
+                    first = False
+            if fmt == 'json':
+                yield ']}'
+        finally:
+            conn.close()
+
+    return Response(generate(), mimetype=STREAM_FORMATS[fmt])
@@ -0,0 +1,185 @@
+"""
+ANUFA AI E-commerce Platform - Password hashing
+Salted scrypt/PBKDF2 hashes computed on a bounded worker pool, with upgrade of legacy SHA-256 rows
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# KDF for new hashes: 'scrypt' or 'pbkdf2_sha256'
+KDF = os.environ.get('PASSWORD_KDF', 'scrypt')
+SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# hashlib releases the GIL while hashing, so threads use every core without starving request threads
+HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Hashes queued or running beyond this are refused instead of piling up behind a login storm
+HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 64))
+
+_LEGACY_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+
+class HashingBusy(Exception):
+    """Too many hashes are already queued; the caller should answer 503"""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _derive(kdf, params, password, salt):
+    if kdf == 'scrypt':
+        n, r, p = params
+        # maxmem must cover 128 * n * r bytes (plus slack) or OpenSSL refuses
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+    if kdf == 'pbkdf2_sha256':
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=HASH_BYTES)
+    raise ValueError(f'Unknown password KDF {kdf!r}')
+
+
+def _current_params():
+    return (SCRYPT_N, SCRYPT_R, SCRYPT_P) if KDF == 'scrypt' else (PBKDF2_ITERATIONS,)
+
+
+def hash_password(password):
+    """Encode a new salted hash as 'kdf$params$salt$hash'"""
+    params = _current_params()
+    salt = os.urandom(SALT_BYTES)
+    digest = _derive(KDF, params, password, salt)
+    return '$'.join([KDF, ','.join(str(value) for value in params), _b64(salt), _b64(digest)])
+
+
+def verify_password(password, stored):
+    """(matches, needs_rehash) for a stored hash, including legacy unsalted SHA-256 hex"""
+    if _LEGACY_SHA256.fullmatch(stored or ''):
+        expected = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(expected, stored), True
+    try:
+        kdf, params, salt, digest = stored.split('$')
+        params = tuple(int(value) for value in params.split(','))
+        matches = hmac.compare_digest(_derive(kdf, params, password, _unb64(salt)), _unb64(digest))
+    except (AttributeError, ValueError):
+        return False, False
+    return matches, matches and (kdf != KDF or params != _current_params())
+
+
+class Hasher:
+    """Runs hashing on a bounded thread pool and records latency and queue depth"""
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._lock = threading.Lock()
+        self._reset_state()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset_state(self):
+        self._executor = None
+        self._pending = 0
+        self.max_pending = 0
+        self.hashes = 0
+        self.verifications = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._hash_total = 0.0
+        self._hash_max = 0.0
+        self._wait_total = 0.0
+
+    def _after_fork(self):
+        # Pool threads do not survive a fork; the child creates its own on first use
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                self.rejected += 1
+                raise HashingBusy(f'{self._pending} password hashes already queued')
+            self._pending += 1
+            self.max_pending = max(self.max_pending, self._pending)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+            executor = self._executor
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._wait_total += started - submitted
+                    self._hash_total += elapsed
+                    self._hash_max = max(self._hash_max, elapsed)
+
+        try:
+            return executor.submit(timed).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password):
+        """New hash for password; raises HashingBusy when the queue is full"""
+        result = self._run(hash_password, password)
+        with self._lock:
+            self.hashes += 1
+        return result
+
+    def verify(self, password, stored):
+        """(matches, needs_rehash); a missing stored hash still costs one KDF run, so
+        response times do not reveal which usernames exist"""
+        result = self._run(verify_password, password, stored or _dummy_hash())
+        with self._lock:
+            self.verifications += 1
+        return result if stored else (False, False)
+
+    def record_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+
+    def stats(self):
+        """Hash latency and queue depth for this worker"""
+        with self._lock:
+            runs = self.hashes + self.verifications
+            return {
+                'kdf': KDF,
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'hashes': self.hashes,
+                'verifications': self.verifications,
+                'rehashed': self.rehashed,
+                'rejected': self.rejected,
+                'avg_hash_ms': round(self._hash_total / runs * 1000, 3) if runs else 0.0,
+                'max_hash_ms': round(self._hash_max * 1000, 3),
+                'avg_queue_wait_ms': round(self._wait_total / runs * 1000, 3) if runs else 0.0,
+            }
+
+
+_dummy = None
+
+
+def _dummy_hash():
+    global _dummy
+    if _dummy is None:
+        _dummy = hash_password(base64.b64encode(os.urandom(12)).decode())
+    return _dummy
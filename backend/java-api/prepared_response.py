@@ -0,0 +1,81 @@
+"""
+ANUFA AI E-commerce Platform - Pre-serialized catalog responses
+Encoded JSON bytes, a gzip variant and a strong ETag, built once per data version
+"""
+
+import gzip
+import hashlib
+import json
+import time
+
+from flask import Response
+
+import metrics
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 512
+GZIP_LEVEL = 6
+
+
+class PreparedResponse:
+    """Immutable response body with its validators, safe to share between requests"""
+
+    __slots__ = ('body', 'gzip_body', 'etag', 'gzip_etag', 'status')
+
+    def __init__(self, body, stamp, status=200):
+        started = time.perf_counter()
+        self.body = body
+        self.status = status
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        version = '.'.join(str(v) for v in stamp)
+        self.etag = f'"v{version}-{digest}"'
+        if len(body) >= GZIP_MIN_SIZE:
+            # mtime=0 keeps the compressed bytes identical across workers
+            self.gzip_body = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            self.gzip_etag = f'"v{version}-{digest}-gzip"'
+        else:
+            self.gzip_body = None
+            self.gzip_etag = None
+        metrics.observe_serialization('etag_gzip', started)
+
+    @classmethod
+    def from_payload(cls, payload, stamp, status=200):
+        return cls(json.dumps(payload, separators=(',', ':')).encode(), stamp, status)
+
+    def to_response(self, request):
+        """Answer a request with 304, the gzip variant or the identity body"""
+        use_gzip = self.gzip_body is not None and accepts_gzip(request.headers.get('Accept-Encoding', ''))
+        etag = self.gzip_etag if use_gzip else self.etag
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache',
+        }
+
+        if self.status == 200 and etag_matches(request.headers.get('If-None-Match'), (self.etag, self.gzip_etag)):
+            return Response(status=304, headers=headers)
+
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(self.gzip_body, status=self.status, headers=headers, mimetype='application/json')
+        return Response(self.body, status=self.status, headers=headers, mimetype='application/json')
+
+
+def accepts_gzip(accept_encoding):
+    """True unless the client omits gzip or refuses it with q=0"""
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip() in ('gzip', '*'):
+            params = params.replace(' ', '')
+            return params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def etag_matches(if_none_match, etags):
+    """Weak comparison of an If-None-Match header against our validators"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return any(etag in candidates for etag in etags if etag)
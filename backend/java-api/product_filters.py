@@ -0,0 +1,233 @@
+"""
+ANUFA AI E-commerce Platform - Product filters, sorts and facet counts
+Keyset-paginated listing queries served by partial indexes, with facet counters kept by triggers
+"""
+
+import hashlib
+import json
+
+from pagination import is_sql_value
+from schema_indexes import index_sql
+
+# Listing sorts: name -> (column, direction). Ties are broken by id in the same direction.
+SORTS = {
+    'id': ('p.id', 'ASC'),
+    'newest': ('p.id', 'DESC'),
+    'price_asc': ('p.price', 'ASC'),
+    'price_desc': ('p.price', 'DESC'),
+    'name': ('p.name', 'ASC'),
+}
+
+# Lower bounds of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = (0, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Category facet value for products without a category
+UNCATEGORIZED = 0
+
+
+def _price_bucket(column):
+    cases = ' '.join(
+        f'WHEN {column} < {upper} THEN {index}'
+        for index, upper in enumerate(PRICE_BUCKETS[1:])
+    )
+    return f'CASE {cases} ELSE {len(PRICE_BUCKETS) - 1} END'
+
+
+def _facet_rows(row):
+    """(facet, value) pairs a product row counts towards"""
+    return [
+        ('category', f'COALESCE({row}.category_id, {UNCATEGORIZED})'),
+        ('price', _price_bucket(f'{row}.price')),
+        ('featured', f'COALESCE({row}.is_featured, 0) != 0'),
+    ]
+
+
+def _adjust(row, delta):
+    return '\n'.join(
+        f'''
+        INSERT INTO product_facets (facet, value, count) VALUES ('{facet}', {value}, {delta})
+        ON CONFLICT (facet, value) DO UPDATE SET count = count + excluded.count;'''
+        for facet, value in _facet_rows(row)
+    )
+
+
+FACET_SCHEMA = [
+    # Listings only show products in stock, so the indexes skip the rest
+    index_sql('idx_products_instock_price'),
+    index_sql('idx_products_instock_name'),
+    index_sql('idx_products_instock_category'),
+    index_sql('idx_products_instock_category_price'),
+    index_sql('idx_products_instock_featured'),
+
+    # In-stock product counts per facet value
+    '''
+    CREATE TABLE IF NOT EXISTS product_facets (
+        facet TEXT NOT NULL,
+        value INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (facet, value)
+    ) WITHOUT ROWID
+    ''',
+
+    f'''
+    CREATE TRIGGER IF NOT EXISTS product_facets_insert AFTER INSERT ON products
+    WHEN new.stock_quantity > 0 BEGIN
+        {_adjust('new', 1)}
+    END
+    ''',
+
+    f'''
+    CREATE TRIGGER IF NOT EXISTS product_facets_delete AFTER DELETE ON products
+    WHEN old.stock_quantity > 0 BEGIN
+        {_adjust('old', -1)}
+    END
+    ''',
+
+    # Stock changes on every sale; only crossing zero touches the counters
+    f'''
+    CREATE TRIGGER IF NOT EXISTS product_facets_update
+    AFTER UPDATE OF category_id, price, stock_quantity, is_featured ON products
+    WHEN (old.stock_quantity > 0) != (new.stock_quantity > 0)
+      OR (new.stock_quantity > 0 AND (
+            old.category_id IS NOT new.category_id
+            OR old.price IS NOT new.price
+            OR old.is_featured IS NOT new.is_featured))
+    BEGIN
+        {_adjust('old', '-(old.stock_quantity > 0)')}
+        {_adjust('new', '(new.stock_quantity > 0)')}
+    END
+    ''',
+]
+
+
+def ensure_product_facets(conn):
+    """Create the listing indexes and facet counters, populating the counters"""
+    for statement in FACET_SCHEMA:
+        conn.execute(statement)
+    rebuild_product_facets(conn)
+
+
+def rebuild_product_facets(conn):
+    """Recount every facet from products; runs inside the caller's transaction"""
+    conn.execute('DELETE FROM product_facets')
+    for facet, value in _facet_rows('p'):
+        conn.execute(f'''
+            INSERT INTO product_facets (facet, value, count)
+            SELECT '{facet}', {value}, COUNT(*) FROM products p
+            WHERE p.stock_quantity > 0
+            GROUP BY 2
+        ''')
+
+
+def _flag(value):
+    if value.lower() in ('1', 'true', 'yes'):
+        return 1
+    if value.lower() in ('0', 'false', 'no'):
+        return 0
+    raise ValueError('featured must be true or false')
+
+
+def parse_listing_args(args):
+    """(conditions, params, sort) for /products filters; raises ValueError on bad input"""
+    conditions = ['p.stock_quantity > 0']
+    params = []
+    try:
+        if args.get('category_id'):
+            conditions.append('p.category_id = ?')
+            params.append(int(args['category_id']))
+        if args.get('min_price'):
+            conditions.append('p.price >= ?')
+            params.append(float(args['min_price']))
+        if args.get('max_price'):
+            conditions.append('p.price <= ?')
+            params.append(float(args['max_price']))
+    except ValueError:
+        raise ValueError('category_id, min_price and max_price must be numbers')
+    # Out-of-range ids overflow when bound, and NaN/inf prices match nothing useful
+    if not all(map(is_sql_value, params)):
+        raise ValueError('category_id must be a 64-bit integer and prices finite numbers')
+    if args.get('featured'):
+        conditions.append('p.is_featured = ?')
+        params.append(_flag(args['featured']))
+
+    sort = args.get('sort', 'id')
+    if sort not in SORTS:
+        raise ValueError(f'sort must be one of {", ".join(SORTS)}')
+    return conditions, params, sort
+
+
+def cursor_arity(sort):
+    """Sorts on id need only the id in the cursor; others carry (sort key, id)"""
+    return 1 if SORTS[sort][0] == 'p.id' else 2
+
+
+def cursor_scope(sort, conditions, params):
+    """Short digest of a listing's sort and filters, so a cursor only resumes the listing it came from"""
+    raw = json.dumps([sort, conditions, params], separators=(',', ':')).encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def listing_sql(select, conditions, params, sort, after):
+    """Keyset-paginated listing query and its parameters (without LIMIT)"""
+    column, direction = SORTS[sort]
+    conditions = list(conditions)
+    params = list(params)
+    if after:
+        comparison = '>' if direction == 'ASC' else '<'
+        if cursor_arity(sort) == 1:
+            conditions.append(f'p.id {comparison} ?')
+        else:
+            conditions.append(f'({column}, p.id) {comparison} (?, ?)')
+        params.extend(after)
+
+    order = f'p.id {direction}' if column == 'p.id' else f'{column} {direction}, p.id {direction}'
+    sql = f'''
+        SELECT {select}, p.id, {column}
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order}
+    '''
+    return sql, params
+
+
+def next_cursor_values(sort, row):
+    """Cursor values for the last row of a page selected by listing_sql"""
+    return (row[1],) if cursor_arity(sort) == 1 else (row[2], row[1])
+
+
+def facet_counts(conn):
+    """In-stock product counts by category, price bucket and featured flag.
+
+    These are catalog-wide counters kept by triggers; they ignore the
+    listing's own filters, so they describe what each facet would offer
+    rather than how the current result set splits.
+    """
+    counts = {'price': {}, 'featured': {}}
+    for facet, value, count in conn.execute(
+        "SELECT facet, value, count FROM product_facets WHERE facet IN ('price', 'featured')"
+    ).fetchall():
+        counts[facet][value] = count
+
+    categories = conn.execute('''
+        SELECT f.value, COALESCE(c.name, 'Uncategorized'), f.count
+        FROM product_facets f
+        LEFT JOIN categories c ON c.id = f.value
+        WHERE f.facet = 'category' AND f.count > 0
+        ORDER BY f.value
+    ''').fetchall()
+    return {
+        'categories': [
+            {'category_id': category_id if category_id != UNCATEGORIZED else None, 'name': name, 'count': count}
+            for category_id, name, count in categories
+        ],
+        'price_ranges': [
+            {
+                'min_price': PRICE_BUCKETS[bucket],
+                'max_price': PRICE_BUCKETS[bucket + 1] if bucket + 1 < len(PRICE_BUCKETS) else None,
+                'count': counts['price'].get(bucket, 0),
+            }
+            for bucket in range(len(PRICE_BUCKETS))
+        ],
+        'featured': counts['featured'].get(1, 0),
+    }
@@ -0,0 +1,108 @@
+"""
+ANUFA AI E-commerce Platform - Query plan check
+Collects the statements the API issues and flags those whose EXPLAIN QUERY PLAN scans a large table
+"""
+
+import re
+import sqlite3
+import threading
+
+import similar_products
+import suggest
+
+# Tables with fewer rows than this are cheap to scan whatever the plan says
+PLAN_CHECK_MIN_ROWS = 1000
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SOURCE = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NOT_ALIAS = {'where', 'join', 'left', 'inner', 'cross', 'natural', 'on', 'using', 'order', 'group', 'limit',
+              'union', 'having', 'window', 'set', 'values', 'returning', 'except', 'intersect'}
+_CHECKED = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def normalize(sql):
+    """Statement shape: literals replaced by ? and whitespace collapsed"""
+    return ' '.join(_LITERAL.sub('?', sql).split())
+
+
+# Whole-table reads that build the in-memory indexes (co-purchase, similarity,
+# suggest) on first use and after bulk changes; they scan by design
+BULK_READS = {
+    normalize('SELECT user_id, product_id FROM cart WHERE quantity > 0'),
+    normalize('SELECT id FROM products'),
+    normalize(similar_products.PRODUCT_TEXT_SQL + ' ORDER BY p.id'),
+    normalize(suggest.PRODUCT_SQL + ' ORDER BY is_featured DESC, stock_quantity > 0 DESC, id DESC LIMIT 0'),
+}
+
+
+class StatementLog:
+    """set_trace_callback() target keeping one example of each statement shape.
+
+    Traced statements arrive with their parameters expanded, so an example
+    can be explained as is. Statements run inside triggers are reported by
+    SQLite as comments and are skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = {}
+
+    def __call__(self, sql):
+        words = sql.split(None, 1)
+        if not words or words[0].upper() not in _CHECKED:
+            return
+        shape = normalize(sql)
+        with self._lock:
+            self.statements.setdefault(shape, sql)
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN detail lines for sql, outermost loop first"""
+    return [row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+
+
+def _tables(sql):
+    """{alias or name: table} for every table the statement reads"""
+    tables = {}
+    for table, alias in _SOURCE.findall(sql):
+        tables[table.lower()] = table.lower()
+        if alias and alias.lower() not in _NOT_ALIAS:
+            tables[alias.lower()] = table.lower()
+    return tables
+
+
+def full_scans(conn, statements, min_rows=PLAN_CHECK_MIN_ROWS):
+    """(statement, plan detail) for every table scan of min_rows or more rows in the statements' plans.
+
+    A scan is allowed when it is the statement's outer loop, rows come out
+    in the requested order (no temp B-tree) and a LIMIT stops the walk,
+    e.g. the first page of /products in id order. Scans of FTS virtual
+    tables are MATCH lookups and BULK_READS scan on purpose.
+    """
+    row_counts = {}
+    found = []
+    for sql in statements:
+        if normalize(sql) in BULK_READS:
+            continue
+        try:
+            plan = explain(conn, sql)
+        except sqlite3.Error as e:
+            found.append((sql, f'EXPLAIN failed: {e}'))
+            continue
+        tables = _tables(sql)
+        bounded = re.search(r'\bLIMIT\s+\S+\s*$', sql.strip(), re.IGNORECASE) is not None \
+            and not any('TEMP B-TREE' in detail for detail in plan)
+        loops = [index for index, detail in enumerate(plan) if detail.startswith(('SCAN ', 'SEARCH '))]
+        for index, detail in enumerate(plan):
+            if not detail.startswith('SCAN ') or 'VIRTUAL TABLE' in detail:
+                continue
+            table = tables.get(detail.split()[1].lower())
+            if table is None:
+                # Subqueries, CTEs and constant rows
+                continue
+            if table not in row_counts:
+                row_counts[table] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            if row_counts[table] < min_rows or (bounded and index == loops[0]):
+                continue
+            found.append((sql, f'{detail} ({row_counts[table]:,} rows in {table})'))
+    return found
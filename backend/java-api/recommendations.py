@@ -0,0 +1,482 @@
+"""
+ANUFA AI E-commerce Platform - Co-purchase recommendation engine
+Item-item cosine similarity from baskets (orders and carts), stored as a top-K neighbour table
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+TOP_K = int(os.environ.get('RECOMMENDATION_TOP_K', 20))
+REFRESH_INTERVAL = float(os.environ.get('RECOMMENDATION_REFRESH_SECONDS', 5))
+# Baskets larger than this add O(n^2) pairs and say little about affinity
+MAX_BASKET_SIZE = 200
+# Seeds taken from a user's cart and most recent purchases
+MAX_SEEDS = 50
+# Rows of changed co-occurrence kept beside the last built matrix; past this share
+# of the catalog they are merged back into it
+COMPACT_RATIO = 0.1
+# Cart change log entries kept; a worker that falls further behind rebuilds
+CART_LOG_SIZE = 100000
+# Ids per IN (...) lookup, well under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+# Users whose cart lines changed, appended by triggers from any connection or process.
+# A NULL user_id marks a bulk change (e.g. generated carts with triggers dropped) and
+# forces a full rebuild; older entries are then obsolete and removed.
+CART_CHANGE_LOG_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS cart_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS cart_changes_prune AFTER INSERT ON cart_changes BEGIN
+        DELETE FROM cart_changes WHERE seq <= new.seq - {CART_LOG_SIZE};
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cart_changes_insert AFTER INSERT ON cart
+    WHEN new.quantity > 0 BEGIN
+        INSERT INTO cart_changes (user_id) VALUES (new.user_id);
+    END
+    ''',
+    # Quantity changes only matter when a line appears in or leaves the basket
+    '''
+    CREATE TRIGGER IF NOT EXISTS cart_changes_update AFTER UPDATE OF user_id, product_id, quantity ON cart
+    WHEN (old.quantity > 0) != (new.quantity > 0) OR old.product_id != new.product_id
+        OR old.user_id != new.user_id BEGIN
+        INSERT INTO cart_changes (user_id) VALUES (old.user_id);
+        INSERT INTO cart_changes (user_id) SELECT new.user_id WHERE new.user_id != old.user_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cart_changes_delete AFTER DELETE ON cart
+    WHEN old.quantity > 0 BEGIN
+        INSERT INTO cart_changes (user_id) VALUES (old.user_id);
+    END
+    ''',
+]
+
+CART_ROWS_SQL = 'SELECT user_id, product_id FROM cart WHERE quantity > 0'
+
+
+def ensure_cart_change_log(conn):
+    """Create the cart change log and its triggers"""
+    for statement in CART_CHANGE_LOG_SCHEMA:
+        conn.execute(statement)
+
+
+def mark_bulk_change(conn):
+    """Record that every cart may have changed; runs in the caller's transaction"""
+    seq = conn.execute('INSERT INTO cart_changes (user_id) VALUES (NULL)').lastrowid
+    conn.execute('DELETE FROM cart_changes WHERE seq < ?', (seq,))
+
+
+def basket_matrix(basket_keys, product_ids, item_ids):
+    """Binary basket x item CSR matrix; item_ids must be sorted and contain every product id"""
+    baskets, basket_index = np.unique(basket_keys, return_inverse=True)
+    item_index = np.searchsorted(item_ids, product_ids)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(item_index), dtype=np.float32), (basket_index, item_index)),
+        shape=(len(baskets), len(item_ids))
+    )
+    matrix.data[:] = 1  # repeated lines of one product count once
+
+    sizes = np.diff(matrix.indptr)
+    if (sizes > MAX_BASKET_SIZE).any():
+        keep = np.flatnonzero(sizes <= MAX_BASKET_SIZE)
+        matrix = matrix[keep]
+    return matrix
+
+
+def pair_counts(rows, item_ids):
+    """Item x item basket counts (diagonal = baskets per item) for (basket, product) rows"""
+    baskets = basket_matrix(rows[:, 0], rows[:, 1], item_ids)
+    return (baskets.T @ baskets).tocsr()
+
+
+def top_k(matrix, counts, row_ids=None, k=TOP_K):
+    """Cosine-normalise co-occurrence rows and keep the k best neighbours of each.
+
+    matrix holds the co-occurrence rows of row_ids (every row when None).
+    Returns (row_ids, neighbours[len(row_ids), k], scores) with -1 / 0.0 padding.
+    Fully vectorised: one lexsort over all non-zeros instead of a loop per row.
+    """
+    row_ids = np.arange(matrix.shape[0]) if row_ids is None else np.asarray(row_ids)
+    matrix = matrix.tocsr()
+
+    row_of = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    norms = np.sqrt(counts[row_ids][row_of] * counts[matrix.indices])
+    scores = (matrix.data / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    # Ties go to the lower product position, so results do not depend on storage order
+    order = np.lexsort((matrix.indices, -scores, row_of))
+    sorted_rows = row_of[order]
+    rank = np.arange(len(order)) - matrix.indptr[sorted_rows]
+    keep = rank < k
+
+    neighbours = np.full((len(row_ids), k), -1, dtype=np.int32)
+    top_scores = np.zeros((len(row_ids), k), dtype=np.float32)
+    neighbours[sorted_rows[keep], rank[keep]] = matrix.indices[order][keep]
+    top_scores[sorted_rows[keep], rank[keep]] = scores[order][keep]
+    return row_ids, neighbours, top_scores
+
+
+_NO_INDICES = np.zeros(0, dtype=np.int32)
+_NO_DATA = np.zeros(0, dtype=np.float32)
+
+
+class RebuildNeeded(Exception):
+    """The logged changes cannot be applied incrementally"""
+
+
+class RecommendationEngine:
+    """Top-K co-purchase neighbours per product, refreshed incrementally from new order_items and cart_changes.
+
+    Co-occurrence is the matrix of the last full build plus an overlay of the
+    rows changed since, so a refresh touches only the products in new orders
+    or changed carts and the rows that co-occur with them. Refreshes and
+    rebuilds run in a background thread on a connection from connect(); a
+    request only waits for the very first build.
+    """
+
+    def __init__(self, top_k=TOP_K, refresh_interval=REFRESH_INTERVAL, connect=None):
+        self.k = top_k
+        self.refresh_interval = refresh_interval
+        # Returns a connection usable as a context manager, e.g. ConnectionPool.acquire
+        self.connect = connect
+        self._lock = threading.RLock()
+        self._refreshing = threading.Lock()
+        self.item_ids = np.zeros(0, dtype=np.int64)
+        self.neighbours = np.zeros((0, top_k), dtype=np.int32)
+        self.scores = np.zeros((0, top_k), dtype=np.float32)
+        self.counts = np.zeros(0, dtype=np.float64)
+        self.popular = np.zeros(0, dtype=np.int32)
+        # Off-diagonal co-occurrence of the last build, and {row: (indices, data)} changed since
+        self._base = None
+        self._overlay = {}
+        self._pairs = 0
+        # {user_id: item positions} of every open cart, to diff against on change
+        self._carts = {}
+        self._high_water = 0
+        self._cart_high_water = 0
+        self._built = False
+        self._last_check = 0.0
+        self.build_seconds = 0.0
+        self.refresh_seconds = 0.0
+        self.incremental_refreshes = 0
+        self.full_rebuilds = 0
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A refresh thread of the parent does not exist in the child
+        self._lock = threading.RLock()
+        self._refreshing = threading.Lock()
+
+    def build(self, conn):
+        """Full rebuild from every order and cart"""
+        started = time.perf_counter()
+        high_water = conn.execute('SELECT COALESCE(MAX(id), 0) FROM order_items').fetchone()[0]
+        cart_high_water = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM cart_changes').fetchone()[0]
+        order_rows = np.array(conn.execute(
+            'SELECT order_id, product_id FROM order_items WHERE id <= ?', (high_water,)
+        ).fetchall(), dtype=np.int64).reshape(-1, 2)
+        cart_rows = np.array(conn.execute(CART_ROWS_SQL).fetchall(), dtype=np.int64).reshape(-1, 2)
+        product_ids = np.array([row[0] for row in conn.execute('SELECT id FROM products')], dtype=np.int64)
+
+        item_ids = np.unique(np.concatenate([product_ids, order_rows[:, 1], cart_rows[:, 1]]))
+        pairs = pair_counts(order_rows, item_ids) + pair_counts(cart_rows, item_ids)
+        counts = pairs.diagonal().astype(np.float64)
+        pairs.setdiag(0)
+        pairs.eliminate_zeros()
+        _, neighbours, scores = top_k(pairs, counts, k=self.k)
+        popular = np.argsort(-counts, kind='stable').astype(np.int32)
+
+        carts = {}
+        if len(cart_rows):
+            cart_rows = cart_rows[np.lexsort((cart_rows[:, 1], cart_rows[:, 0]))]
+            users, starts = np.unique(cart_rows[:, 0], return_index=True)
+            positions = np.searchsorted(item_ids, cart_rows[:, 1]).astype(np.int32)
+            for user_id, basket in zip(users.tolist(), np.split(positions, starts[1:])):
+                carts[user_id] = np.unique(basket)
+
+        with self._lock:
+            self.item_ids = item_ids
+            self.counts = counts
+            self.neighbours = neighbours
+            self.scores = scores
+            self.popular = popular
+            self._base = pairs
+            self._overlay = {}
+            self._pairs = int(pairs.nnz)
+            self._carts = carts
+            self._high_water = high_water
+            self._cart_high_water = cart_high_water
+            self._built = True
+            self.full_rebuilds += 1
+        self.build_seconds = time.perf_counter() - started
+
+    def refresh(self, conn):
+        """Apply orders placed and carts changed since the last build/refresh; returns the products re-ranked.
+
+        Orders only ever add baskets; changed carts are re-read and diffed
+        against the basket last seen for that user, which also drops a cart
+        once it has become an order. A score depends on both products'
+        totals, so every row that co-occurs with a changed product is
+        re-ranked. Products added past the end of the index are appended; a
+        bulk change, an out-of-order product id or a cart log that was
+        pruned past this worker's position trigger a full rebuild.
+        """
+        try:
+            return self._refresh(conn)
+        except RebuildNeeded:
+            self.build(conn)
+            return len(self.item_ids)
+
+    def _refresh(self, conn):
+        started = time.perf_counter()
+        orders = np.array(conn.execute(
+            'SELECT id, order_id, product_id FROM order_items WHERE id > ? ORDER BY id', (self._high_water,)
+        ).fetchall(), dtype=np.int64).reshape(-1, 3)
+        log = conn.execute(
+            'SELECT seq, user_id FROM cart_changes WHERE seq > ? ORDER BY seq', (self._cart_high_water,)
+        ).fetchall()
+        if log and (log[0][0] != self._cart_high_water + 1 or any(user_id is None for _, user_id in log)):
+            raise RebuildNeeded()
+
+        user_ids = sorted({user_id for _, user_id in log})
+        cart_rows = []
+        for start in range(0, len(user_ids), LOOKUP_CHUNK):
+            chunk = user_ids[start:start + LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            cart_rows += conn.execute(
+                f'SELECT user_id, product_id FROM cart WHERE user_id IN ({placeholders}) AND quantity > 0', chunk
+            ).fetchall()
+        cart_rows = np.array(cart_rows, dtype=np.int64).reshape(-1, 2)
+
+        self._add_items(np.concatenate([orders[:, 2], cart_rows[:, 1]]))
+        item_ids = self.item_ids
+        new_orders = np.column_stack([orders[:, 1], np.searchsorted(item_ids, orders[:, 2])])
+        new_carts = np.column_stack([cart_rows[:, 0], np.searchsorted(item_ids, cart_rows[:, 1])])
+        old_carts = [(user_id, position) for user_id in user_ids for position in self._carts.get(user_id, ())]
+        old_carts = np.array(old_carts, dtype=np.int64).reshape(-1, 2)
+
+        # Pair count changes over just the products involved
+        involved = np.unique(np.concatenate([new_orders[:, 1], new_carts[:, 1], old_carts[:, 1]]))
+        delta = (pair_counts(new_orders, involved) + pair_counts(new_carts, involved)
+                 - pair_counts(old_carts, involved)).tocoo()
+        keep = delta.data != 0
+        rows, cols, values = involved[delta.row[keep]], involved[delta.col[keep]], delta.data[keep]
+        changed = np.unique(rows)
+
+        diagonal = rows == cols
+        updated = self._merge_rows(rows[~diagonal], cols[~diagonal], values[~diagonal])
+        carts = {user_id: [] for user_id in user_ids}
+        for user_id, position in new_carts.tolist():
+            carts[user_id].append(position)
+        carts = {user_id: np.unique(np.array(positions, dtype=np.int32)) for user_id, positions in carts.items()}
+
+        with self._lock:
+            self.counts[rows[diagonal]] += values[diagonal]
+            self._overlay.update(updated)
+            for user_id, basket in carts.items():
+                if len(basket):
+                    self._carts[user_id] = basket
+                else:
+                    self._carts.pop(user_id, None)
+            if len(orders):
+                self._high_water = int(orders[-1, 0])
+            if log:
+                self._cart_high_water = log[-1][0]
+        if not len(changed):
+            return 0
+
+        affected = np.union1d(changed, np.concatenate([self._row(row)[0] for row in changed]))
+        _, neighbours, scores = top_k(self._rows(affected), self.counts, row_ids=affected, k=self.k)
+        popular = np.argsort(-self.counts, kind='stable').astype(np.int32)
+        with self._lock:
+            self.neighbours[affected] = neighbours
+            self.scores[affected] = scores
+            self.popular = popular
+            self.incremental_refreshes += 1
+        if len(self._overlay) > COMPACT_RATIO * len(item_ids):
+            self._compact()
+        self.refresh_seconds = time.perf_counter() - started
+        return len(affected)
+
+    def _add_items(self, product_ids):
+        """Append products first seen in new orders or carts; raises RebuildNeeded unless they sort last"""
+        positions = np.minimum(np.searchsorted(self.item_ids, product_ids), max(len(self.item_ids) - 1, 0))
+        if not len(self.item_ids):
+            raise RebuildNeeded()
+        unseen = np.unique(product_ids[self.item_ids[positions] != product_ids])
+        if not len(unseen):
+            return
+        if unseen[0] < self.item_ids[-1]:
+            raise RebuildNeeded()
+        with self._lock:
+            self.item_ids = np.concatenate([self.item_ids, unseen])
+            self.counts = np.concatenate([self.counts, np.zeros(len(unseen))])
+            self.neighbours = np.vstack([self.neighbours, np.full((len(unseen), self.k), -1, dtype=np.int32)])
+            self.scores = np.vstack([self.scores, np.zeros((len(unseen), self.k), dtype=np.float32)])
+
+    def _row(self, row):
+        """(indices, data) of one co-occurrence row"""
+        entry = self._overlay.get(row)
+        if entry is not None:
+            return entry
+        base = self._base
+        if row >= base.shape[0]:
+            return _NO_INDICES, _NO_DATA
+        start, end = base.indptr[row], base.indptr[row + 1]
+        return base.indices[start:end], base.data[start:end]
+
+    def _rows(self, rows):
+        """CSR matrix of the given co-occurrence rows"""
+        parts = [self._row(row) for row in rows]
+        indptr = np.concatenate([[0], np.cumsum([len(indices) for indices, _ in parts])])
+        return sparse.csr_matrix(
+            (np.concatenate([data for _, data in parts]), np.concatenate([indices for indices, _ in parts]), indptr),
+            shape=(len(rows), len(self.item_ids))
+        )
+
+    def _merge_rows(self, rows, cols, values):
+        """{row: (indices, data)} for the rows with co-occurrence changes, deltas added"""
+        updated = {}
+        order = np.argsort(rows, kind='stable')
+        rows, cols, values = rows[order], cols[order], values[order]
+        unique_rows, starts = np.unique(rows, return_index=True)
+        for row, row_cols, row_values in zip(unique_rows.tolist(), np.split(cols, starts[1:]),
+                                             np.split(values, starts[1:])):
+            indices, data = self._row(row)
+            merged, inverse = np.unique(np.concatenate([indices, row_cols]), return_inverse=True)
+            sums = np.bincount(inverse, weights=np.concatenate([data, row_values])).astype(np.float32)
+            nonzero = sums != 0
+            updated[row] = (merged[nonzero].astype(np.int32), sums[nonzero])
+            self._pairs += int(nonzero.sum()) - len(indices)
+        return updated
+
+    def _compact(self):
+        """Merge the overlay into a new base matrix"""
+        base, overlay = self._base, self._overlay
+        size = len(self.item_ids)
+        indptr = np.concatenate([base.indptr, np.full(size - base.shape[0], base.indptr[-1])])
+        base = sparse.csr_matrix((base.data, base.indices, indptr), shape=(size, size))
+        keep = np.ones(size, dtype=np.float32)
+        rows = np.array(sorted(overlay), dtype=np.int64)
+        keep[rows] = 0
+        lengths = np.zeros(size, dtype=np.int64)
+        lengths[rows] = [len(overlay[row][0]) for row in rows.tolist()]
+        patch = sparse.csr_matrix(
+            (np.concatenate([overlay[row][1] for row in rows.tolist()]),
+             np.concatenate([overlay[row][0] for row in rows.tolist()]),
+             np.concatenate([[0], np.cumsum(lengths)])),
+            shape=(size, size)
+        )
+        compacted = (sparse.diags(keep) @ base + patch).tocsr()
+        with self._lock:
+            self._base = compacted
+            self._overlay = {}
+
+    def ensure_fresh(self):
+        """Build on first use, then poll for changes in the background at most every refresh_interval seconds"""
+        if not self._built:
+            with self._refreshing:
+                if not self._built:
+                    with self.connect() as conn:
+                        self.build(conn)
+                    self._last_check = time.monotonic()
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return
+        # Only one thread refreshes; requests keep serving the current index meanwhile
+        if self._refreshing.acquire(blocking=False):
+            self._last_check = now
+            threading.Thread(target=self._refresh_in_background, name='recommendations-refresh',
+                             daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            with self.connect() as conn:
+                self.refresh(conn)
+        finally:
+            self._refreshing.release()
+
+    def recommend(self, seed_product_ids, limit=8, exclude=()):
+        """Rank products by summed similarity to the seeds; returns [(product_id, score, reason)]"""
+        with self._lock:
+            item_ids = self.item_ids
+            if not len(item_ids):
+                return []
+            seeds = np.asarray(list(seed_product_ids), dtype=np.int64)
+            positions = np.searchsorted(item_ids, seeds)
+            valid = positions < len(item_ids)
+            positions = positions[valid][item_ids[positions[valid]] == seeds[valid]]
+
+            results = []
+            skip = set(int(p) for p in exclude) | set(int(p) for p in seeds)
+            if len(positions):
+                neighbours = self.neighbours[positions].ravel()
+                weights = self.scores[positions].ravel()
+                mask = neighbours >= 0
+                # Aggregate over the seeds' neighbours only, never the whole catalog
+                candidates, inverse = np.unique(neighbours[mask], return_inverse=True)
+                totals = np.bincount(inverse, weights=weights[mask])
+                for position in np.argsort(-totals, kind='stable'):
+                    index = candidates[position]
+                    product_id = int(item_ids[index])
+                    if product_id not in skip:
+                        results.append((product_id, round(float(totals[position]), 4), 'Frequently bought together'))
+                        skip.add(product_id)
+                        if len(results) >= limit:
+                            return results
+
+            # Top up with the most purchased products
+            top = float(self.counts[self.popular[0]]) if len(self.popular) else 0.0
+            for index in self.popular[:limit + len(skip)]:
+                product_id = int(item_ids[index])
+                if product_id not in skip:
+                    score = round(float(self.counts[index]) / top, 4) if top else 0.0
+                    results.append((product_id, score, 'Popular right now'))
+                    skip.add(product_id)
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'products': int(len(self.item_ids)),
+                'cooccurrence_pairs': self._pairs,
+                'changed_rows': len(self._overlay),
+                'top_k': self.k,
+                'index_bytes': int(self.neighbours.nbytes + self.scores.nbytes + self.item_ids.nbytes),
+                'build_seconds': round(self.build_seconds, 4),
+                'refresh_seconds': round(self.refresh_seconds, 4),
+                'full_rebuilds': self.full_rebuilds,
+                'incremental_refreshes': self.incremental_refreshes,
+                'high_water_order_item': int(self._high_water),
+                'high_water_cart_change': int(self._cart_high_water),
+            }
+
+
+def user_seed_products(conn, user_id):
+    """Products in the user's cart and most recent orders"""
+    rows = conn.execute('''
+        SELECT product_id FROM cart WHERE user_id = ?
+        UNION
+        SELECT product_id FROM (
+            SELECT oi.product_id FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id
+            WHERE o.user_id = ?
+            ORDER BY o.id DESC
+            LIMIT ?
+        )
+    ''', (user_id, user_id, MAX_SEEDS)).fetchall()
+    return [row[0] for row in rows]
@@ -0,0 +1,94 @@
+"""
+ANUFA AI E-commerce Platform - Sample data
+Demo catalog, users, carts and orders; only loaded when explicitly requested
+"""
+
+import passwords
+
+CATEGORIES = [
+    (1, 'Electronics', 'Electronic devices and gadgets'),
+    (2, 'Clothing', 'Fashion and apparel'),
+    (3, 'Books', 'Books and educational materials'),
+    (4, 'Home & Garden', 'Home improvement supplies'),
+    (5, 'Sports', 'Sports and fitness equipment')
+]
+
+PRODUCTS = [
+    (1, 'Smartphone Pro Max', 'Latest flagship smartphone with AI-powered camera', 999.99, 1, 'PHONE-001', 50, 1),
+    (2, 'Wireless Headphones', 'Premium noise-cancelling headphones', 299.99, 1, 'AUDIO-001', 25, 1),
+    (3, 'Ultra-Slim Laptop', 'High-performance laptop for professionals', 1299.99, 1, 'LAPTOP-001', 15, 1),
+    (4, 'Smart Watch', 'Advanced smartwatch with health monitoring', 399.99, 1, 'WATCH-001', 30, 0),
+    (5, 'Organic Cotton T-Shirt', 'Comfortable organic cotton t-shirt', 29.99, 2, 'SHIRT-001', 100, 0),
+    (6, 'Designer Jeans', 'Premium denim jeans with perfect fit', 89.99, 2, 'JEANS-001', 75, 0),
+    (7, 'Running Shoes Pro', 'Professional running shoes', 149.99, 2, 'SHOES-001', 60, 1),
+    (8, 'Programming Guide', 'Complete guide to modern programming', 49.99, 3, 'BOOK-001', 40, 0),
+    (9, 'AI & ML Handbook', 'Comprehensive AI and Machine Learning guide', 59.99, 3, 'BOOK-002', 35, 0),
+    (10, 'Garden Tools Set', 'Professional gardening tools set', 129.99, 4, 'GARDEN-001', 20, 0)
+]
+
+# Sample users (password: "password123")
+USERS = [
+    (1, 'johndoe', 'john@example.com', 'John', 'Doe'),
+    (2, 'janesmit', 'jane@example.com', 'Jane', 'Smith'),
+    (3, 'bobwilson', 'bob@example.com', 'Bob', 'Wilson')
+]
+SAMPLE_PASSWORD = 'password123'
+
+CART_ITEMS = [
+    (1, 1, 1, 2),  # John has 2 smartphones
+    (2, 1, 2, 1),  # John has 1 headphones
+    (3, 2, 3, 1),  # Jane has 1 laptop
+]
+
+ORDERS = [
+    (1, 1, 1599.98, 'completed', 'credit_card', 'paid', '123 Main St, New York, NY'),
+    (2, 2, 1299.99, 'pending', 'paypal', 'pending', '456 Oak Ave, Los Angeles, CA'),
+]
+
+AI_RECOMMENDATIONS = [
+    (1, 1, 4, 'similar_product', 0.85, 'Users who bought smartphones also liked smartwatches'),
+    (2, 1, 5, 'content_based', 0.72, 'Based on electronics preference'),
+    (3, 2, 6, 'collaborative', 0.90, 'Users with similar profiles liked this'),
+    (4, 3, 7, 'trending', 0.78, 'Currently trending in sports category'),
+]
+
+
+def insert_sample_data(conn):
+    """Insert the demo data; rows that already exist are left untouched"""
+    conn.executemany('INSERT OR IGNORE INTO categories (id, name, description) VALUES (?, ?, ?)', CATEGORIES)
+
+    conn.executemany('''
+        INSERT OR IGNORE INTO products
+        (id, name, description, price, category_id, sku, stock_quantity, is_featured)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', PRODUCTS)
+
+    # Only hash for users that are not there yet; each KDF run is deliberately slow
+    existing = {row[0] for row in conn.execute('SELECT id FROM users')}
+    conn.executemany('''
+        INSERT OR IGNORE INTO users
+        (id, username, email, password_hash, first_name, last_name)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (user_id, username, email, passwords.hash_password(SAMPLE_PASSWORD), first, last)
+        for user_id, username, email, first, last in USERS if user_id not in existing
+    ])
+
+    conn.executemany(
+        'INSERT OR IGNORE INTO cart (id, user_id, product_id, quantity) VALUES (?, ?, ?, ?)',
+        CART_ITEMS
+    )
+
+    conn.executemany('''
+        INSERT OR IGNORE INTO orders
+        (id, user_id, total_amount, status, payment_method, payment_status, shipping_address)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', ORDERS)
+
+    conn.executemany('''
+        INSERT OR IGNORE INTO ai_recommendations
+        (id, user_id, product_id, recommendation_type, confidence_score, reasoning)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', AI_RECOMMENDATIONS)
+
+    conn.commit()
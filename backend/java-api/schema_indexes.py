@@ -0,0 +1,30 @@
+"""
+ANUFA AI E-commerce Platform - Declared secondary indexes
+The single definition of every secondary index, used by the schema steps that create them and by migrations
+"""
+
+# Every secondary index the API's queries rely on, by name. The schema steps
+# that need one create it from here; migrations.create_indexes() adds whatever
+# is missing, and DatabaseSetup.apply_indexes() also runs it to restore any
+# that were dropped.
+INDEXES = {
+    # Listings only show products in stock, so the indexes skip the rest
+    'idx_products_instock_price': 'ON products (price) WHERE stock_quantity > 0',
+    'idx_products_instock_name': 'ON products (name) WHERE stock_quantity > 0',
+    'idx_products_instock_category': 'ON products (category_id) WHERE stock_quantity > 0',
+    'idx_products_instock_category_price': 'ON products (category_id, price) WHERE stock_quantity > 0',
+    'idx_products_instock_featured': 'ON products (is_featured) WHERE stock_quantity > 0',
+    # A user's cart, and one line per product in it
+    'idx_cart_user_product': 'ON cart (user_id, product_id)',
+    # Order history per user, then the items of those orders (recommendation seeds, checkout)
+    'idx_orders_user': 'ON orders (user_id)',
+    'idx_order_items_order': 'ON order_items (order_id)',
+    'idx_ai_recommendations_user_product': 'ON ai_recommendations (user_id, product_id)',
+    'idx_category_stats_revenue': 'ON category_stats (revenue)',
+}
+UNIQUE_INDEXES = {'idx_cart_user_product'}
+
+
+def index_sql(name):
+    unique = 'UNIQUE ' if name in UNIQUE_INDEXES else ''
+    return f'CREATE {unique}INDEX IF NOT EXISTS {name} {INDEXES[name]}'
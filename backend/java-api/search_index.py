@@ -0,0 +1,129 @@
+"""
+ANUFA AI E-commerce Platform - Full-text product search
+FTS5 index over product name, description and category, kept in sync by triggers
+"""
+
+import re
+
+from serializers import PRODUCT
+
+# Column weights for bm25(): name matches count most, then category, then description
+BM25_WEIGHTS = (10.0, 2.0, 4.0)
+
+FTS_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name,
+        description,
+        category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_update
+    AFTER UPDATE OF id, name, description, category_id ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+        INSERT INTO products_fts (rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    ''',
+
+    '''
+    CREATE TRIGGER IF NOT EXISTS categories_fts_update AFTER UPDATE OF name ON categories BEGIN
+        UPDATE products_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+    END
+    '''
+]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def ensure_search_index(conn):
+    """Create the FTS table and triggers, populating the index if it is new"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+    ).fetchone()
+
+    for statement in FTS_SCHEMA:
+        conn.execute(statement)
+
+    if not exists:
+        rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn):
+    """Repopulate the FTS index from products/categories and merge its b-trees.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    conn.execute('DELETE FROM products_fts')
+    conn.execute('''
+        INSERT INTO products_fts (rowid, name, description, category)
+        SELECT p.id, p.name, p.description, c.name
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+    ''')
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('optimize')")
+    return conn.execute('SELECT COUNT(*) FROM products_fts').fetchone()[0]
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every term is quoted and prefix-matched"""
+    terms = _TOKEN_RE.findall(text.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_products(conn, text, limit=None, after=None, in_stock=True):
+    """Execute a BM25-ranked search and return the cursor.
+
+    Rows are (PRODUCT json, id, score) ordered by (score, id); pass the
+    (score, id) of the last row seen as after to continue from it. Returns
+    None when text contains no searchable terms.
+    """
+    match = build_match_query(text)
+    if not match:
+        return None
+
+    stock_filter = 'AND p.stock_quantity > 0' if in_stock else ''
+    params = [*BM25_WEIGHTS, match]
+    keyset = ''
+    if after is not None:
+        keyset = 'WHERE score > ? OR (score = ? AND id > ?)'
+        params += [after[0], after[0], after[1]]
+    paging = ''
+    if limit is not None:
+        paging = 'LIMIT ?'
+        params.append(limit)
+
+    return conn.execute(f'''
+        SELECT * FROM (
+            SELECT {PRODUCT.json_column} AS json, p.id AS id,
+                   bm25(products_fts, ?, ?, ?) AS score
+            FROM products_fts
+            JOIN products p ON p.id = products_fts.rowid
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE products_fts MATCH ?
+            {stock_filter}
+        )
+        {keyset}
+        ORDER BY score, id
+        {paging}
+    ''', params)
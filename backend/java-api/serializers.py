@@ -0,0 +1,122 @@
+"""
+ANUFA AI E-commerce Platform - Row serializers
+Explicit column lists and row-to-JSON encoders compiled once per query shape
+"""
+
+import json
+import time
+from functools import lru_cache
+from operator import itemgetter
+from json.encoder import encode_basestring_ascii
+
+import metrics
+
+# How each field kind is rendered as a JSON value, in SQL and in Python
+_SQL_VALUES = {
+    'int': '{expr}',
+    'float': 'CAST({expr} AS REAL)',
+    'str': '{expr}',
+    'bool': "CASE WHEN {expr} THEN json('true') ELSE json('false') END",
+}
+
+_PY_VALUES = {
+    'int': "'null' if {v} is None else {v}",
+    # float() first: SQLite hands back INTEGER for whole-number prices stored as 10
+    'float': "'null' if {v} is None else repr(float({v}))",
+    'str': "'null' if {v} is None else _str({v})",
+    'bool': "'true' if {v} else 'false'",
+}
+
+_DICT_VALUES = {
+    'float': 'None if {v} is None else float({v})',
+    'bool': 'bool({v})',
+}
+
+
+class RowSerializer:
+    """Maps one SELECT shape to JSON text or dicts.
+
+    fields is a sequence of (json_key, sql_expression, kind). There are two
+    ways to use it:
+
+    - select json_column and SQLite renders each row as a JSON object in C,
+      so Python only joins strings (the fast path for list responses);
+    - select select_list and run rows through encode()/to_dict().
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.keys = tuple(key for key, _, _ in self.fields)
+        self.select_list = ', '.join(
+            expr if expr.rsplit('.', 1)[-1] == key else f'{expr} AS {key}'
+            for key, expr, _ in self.fields
+        )
+        self.json_column = 'json_object(' + ', '.join(
+            f"'{key}', " + _SQL_VALUES[kind].format(expr=expr)
+            for key, expr, kind in self.fields
+        ) + ')'
+        self.encode, self.to_dict = _compile(self.fields)
+
+    def encode_rows(self, rows):
+        """JSON array body (without brackets) for select_list rows"""
+        return ','.join(map(self.encode, rows))
+
+
+# Row encoder for queries that select json_column first
+json_text = itemgetter(0)
+
+
+def json_rows(rows):
+    """JSON array body (without brackets) for rows whose first column is json_column"""
+    return ','.join([row[0] for row in rows])
+
+
+@lru_cache(maxsize=None)
+def _compile(fields):
+    """Generate straight-line encode()/to_dict() functions for a field tuple"""
+    template = '{' + ','.join(f'{json.dumps(key)}:%s' for key, _, _ in fields) + '}'
+    values = [_PY_VALUES[kind].format(v=f'row[{i}]') for i, (_, _, kind) in enumerate(fields)]
+    dict_items = [
+        f'{key!r}: ' + _DICT_VALUES.get(kind, '{v}').format(v=f'row[{i}]')
+        for i, (key, _, kind) in enumerate(fields)
+    ]
+
+    source = (
+        'def encode(row):\n'
+        f"    return {template!r} % ({', '.join(f'({v})' for v in values)},)\n"
+        'def to_dict(row):\n'
+        f"    return {{{', '.join(dict_items)}}}\n"
+    )
+    namespace = {'_str': encode_basestring_ascii}
+    exec(compile(source, f'<serializer {",".join(key for key, _, _ in fields)}>', 'exec'), namespace)
+    return namespace['encode'], namespace['to_dict']
+
+
+def envelope(collection, rows_json, **extra):
+    """Encode {collection: [rows...], **extra} as UTF-8 bytes"""
+    started = time.perf_counter()
+    body = '{' + json.dumps(collection) + ':[' + rows_json + ']'
+    for key, value in extra.items():
+        body += ',' + json.dumps(key) + ':' + json.dumps(value, separators=(',', ':'))
+    body = (body + '}').encode()
+    metrics.observe_serialization('envelope', started)
+    return body
+
+
+PRODUCT = RowSerializer([
+    ('id', 'p.id', 'int'),
+    ('name', 'p.name', 'str'),
+    ('description', 'p.description', 'str'),
+    ('price', 'p.price', 'float'),
+    ('category_id', 'p.category_id', 'int'),
+    ('sku', 'p.sku', 'str'),
+    ('stock_quantity', 'p.stock_quantity', 'int'),
+    ('is_featured', 'p.is_featured', 'bool'),
+    ('category_name', 'c.name', 'str'),
+])
+
+CATEGORY = RowSerializer([
+    ('id', 'id', 'int'),
+    ('name', 'name', 'str'),
+    ('description', 'description', 'str'),
+])
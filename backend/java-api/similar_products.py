@@ -0,0 +1,343 @@
+"""
+ANUFA AI E-commerce Platform - Content-based similar products
+Hashed TF-IDF vectors over name, description and category with a precomputed top-K neighbour table
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+TOP_K = int(os.environ.get('SIMILAR_TOP_K', 20))
+REFRESH_INTERVAL = float(os.environ.get('SIMILAR_REFRESH_SECONDS', 5))
+# Hashed feature space: unigrams, word bigrams and the category name
+FEATURES = 2 ** 20
+# Rows per sparse matrix product while ranking neighbours
+BATCH_SIZE = 2048
+# Features shared by more than this many products are treated as stop words: they
+# add little signal but make every pair of products a candidate in X @ X.T
+STOP_DF = int(os.environ.get('SIMILAR_STOP_DF', 1000))
+# Incremental updates keep the IDF weights of the last full build; rebuild once
+# this share of the catalog has changed since
+REBUILD_RATIO = 0.1
+
+WORD = re.compile(r'\w+')
+
+# Products whose text changed, appended by triggers from any connection or process.
+# A NULL product_id marks a bulk change (e.g. an import with triggers dropped) and
+# forces a full rebuild; older entries are then obsolete and removed.
+CHANGE_LOG_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS product_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS product_changes_insert AFTER INSERT ON products BEGIN
+        INSERT INTO product_changes (product_id) VALUES (new.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS product_changes_update
+    AFTER UPDATE OF id, name, description, category_id ON products BEGIN
+        INSERT INTO product_changes (product_id) VALUES (old.id);
+        INSERT INTO product_changes (product_id) SELECT new.id WHERE new.id != old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS product_changes_delete AFTER DELETE ON products BEGIN
+        INSERT INTO product_changes (product_id) VALUES (old.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS product_changes_category AFTER UPDATE OF name ON categories BEGIN
+        INSERT INTO product_changes (product_id) SELECT id FROM products WHERE category_id = new.id;
+    END
+    ''',
+]
+
+PRODUCT_TEXT_SQL = '''
+    SELECT p.id, p.name, p.description, c.name
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+'''
+
+
+def ensure_change_log(conn):
+    """Create the product change log and its triggers"""
+    for statement in CHANGE_LOG_SCHEMA:
+        conn.execute(statement)
+
+
+def mark_bulk_change(conn):
+    """Record that every product may have changed; runs in the caller's transaction"""
+    seq = conn.execute('INSERT INTO product_changes (product_id) VALUES (NULL)').lastrowid
+    conn.execute('DELETE FROM product_changes WHERE seq < ?', (seq,))
+
+
+def product_features(name, description, category):
+    """Hashed feature ids for one product (crc32, so identical in every process)"""
+    words = WORD.findall(f'{name or ""} {description or ""}'.lower())
+    terms = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+    if category:
+        terms.append(f'category:{category.lower()}')
+    return [zlib.crc32(term.encode()) % FEATURES for term in terms]
+
+
+def count_matrix(rows):
+    """Term-count CSR matrix for (id, name, description, category) rows"""
+    indptr = [0]
+    indices = []
+    for _, name, description, category in rows:
+        indices.extend(product_features(name, description, category))
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+        shape=(len(rows), FEATURES)
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+
+def tfidf(counts, idf):
+    """Sublinear TF x IDF, L2-normalised rows"""
+    matrix = counts.copy()
+    matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    matrix = sparse.diags(1 / np.maximum(norms, 1e-12)).dot(matrix).tocsr()
+    matrix.eliminate_zeros()
+    return matrix.astype(np.float32)
+
+
+def top_neighbours(vectors, vectors_t, rows, k=TOP_K, batch_size=BATCH_SIZE):
+    """Cosine top-k of each given row against every product, via batched sparse products.
+
+    Returns (neighbours[len(rows), k], scores) with -1 / 0.0 padding. Each row
+    of a block is cut down with argpartition, which is linear in its candidates;
+    only the k survivors are sorted.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    neighbours = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    for start in range(0, len(rows), batch_size):
+        block_rows = rows[start:start + batch_size]
+        block = (vectors[block_rows] @ vectors_t).tocsr()
+        indptr, indices, data = block.indptr, block.indices, block.data
+        for offset, row in enumerate(block_rows):
+            cols = indices[indptr[offset]:indptr[offset + 1]]
+            values = data[indptr[offset]:indptr[offset + 1]]
+            if len(cols) > k + 1:
+                # k + 1 so the product itself can be dropped afterwards
+                top = np.argpartition(-values, k)[:k + 1]
+                cols, values = cols[top], values[top]
+            order = np.lexsort((cols, -values))
+            cols, values = cols[order], values[order]
+            keep = (cols != row) & (values > 0)
+            cols, values = cols[keep][:k], values[keep][:k]
+            neighbours[start + offset, :len(cols)] = cols
+            scores[start + offset, :len(cols)] = values
+    return neighbours, scores
+
+
+class SimilarityIndex:
+    """Top-K content neighbours per product, refreshed incrementally from product_changes.
+
+    Refreshes and rebuilds run in a background thread on a connection from
+    connect(); a request only waits for the very first build.
+    """
+
+    def __init__(self, top_k=TOP_K, refresh_interval=REFRESH_INTERVAL, connect=None):
+        self.k = top_k
+        self.refresh_interval = refresh_interval
+        # Returns a connection usable as a context manager, e.g. ConnectionPool.acquire
+        self.connect = connect
+        self._lock = threading.RLock()
+        self._refreshing = threading.Lock()
+        self.item_ids = np.zeros(0, dtype=np.int64)
+        self.neighbours = np.zeros((0, top_k), dtype=np.int32)
+        self.scores = np.zeros((0, top_k), dtype=np.float32)
+        self._vectors = None
+        self._vectors_t = None
+        self._idf = None
+        self._high_water = 0
+        self._changed_since_build = 0
+        self._built = False
+        self._last_check = 0.0
+        self.build_seconds = 0.0
+        self.full_rebuilds = 0
+        self.incremental_refreshes = 0
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A refresh thread of the parent does not exist in the child
+        self._lock = threading.RLock()
+        self._refreshing = threading.Lock()
+
+    def build(self, conn):
+        """Full rebuild: vectorise every product and rank all neighbours"""
+        started = time.perf_counter()
+        high_water = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM product_changes').fetchone()[0]
+        rows = conn.execute(PRODUCT_TEXT_SQL + ' ORDER BY p.id').fetchall()
+        item_ids = np.array([row[0] for row in rows], dtype=np.int64)
+
+        counts = count_matrix(rows)
+        df = np.bincount(counts.indices, minlength=FEATURES)
+        idf = (np.log((1 + len(rows)) / (1 + df)) + 1).astype(np.float32)
+        idf[df > STOP_DF] = 0
+        vectors = tfidf(counts, idf)
+        vectors_t = vectors.T.tocsr()
+        neighbours, scores = top_neighbours(vectors, vectors_t, np.arange(len(rows)), k=self.k)
+
+        with self._lock:
+            self.item_ids = item_ids
+            self.neighbours = neighbours
+            self.scores = scores
+            self._vectors = vectors
+            self._vectors_t = vectors_t
+            self._idf = idf
+            self._high_water = high_water
+            self._changed_since_build = 0
+            self._built = True
+            self.full_rebuilds += 1
+        self.build_seconds = time.perf_counter() - started
+
+    def refresh(self, conn):
+        """Apply logged product changes; returns the number of products re-vectorised.
+
+        Changed rows are re-vectorised with the existing IDF weights and
+        deleted products are dropped. Products whose neighbour lists may now
+        include or drop a changed product are re-ranked; nothing else is
+        touched. Work happens on copies, so readers
+        keep the previous table until the swap at the end.
+        """
+        log = conn.execute(
+            'SELECT seq, product_id FROM product_changes WHERE seq > ? ORDER BY seq', (self._high_water,)
+        ).fetchall()
+        if not log:
+            return 0
+        changed_ids = np.unique(np.array([product_id for _, product_id in log if product_id is not None], dtype=np.int64))
+        if (any(product_id is None for _, product_id in log)
+                or self._changed_since_build + len(changed_ids) > REBUILD_RATIO * max(len(self.item_ids), 1)):
+            self.build(conn)
+            return len(self.item_ids)
+
+        placeholders = ','.join('?' * len(changed_ids))
+        rows = conn.execute(
+            PRODUCT_TEXT_SQL + f' WHERE p.id IN ({placeholders}) ORDER BY p.id', changed_ids.tolist()
+        ).fetchall()
+
+        present = np.array([row[0] for row in rows], dtype=np.int64)
+        appended = np.setdiff1d(present, self.item_ids)
+        if len(appended) and len(self.item_ids) and appended.min() < self.item_ids[-1]:
+            # Only ids past the end keep item_ids sorted without reshuffling every row
+            self.build(conn)
+            return len(self.item_ids)
+
+        item_ids = np.concatenate([self.item_ids, appended])
+        vectors = sparse.vstack([self._vectors, sparse.csr_matrix((len(appended), FEATURES), dtype=np.float32)])
+        neighbours = np.vstack([self.neighbours, np.full((len(appended), self.k), -1, dtype=np.int32)])
+        scores = np.vstack([self.scores, np.zeros((len(appended), self.k), dtype=np.float32)])
+
+        # Deleted products get an empty vector first, so they drop out of every list, and lose their slot below
+        positions = np.searchsorted(item_ids, changed_ids[np.isin(changed_ids, item_ids)])
+        keep = np.ones(len(item_ids), dtype=np.float32)
+        keep[positions] = 0
+        placement = sparse.csr_matrix(
+            (np.ones(len(present), dtype=np.float32), (np.searchsorted(item_ids, present), np.arange(len(present)))),
+            shape=(len(item_ids), len(present))
+        )
+        replacement = placement @ tfidf(count_matrix(rows), self._idf)
+        vectors = (sparse.diags(keep) @ vectors + replacement).tocsr()
+        vectors_t = vectors.T.tocsr()
+
+        # Rows to re-rank: the changed products, anyone listing one of them, and
+        # anyone for whom a changed product now beats their current k-th neighbour
+        similarity = (vectors[positions] @ vectors_t).tocoo()
+        kth = scores[:, -1]
+        gained = similarity.col[similarity.data > kth[similarity.col]]
+        listed = np.flatnonzero(np.isin(neighbours, positions).any(axis=1))
+        affected = np.unique(np.concatenate([positions, gained, listed]))
+
+        ranked, ranked_scores = top_neighbours(vectors, vectors_t, affected, k=self.k)
+        neighbours[affected] = ranked
+        scores[affected] = ranked_scores
+
+        alive = ~np.isin(item_ids, changed_ids) | np.isin(item_ids, present)
+        if not alive.all():
+            # Every row that listed a deleted product was re-ranked above, so only slots shift
+            slot = np.cumsum(alive) - 1
+            item_ids = item_ids[alive]
+            neighbours = neighbours[alive]
+            neighbours = np.where(neighbours >= 0, slot[neighbours], -1).astype(np.int32)
+            scores = scores[alive]
+            vectors = vectors[np.flatnonzero(alive)]
+            vectors_t = vectors.T.tocsr()
+
+        with self._lock:
+            self.item_ids = item_ids
+            self.neighbours = neighbours
+            self.scores = scores
+            self._vectors = vectors
+            self._vectors_t = vectors_t
+            self._high_water = log[-1][0]
+            self._changed_since_build += len(changed_ids)
+            self.incremental_refreshes += 1
+        return len(changed_ids)
+
+    def ensure_fresh(self):
+        """Build on first use, then poll the change log in the background at most every refresh_interval seconds"""
+        if not self._built:
+            with self._refreshing:
+                if not self._built:
+                    with self.connect() as conn:
+                        self.build(conn)
+                    self._last_check = time.monotonic()
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return
+        # Only one thread refreshes; requests keep serving the current table meanwhile
+        if self._refreshing.acquire(blocking=False):
+            self._last_check = now
+            threading.Thread(target=self._refresh_in_background, name='similar-products-refresh',
+                             daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            with self.connect() as conn:
+                self.refresh(conn)
+        finally:
+            self._refreshing.release()
+
+    def similar(self, product_id, limit=TOP_K):
+        """[(product_id, score)] most similar first, or None for an unknown product"""
+        with self._lock:
+            position = np.searchsorted(self.item_ids, product_id)
+            if position >= len(self.item_ids) or self.item_ids[position] != product_id:
+                return None
+            neighbours = self.neighbours[position]
+            scores = self.scores[position]
+            found = neighbours >= 0
+            return [
+                (int(self.item_ids[index]), round(float(score), 4))
+                for index, score in zip(neighbours[found][:limit], scores[found][:limit])
+            ]
+
+    def stats(self):
+        with self._lock:
+            vectors = self._vectors
+            return {
+                'products': int(len(self.item_ids)),
+                'top_k': self.k,
+                'index_bytes': int(self.neighbours.nbytes + self.scores.nbytes + self.item_ids.nbytes),
+                'vector_nnz': int(vectors.nnz) if vectors is not None else 0,
+                'build_seconds': round(self.build_seconds, 4),
+                'full_rebuilds': self.full_rebuilds,
+                'incremental_refreshes': self.incremental_refreshes,
+                'high_water_change': int(self._high_water),
+            }
@@ -0,0 +1,82 @@
+"""
+ANUFA AI E-commerce Platform - Request coalescing
+Concurrent identical computations within a worker share one in-flight call and its result
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs fn once per key at a time; callers arriving meanwhile wait for that result.
+
+    Results are shared between requests, so fn must return something
+    immutable (bytes, tuples, PreparedResponse). Nothing is kept once the
+    call finishes; caching is the caller's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {}
+
+    def do(self, group, key, fn):
+        """Return fn(), or the result of an identical call already in flight.
+
+        group names the endpoint for the per-endpoint counters; an exception
+        raised by fn is re-raised in every caller that shared the call.
+        """
+        flight_key = (group, key)
+        with self._lock:
+            counters = self._counters.get(group)
+            if counters is None:
+                counters = self._counters[group] = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+            counters['calls'] += 1
+            call = self._calls.get(flight_key)
+            if call is not None:
+                call.waiters += 1
+                counters['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[flight_key] = _Call()
+                counters['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[flight_key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Per-endpoint call counts for this worker; coalesced calls did no work of their own"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'endpoints': {
+                    group: dict(counters, coalesced_rate=round(counters['coalesced'] / counters['calls'], 4))
+                    for group, counters in self._counters.items()
+                },
+            }
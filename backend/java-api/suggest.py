@@ -0,0 +1,306 @@
+"""
+ANUFA AI E-commerce Platform - Search suggestions
+Sorted-array prefix index over product names, SKUs and categories with an incremental delta segment
+"""
+
+import bisect
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_PRODUCTS = int(os.environ.get('SUGGEST_MAX_PRODUCTS', 200000))
+REFRESH_INTERVAL = float(os.environ.get('SUGGEST_REFRESH_SECONDS', 2))
+MAX_LIMIT = 20
+# Keys are also added for the words after the first, so "max" finds "Smartphone Pro Max"
+MAX_WORD_STARTS = 4
+KEY_LENGTH = 48
+# Candidates taken per prefix before collapsing products that match through several keys
+CANDIDATES = 4 * MAX_LIMIT
+# Broad prefixes (more main-segment matches than this) keep their best main entries cached until the next build
+SCAN_LIMIT = 1000
+PREFIX_CACHE_SIZE = 4096
+# Changed products accumulate in the delta segment until it is merged into the main arrays
+MAX_DELTA = 5000
+
+# Entry kinds; the *_START kinds match from the first word and rank higher
+PRODUCT_START, PRODUCT_WORD, SKU, CATEGORY_START, CATEGORY_WORD = range(5)
+KIND_TYPES = {PRODUCT_START: 'product', PRODUCT_WORD: 'product', SKU: 'sku',
+              CATEGORY_START: 'category', CATEGORY_WORD: 'category'}
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+PRODUCT_SQL = '''
+    SELECT id, name, sku, 2 * (COALESCE(is_featured, 0) != 0) + (COALESCE(stock_quantity, 0) > 0)
+    FROM products
+'''
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def _text_keys(text, start_kind, word_kind):
+    words = normalize(text).split()
+    for position in range(min(len(words), MAX_WORD_STARTS)):
+        yield ' '.join(words[position:])[:KEY_LENGTH], start_kind if position == 0 else word_kind
+
+
+def rank(kind, ref, weight=0):
+    """Integer sort key, higher first: first-word matches, then names over SKUs, then weight, then newest"""
+    starts = kind in (PRODUCT_START, CATEGORY_START)
+    return (starts << 45) + ((kind != SKU) << 44) + (weight << 42) + ref
+
+
+def product_entries(product_id, name, sku):
+    """(key, kind, id) entries for one product"""
+    entries = [(key, kind, product_id) for key, kind in _text_keys(name, PRODUCT_START, PRODUCT_WORD)]
+    if sku:
+        entries.append((normalize(sku)[:KEY_LENGTH], SKU, product_id))
+    return entries
+
+
+class Segment:
+    """Immutable sorted keys with parallel kind, id and precomputed rank arrays"""
+
+    def __init__(self, entries, weights=None):
+        entries.sort()
+        weights = weights or {}
+        self.keys = [key for key, _, _ in entries]
+        self.kinds = np.array([kind for _, kind, _ in entries], dtype=np.int8)
+        self.ids = np.array([ref for _, _, ref in entries], dtype=np.int64)
+        self.ranks = np.array([rank(kind, ref, weights.get(ref, 0)) for _, kind, ref in entries], dtype=np.int64)
+
+    def range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def top(self, lo, hi, count):
+        """(rank, kind, id) of the count best entries in [lo, hi), best first"""
+        ranks = self.ranks[lo:hi]
+        if hi - lo > count:
+            positions = np.argpartition(ranks, hi - lo - count)[hi - lo - count:]
+            positions = lo + positions[np.argsort(-ranks[positions])]
+        else:
+            positions = lo + np.argsort(-ranks)
+        return zip(self.ranks[positions].tolist(), self.kinds[positions].tolist(), self.ids[positions].tolist())
+
+    def nbytes(self):
+        return (sys.getsizeof(self.keys) + sum(sys.getsizeof(key) for key in self.keys)
+                + self.kinds.nbytes + self.ids.nbytes + self.ranks.nbytes)
+
+
+class SuggestIndex:
+    """Prefix completions for product names, SKUs and category names.
+
+    A full build writes one sorted Segment. Afterwards changed products (from
+    the product_changes log) are tombstoned in it and re-added to a small
+    sorted delta list; the delta is merged by a rebuild once it reaches
+    MAX_DELTA entries.
+    """
+
+    def __init__(self, max_products=MAX_PRODUCTS, refresh_interval=REFRESH_INTERVAL):
+        self.max_products = max_products
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._main = Segment([])
+        self._static_bytes = 0
+        self._categories = Segment([])
+        self._delta = []
+        self._tombstones = set()
+        self._products = {}
+        self._category_names = {}
+        self._prefix_cache = OrderedDict()
+        self._high_water = 0
+        self._categories_version = None
+        self._built = False
+        self._last_check = 0.0
+        self.build_seconds = 0.0
+        self.full_rebuilds = 0
+        self.incremental_refreshes = 0
+
+    def build(self, conn):
+        """Full rebuild, keeping the max_products highest-ranked products"""
+        started = time.perf_counter()
+        high_water = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM product_changes').fetchone()[0]
+        rows = conn.execute(
+            PRODUCT_SQL + ' ORDER BY is_featured DESC, stock_quantity > 0 DESC, id DESC LIMIT ?',
+            (self.max_products,)
+        ).fetchall()
+        products = {product_id: (name, sku, weight) for product_id, name, sku, weight in rows}
+        entries = [entry for product_id, name, sku, _ in rows for entry in product_entries(product_id, name, sku)]
+        main = Segment(entries, {product_id: weight for product_id, _, _, weight in rows})
+        # Measured once per build; incremental changes only add the (small) delta
+        static_bytes = main.nbytes() + sys.getsizeof(products) + sum(
+            sys.getsizeof(name) + sys.getsizeof(sku) + sys.getsizeof(value)
+            for value in products.values() for name, sku, _ in (value,)
+        )
+        categories_version, category_names, categories = self._load_categories(conn)
+
+        with self._lock:
+            self._main = main
+            self._static_bytes = static_bytes
+            self._delta = []
+            self._tombstones = set()
+            self._products = products
+            self._categories = categories
+            self._category_names = category_names
+            self._categories_version = categories_version
+            self._prefix_cache.clear()
+            self._high_water = high_water
+            self._built = True
+            self.full_rebuilds += 1
+        self.build_seconds = time.perf_counter() - started
+
+    def _load_categories(self, conn):
+        version = conn.execute("SELECT version FROM catalog_versions WHERE name = 'categories'").fetchone()
+        names = dict(conn.execute('SELECT id, name FROM categories'))
+        entries = [
+            (key, kind, category_id)
+            for category_id, name in names.items()
+            for key, kind in _text_keys(name, CATEGORY_START, CATEGORY_WORD)
+        ]
+        return version[0] if version else None, names, Segment(entries)
+
+    def refresh(self, conn):
+        """Apply logged product changes and reload categories if they changed"""
+        log = conn.execute(
+            'SELECT seq, product_id FROM product_changes WHERE seq > ? ORDER BY seq', (self._high_water,)
+        ).fetchall()
+        changed = {product_id for _, product_id in log}
+        if None in changed or len(self._delta) + 3 * len(changed) > MAX_DELTA:
+            self.build(conn)
+            return
+
+        rows = []
+        if changed:
+            ids = list(changed)
+            placeholders = ','.join('?' * len(ids))
+            rows = conn.execute(PRODUCT_SQL + f' WHERE id IN ({placeholders})', ids).fetchall()
+        version = conn.execute("SELECT version FROM catalog_versions WHERE name = 'categories'").fetchone()
+        categories = None
+        if version and version[0] != self._categories_version:
+            categories = self._load_categories(conn)
+        if not log and categories is None:
+            return
+
+        with self._lock:
+            if changed:
+                self._tombstones |= changed
+                self._delta = [entry for entry in self._delta if entry[2] not in changed]
+                for product_id in changed:
+                    self._products.pop(product_id, None)
+                for product_id, name, sku, weight in rows:
+                    self._products[product_id] = (name, sku, weight)
+                    for key, kind, ref in product_entries(product_id, name, sku):
+                        bisect.insort(self._delta, (key, kind, ref, rank(kind, ref, weight)))
+                self._high_water = log[-1][0]
+            if categories is not None:
+                self._categories_version, self._category_names, self._categories = categories
+            self.incremental_refreshes += 1
+
+    def ensure_fresh(self, conn):
+        """Build on first use, then poll for changes at most every refresh_interval seconds"""
+        if not self._built:
+            with self._refreshing:
+                if not self._built:
+                    self.build(conn)
+                    self._last_check = time.monotonic()
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return
+        # Only one thread refreshes; the others keep serving the current index
+        if self._refreshing.acquire(blocking=False):
+            try:
+                self._last_check = now
+                self.refresh(conn)
+            finally:
+                self._refreshing.release()
+
+    def _main_top(self, prefix, lo, hi):
+        """Best main-segment entries for a prefix; the main segment only changes on build"""
+        if hi - lo <= SCAN_LIMIT:
+            return list(self._main.top(lo, hi, 2 * CANDIDATES))
+        cached = self._prefix_cache.get(prefix)
+        if cached is None:
+            cached = self._prefix_cache[prefix] = list(self._main.top(lo, hi, 2 * CANDIDATES))
+            if len(self._prefix_cache) > PREFIX_CACHE_SIZE:
+                self._prefix_cache.popitem(last=False)
+        else:
+            self._prefix_cache.move_to_end(prefix)
+        return cached
+
+    def _candidates(self, prefix):
+        """(kind, id) pairs whose key starts with prefix, best first, deduplicated; needs the lock"""
+        lo, hi = self._main.range(prefix)
+        category_lo, category_hi = self._categories.range(prefix)
+        delta_lo = bisect.bisect_left(self._delta, (prefix,))
+        delta_hi = bisect.bisect_left(self._delta, (prefix + '\uffff',), delta_lo)
+
+        tombstones = self._tombstones
+        matches = [match for match in self._main_top(prefix, lo, hi) if match[2] not in tombstones]
+        if len(matches) < min(CANDIDATES, hi - lo - len(tombstones)):
+            # Tombstones emptied the cached selection; take enough to cover all of them
+            matches = [
+                match for match in self._main.top(lo, hi, CANDIDATES + len(tombstones))
+                if match[2] not in tombstones
+            ]
+        others = list(self._categories.top(category_lo, category_hi, CANDIDATES))
+        others.extend((ranked, kind, ref) for _, kind, ref, ranked in self._delta[delta_lo:delta_hi])
+        if others:
+            others.sort(reverse=True)
+            matches = heapq.merge(matches, others, reverse=True)
+
+        best = {}
+        for _, kind, ref in matches:
+            target = ('category' if kind in (CATEGORY_START, CATEGORY_WORD) else 'product', ref)
+            if target not in best:
+                best[target] = (kind, ref)
+            if len(best) >= MAX_LIMIT:
+                break
+        return list(best.values())
+
+    def suggest(self, text, limit=8):
+        """Ranked completions for the typed text: [{'text', 'type', 'id'}]"""
+        prefix = normalize(text)[:KEY_LENGTH]
+        if not prefix:
+            return []
+        with self._lock:
+            suggestions = []
+            for kind, ref in self._candidates(prefix)[:limit]:
+                if kind in (CATEGORY_START, CATEGORY_WORD):
+                    suggestions.append({'text': self._category_names.get(ref), 'type': 'category', 'id': ref})
+                else:
+                    name, sku, _ = self._products[ref]
+                    suggestions.append({'text': sku if kind == SKU else name, 'type': KIND_TYPES[kind],
+                                        'id': ref, 'name': name})
+            return suggestions
+
+    def stats(self):
+        """Entry counts and approximate memory held by the index"""
+        with self._lock:
+            delta_bytes = sys.getsizeof(self._delta) + sum(sys.getsizeof(entry[0]) for entry in self._delta)
+            return {
+                'entries': len(self._main.keys) + len(self._categories.keys) + len(self._delta),
+                'products': len(self._products),
+                'max_products': self.max_products,
+                'delta_entries': len(self._delta),
+                'tombstones': len(self._tombstones),
+                'cached_prefixes': len(self._prefix_cache),
+                'approx_bytes': self._static_bytes + self._categories.nbytes() + delta_bytes,
+                'build_seconds': round(self.build_seconds, 4),
+                'full_rebuilds': self.full_rebuilds,
+                'incremental_refreshes': self.incremental_refreshes,
+            }
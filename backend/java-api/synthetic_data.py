@@ -0,0 +1,246 @@
+"""
+ANUFA AI E-commerce Platform - Synthetic data
+Deterministic, scalable catalog/users/orders generator for load and performance testing
+"""
+
+import datetime
+import itertools
+import random
+from array import array
+
+import analytics
+import migrations
+import passwords
+import product_filters
+import sample_data
+import search_index
+import similar_products
+# generate() has a recommendations count parameter
+from recommendations import mark_bulk_change as mark_bulk_cart_change
+
+# Every generated user shares this password, so benchmarks can log in as any of them
+PASSWORD = sample_data.SAMPLE_PASSWORD
+BATCH_SIZE = 50000
+# Timestamps are spread over a fixed year so the same seed always yields the same rows
+EPOCH = datetime.datetime(2024, 1, 1)
+SPAN_SECONDS = 365 * 24 * 3600
+
+ADJECTIVES = [
+    'ultra', 'smart', 'classic', 'premium', 'compact', 'wireless', 'organic', 'portable', 'vintage', 'rugged',
+    'slim', 'deluxe', 'eco', 'pro', 'mini', 'heavy', 'soft', 'bright', 'quiet', 'fast',
+]
+MATERIALS = [
+    'cotton', 'steel', 'bamboo', 'leather', 'carbon', 'glass', 'wool', 'ceramic', 'oak', 'titanium',
+    'linen', 'silicone', 'copper', 'denim', 'walnut', 'nylon',
+]
+NOUNS = [
+    'phone', 'headphones', 'laptop', 'watch', 'shirt', 'jeans', 'shoes', 'guide', 'handbook', 'lamp',
+    'backpack', 'kettle', 'speaker', 'camera', 'jacket', 'blender', 'chair', 'desk', 'bottle', 'mat',
+    'tent', 'racket', 'keyboard', 'monitor', 'novel', 'planner', 'drill', 'rake', 'helmet', 'scarf',
+]
+DEPARTMENTS = ['Electronics', 'Clothing', 'Books', 'Home', 'Garden', 'Sports', 'Toys', 'Beauty', 'Kitchen', 'Office']
+FIRST_NAMES = ['Ava', 'Liam', 'Mia', 'Noah', 'Zoe', 'Ethan', 'Ivy', 'Omar', 'Lena', 'Ravi', 'Sara', 'Tom']
+LAST_NAMES = ['Patel', 'Garcia', 'Kim', 'Nguyen', 'Smith', 'Okafor', 'Rossi', 'Muller', 'Sato', 'Silva']
+ORDER_STATUSES = [('completed', 'paid')] * 6 + [('shipped', 'paid')] * 2 + [('pending', 'pending'), ('cancelled', 'refunded')]
+PAYMENT_METHODS = ['credit_card', 'paypal', 'debit_card', 'bank_transfer']
+RECOMMENDATION_TYPES = ['similar_product', 'content_based', 'collaborative', 'trending']
+WORDS = ADJECTIVES + MATERIALS + NOUNS + [
+    'durable', 'lightweight', 'everyday', 'travel', 'home', 'office', 'outdoor', 'gift', 'kids', 'adult',
+    'waterproof', 'adjustable', 'rechargeable', 'handmade', 'recycled', 'ergonomic', 'foldable', 'classic',
+]
+
+# Tables whose triggers and secondary indexes are dropped during the load and restored afterwards
+LOADED_TABLES = ('categories', 'products', 'users', 'cart', 'orders', 'order_items', 'ai_recommendations')
+
+
+def _timestamp(rng):
+    return (EPOCH + datetime.timedelta(seconds=rng.randrange(SPAN_SECONDS))).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _next_id(conn, table):
+    return conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}').fetchone()[0]
+
+
+def _categories(rng, first_id, count):
+    for category_id in range(first_id, first_id + count):
+        department = DEPARTMENTS[category_id % len(DEPARTMENTS)]
+        yield (category_id, f'{department} {rng.choice(NOUNS).title()} {category_id}',
+               f'{department} range: {" ".join(rng.choices(WORDS, k=6))}', _timestamp(rng))
+
+
+def _products(rng, first_id, count, category_ids):
+    for product_id in range(first_id, first_id + count):
+        name = f'{rng.choice(ADJECTIVES).title()} {rng.choice(MATERIALS).title()} {rng.choice(NOUNS).title()}'
+        # Long-tailed prices; roughly one product in ten is out of stock and one in a hundred featured
+        price = round(min(max(rng.lognormvariate(3.5, 1.0), 0.99), 5000.0), 2)
+        stock = 0 if rng.random() < 0.1 else rng.randint(1, 500)
+        yield (product_id, f'{name} {product_id}', ' '.join(rng.choices(WORDS, k=rng.randint(8, 16))), price,
+               rng.choice(category_ids) if category_ids else None, f'GEN-{product_id:08d}', stock,
+               int(rng.random() < 0.01), _timestamp(rng))
+
+
+def _users(rng, first_id, count, password_hash):
+    for user_id in range(first_id, first_id + count):
+        yield (user_id, f'shopper{user_id}', f'shopper{user_id}@example.com', password_hash,
+               rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), _timestamp(rng))
+
+
+# Popularity skew (higher is steeper): a few hot products, but no user with a huge share of all orders
+PRODUCT_SKEW = 3.0
+USER_SKEW = 1.2
+
+
+def _pick(rng, values, skew):
+    # Favours the front of the list
+    return values[int(len(values) * rng.random() ** skew)]
+
+
+def _orders(rng, first_order_id, first_item_id, total_items, items_per_order, user_ids, product_ids, prices, out):
+    """Yield order rows; the matching order_items rows are appended to `out` as each order is produced"""
+    order_id = first_order_id
+    item_id = first_item_id
+    remaining = total_items
+    while remaining > 0:
+        count = min(remaining, rng.randint(1, 2 * items_per_order - 1))
+        total = 0.0
+        for _ in range(count):
+            index = int(len(product_ids) * rng.random() ** PRODUCT_SKEW)
+            quantity = rng.randint(1, 3)
+            total += prices[index] * quantity
+            out.append((item_id, order_id, product_ids[index], quantity, prices[index]))
+            item_id += 1
+        status, payment_status = rng.choice(ORDER_STATUSES)
+        yield (order_id, _pick(rng, user_ids, USER_SKEW), round(total, 2), status, rng.choice(PAYMENT_METHODS), payment_status,
+               f'{rng.randint(1, 9999)} {rng.choice(LAST_NAMES)} St', _timestamp(rng))
+        order_id += 1
+        remaining -= count
+
+
+def _cart_lines(rng, first_id, count, user_ids, product_ids):
+    cart_id = first_id
+    for user_id in rng.sample(user_ids, min(count, len(user_ids))):
+        for product_id in {_pick(rng, product_ids, PRODUCT_SKEW) for _ in range(rng.randint(1, 5))}:
+            yield (cart_id, user_id, product_id, rng.randint(1, 3), _timestamp(rng))
+            cart_id += 1
+
+
+def _recommendations(rng, first_id, count, user_ids, product_ids):
+    for recommendation_id in range(first_id, first_id + count):
+        yield (recommendation_id, _pick(rng, user_ids, USER_SKEW), _pick(rng, product_ids, PRODUCT_SKEW),
+               rng.choice(RECOMMENDATION_TYPES), round(rng.uniform(0.5, 0.99), 2), 'Generated for load testing',
+               _timestamp(rng))
+
+
+def _insert(conn, sql, rows, batch_size, progress, table):
+    """executemany in batches, one transaction each; returns the row count"""
+    total = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return total
+        conn.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+        if progress:
+            progress(table, total)
+
+
+def generate(conn, products=10000, users=1000, order_items=30000, categories=50, carts=None, recommendations=None,
+             items_per_order=3, seed=42, batch_size=BATCH_SIZE, progress=None):
+    """Append a deterministic synthetic data set to the database; returns {table: rows inserted}.
+
+    The same seed, sizes and starting database always produce the same rows.
+    New ids continue after the existing ones, so the demo data can stay.
+    Triggers and secondary indexes on the loaded tables are dropped for the
+    load and recreated afterwards, with the search index, facet counters,
+    catalog versions and analytics rollups rebuilt once at the end.
+    `progress(table, rows_so_far)` is called after every committed batch.
+    """
+    rng = random.Random(seed)
+    carts = users // 10 if carts is None else carts
+    recommendations = users // 2 if recommendations is None else recommendations
+    migrations.migrate(conn)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+
+    placeholders = ','.join('?' * len(LOADED_TABLES))
+    deferred = conn.execute(f'''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name IN ({placeholders}) AND type IN ('trigger', 'index') AND sql IS NOT NULL
+    ''', LOADED_TABLES).fetchall()
+    for object_type, name, _ in deferred:
+        conn.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+    conn.commit()
+
+    counts = {}
+    try:
+        counts['categories'] = _insert(
+            conn, 'INSERT INTO categories (id, name, description, created_at) VALUES (?, ?, ?, ?)',
+            _categories(rng, _next_id(conn, 'categories'), categories), batch_size, progress, 'categories')
+        category_ids = [row[0] for row in conn.execute('SELECT id FROM categories ORDER BY id')]
+
+        counts['products'] = _insert(
+            conn, 'INSERT INTO products (id, name, description, price, category_id, sku, stock_quantity, '
+                  'is_featured, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            _products(rng, _next_id(conn, 'products'), products, category_ids), batch_size, progress, 'products')
+
+        # One KDF run shared by every generated user; hashing each would take hours at this scale
+        password_hash = passwords.hash_password(PASSWORD)
+        counts['users'] = _insert(
+            conn, 'INSERT INTO users (id, username, email, password_hash, first_name, last_name, created_at) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            _users(rng, _next_id(conn, 'users'), users, password_hash), batch_size, progress, 'users')
+
+        product_ids = array('q')
+        prices = array('d')
+        for product_id, price in conn.execute('SELECT id, price FROM products ORDER BY id'):
+            product_ids.append(product_id)
+            prices.append(price)
+        user_ids = [row[0] for row in conn.execute('SELECT id FROM users ORDER BY id')]
+        if (order_items or carts or recommendations) and not (product_ids and user_ids):
+            raise ValueError('orders, carts and recommendations need at least one product and one user')
+
+        items = []
+        orders = _orders(rng, _next_id(conn, 'orders'), _next_id(conn, 'order_items'), order_items,
+                         items_per_order, user_ids, product_ids, prices, items)
+        counts['orders'] = counts['order_items'] = 0
+        while True:
+            # Orders and their items are written in step, so memory stays at one batch
+            batch = list(itertools.islice(orders, max(1, batch_size // items_per_order)))
+            if not batch:
+                break
+            conn.executemany('INSERT INTO orders (id, user_id, total_amount, status, payment_method, payment_status, '
+                             'shipping_address, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            conn.executemany('INSERT INTO order_items (id, order_id, product_id, quantity, price) '
+                             'VALUES (?, ?, ?, ?, ?)', items)
+            conn.commit()
+            counts['orders'] += len(batch)
+            counts['order_items'] += len(items)
+            items.clear()
+            if progress:
+                progress('order_items', counts['order_items'])
+
+        counts['cart'] = _insert(
+            conn, 'INSERT INTO cart (id, user_id, product_id, quantity, added_at) VALUES (?, ?, ?, ?, ?)',
+            _cart_lines(rng, _next_id(conn, 'cart'), carts, user_ids, product_ids), batch_size, progress, 'cart')
+        counts['ai_recommendations'] = _insert(
+            conn, 'INSERT INTO ai_recommendations (id, user_id, product_id, recommendation_type, confidence_score, '
+                  'reasoning, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            _recommendations(rng, _next_id(conn, 'ai_recommendations'), recommendations, user_ids, product_ids),
+            batch_size, progress, 'ai_recommendations')
+    finally:
+        conn.rollback()
+        for _, _, sql in deferred:
+            conn.execute(sql.replace('CREATE TRIGGER ', 'CREATE TRIGGER IF NOT EXISTS ', 1)
+                            .replace('CREATE INDEX ', 'CREATE INDEX IF NOT EXISTS ', 1)
+                            .replace('CREATE UNIQUE INDEX ', 'CREATE UNIQUE INDEX IF NOT EXISTS ', 1))
+        search_index.rebuild_search_index(conn)
+        product_filters.rebuild_product_facets(conn)
+        conn.execute('UPDATE catalog_versions SET version = version + 1')
+        similar_products.mark_bulk_change(conn)
+        mark_bulk_cart_change(conn)
+        analytics.rebuild_rollups(conn)
+        conn.commit()
+    return counts
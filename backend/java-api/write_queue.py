@@ -0,0 +1,226 @@
+"""
+ANUFA AI E-commerce Platform - Group-commit write queue
+A single writer thread runs queued write operations in shared transactions, one SAVEPOINT each
+"""
+
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from db_pool import WRITE_BACKOFF, WRITE_RETRIES, PoolTimeout, is_busy_error
+
+ENABLED = os.environ.get('WRITE_QUEUE', '').lower() in ('1', 'true', 'yes')
+MAX_BATCH = int(os.environ.get('WRITE_QUEUE_MAX_BATCH', 64))
+# Extra time an operation may wait for others to join its batch. At 0, a batch is
+# whatever queued up while the previous one committed, which batches well under load.
+MAX_DELAY = float(os.environ.get('WRITE_QUEUE_MAX_DELAY_MS', 0)) / 1000
+# Longest a caller waits for its operation before giving up with WriteQueueUnavailable
+TIMEOUT = float(os.environ.get('WRITE_QUEUE_TIMEOUT', 30.0))
+
+
+class WriteQueueUnavailable(PoolTimeout):
+    """The writer did not get to an operation in time, or has stopped after a fatal error.
+
+    A PoolTimeout, so handlers answer it like any other busy database (503).
+    """
+
+
+class WriteQueue:
+    """Batches write operations from many threads into group commits.
+
+    Each operation fn(conn) runs inside its own SAVEPOINT, so one that
+    raises is rolled back alone and its exception is delivered to its
+    caller; the rest of the batch still commits. Results are only handed
+    out after COMMIT, so a caller never sees a write that could still be
+    lost.
+    """
+
+    def __init__(self, pool, max_batch=MAX_BATCH, max_delay=MAX_DELAY, timeout=TIMEOUT):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reset_state()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset_state(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        # Set when the writer thread dies; no further operations are accepted
+        self._fatal = None
+        self.submitted = 0
+        self.timeouts = 0
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+        self.max_batch_seen = 0
+        self.busy_retries = 0
+        self._wait_total = 0.0
+
+    def _after_fork(self):
+        # The writer thread does not survive a fork; the child starts its own on first use
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def submit(self, fn):
+        """Queue fn(conn) and return a Future for its result"""
+        future = Future()
+        with self._lock:
+            if self._fatal is not None:
+                future.set_exception(WriteQueueUnavailable(f'Write queue stopped: {self._fatal!r}'))
+                return future
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+            self.submitted += 1
+            # Queued under the lock, so _stop() cannot miss it
+            self._queue.put((fn, future, time.perf_counter()))
+        return future
+
+    def run(self, fn):
+        """Queue fn(conn) and wait for its result, re-raising its exception.
+
+        Raises WriteQueueUnavailable after `timeout` seconds. An operation
+        the writer has not started yet is cancelled; one it is running may
+        still commit.
+        """
+        future = self.submit(fn)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            state = 'cancelled' if future.cancel() else 'still running, it may yet commit'
+            raise WriteQueueUnavailable(f'Write not done after {self.timeout}s ({state})') from None
+
+    def _run(self):
+        try:
+            self._loop(self.pool.dedicated_connection())
+        except BaseException as e:
+            self._stop(e)
+            raise
+
+    def _stop(self, error):
+        """Fail every queued operation and refuse new ones after the writer died"""
+        with self._lock:
+            self._fatal = error
+            pending = []
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+        for _, future, _ in pending:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(WriteQueueUnavailable(f'Write queue stopped: {error!r}'))
+
+    def _loop(self, conn):
+        while True:
+            # Whatever queued up during the previous commit joins this one; after
+            # that, wait for stragglers only until the oldest op's budget runs out
+            batch = [self._queue.get()]
+            deadline = batch[0][2] + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Callers that timed out before their op started have cancelled it
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._commit(conn, batch)
+            except BaseException as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(WriteQueueUnavailable(f'Write queue stopped: {e!r}'))
+                raise
+
+    def _commit(self, conn, batch):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                outcomes = self._apply(conn, batch)
+                break
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if not is_busy_error(e) or attempt == WRITE_RETRIES:
+                    outcomes = [(False, e)] * len(batch)
+                    break
+                self.busy_retries += 1
+                time.sleep(WRITE_BACKOFF * (2 ** attempt) * (0.5 + random.random()))
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                outcomes = [(False, e)] * len(batch)
+                break
+
+        now = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            for (_, _, enqueued), (ok, _) in zip(batch, outcomes):
+                self._wait_total += now - enqueued
+                if ok:
+                    self.committed += 1
+                else:
+                    self.failed += 1
+        for (_, future, _), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _apply(self, conn, batch):
+        """Run the batch in one BEGIN IMMEDIATE ... COMMIT; returns (ok, result or exception) per op"""
+        outcomes = []
+        conn.execute('BEGIN IMMEDIATE')
+        for fn, _, _ in batch:
+            conn.execute('SAVEPOINT op')
+            try:
+                result = fn(conn)
+            except Exception as e:
+                # Lock and I/O errors abort the whole transaction; let _commit retry or fail it
+                if isinstance(e, sqlite3.OperationalError) and is_busy_error(e):
+                    raise
+                conn.execute('ROLLBACK TO op')
+                conn.execute('RELEASE op')
+                outcomes.append((False, e))
+            else:
+                conn.execute('RELEASE op')
+                outcomes.append((True, result))
+        conn.commit()
+        return outcomes
+
+    def stats(self):
+        """Batching counters for this worker"""
+        with self._lock:
+            done = self.committed + self.failed
+            return {
+                'enabled': True,
+                'queued': self._queue.qsize(),
+                'submitted': self.submitted,
+                'batches': self.batches,
+                'committed': self.committed,
+                'failed': self.failed,
+                'avg_batch': round(done / self.batches, 2) if self.batches else 0.0,
+                'max_batch': self.max_batch_seen,
+                'avg_wait_ms': round(self._wait_total / done * 1000, 3) if done else 0.0,
+                'busy_retries': self.busy_retries,
+                'timeouts': self.timeouts,
+                'stopped': self._fatal is not None,
+            }
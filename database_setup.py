@@ -6,13 +6,74 @@ Complete database initialization and management tool
 
 import sqlite3
 import os
-import hashlib
+import sys
+import csv
+import time
+import argparse
 import json
+import random
+import tempfile
 from datetime import datetime
 
 # Database configuration
 DATABASE_PATH = 'backend/java-api/ecommerce.db'
 
+# Share schema helpers with the API server
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'java-api'))
+import search_index
+import migrations
+import sample_data
+import similar_products
+import analytics
+import product_filters
+import synthetic_data
+import query_plans
+
+# Bulk import settings
+IMPORT_BATCH_SIZE = 50000
+IMPORT_CACHE_SIZE_KB = 512 * 1024
+# Feeds at least this large drop and rebuild triggers/indexes instead of maintaining them per row
+IMPORT_DEFER_MIN_BYTES = 16 * 1024 * 1024
+
+# Added to the query plan check's copy when the database has no generated shoppers to log in as
+PLAN_CHECK_DATA = {'products': 10000, 'users': 2000, 'order_items': 30000}
+# Requests per route in the query plan check
+PLAN_CHECK_REQUESTS = 3
+
+UPSERT_PRODUCT_SQL = '''
+    INSERT INTO products (name, description, price, category_id, sku, stock_quantity, is_featured)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(sku) DO UPDATE SET
+        name = excluded.name,
+        description = excluded.description,
+        price = excluded.price,
+        category_id = excluded.category_id,
+        stock_quantity = excluded.stock_quantity,
+        is_featured = excluded.is_featured
+'''
+
+def iter_feed(path, fmt, skip=0):
+    """Yield catalog records (dicts) from a CSV or JSONL feed, skipping the first `skip`"""
+    with open(path, newline='', encoding='utf-8') as feed:
+        if fmt == 'csv':
+            reader = csv.DictReader(feed)
+            for index, record in enumerate(reader):
+                if index >= skip:
+                    yield record
+        else:
+            index = 0
+            for line in feed:
+                if not line.strip():
+                    continue
+                if index >= skip:
+                    yield json.loads(line)
+                index += 1
+
+def parse_flag(value):
+    if isinstance(value, str):
+        return 1 if value.strip().lower() in ('1', 'true', 'yes', 'y') else 0
+    return 1 if value else 0
+
 class DatabaseSetup:
     def __init__(self):
         self.conn = None
@@ -49,199 +110,16 @@ class DatabaseSetup:
         self.show_summary()
     
     def _create_tables(self):
-        """Create all required tables"""
-        tables = [
-            # Users table
-            '''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''',
-            
-            # Categories table
-            '''
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''',
-            
-            # Products table
-            '''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                price REAL NOT NULL,
-                category_id INTEGER,
-                sku TEXT UNIQUE NOT NULL,
-                stock_quantity INTEGER DEFAULT 0,
-                is_featured INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (category_id) REFERENCES categories (id)
-            )
-            ''',
-            
-            # Cart table
-            '''
-            CREATE TABLE IF NOT EXISTS cart (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                quantity INTEGER DEFAULT 1,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-            ''',
-            
-            # Orders table
-            '''
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                total_amount REAL NOT NULL,
-                status TEXT DEFAULT 'pending',
-                payment_method TEXT,
-                payment_status TEXT DEFAULT 'pending',
-                shipping_address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-            ''',
-            
-            # Order items table
-            '''
-            CREATE TABLE IF NOT EXISTS order_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL,
-                price REAL NOT NULL,
-                FOREIGN KEY (order_id) REFERENCES orders (id),
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-            ''',
-            
-            # AI Recommendations table
-            '''
-            CREATE TABLE IF NOT EXISTS ai_recommendations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                product_id INTEGER NOT NULL,
-                recommendation_type TEXT NOT NULL,
-                confidence_score REAL DEFAULT 0.0,
-                reasoning TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-            '''
-        ]
-        
-        for table_sql in tables:
-            self.cursor.execute(table_sql)
-        
-        self.conn.commit()
-        print("✅ All tables created successfully!")
+        """Create all required tables by applying pending schema migrations"""
+        applied = migrations.migrate(self.conn)
+        for description in applied:
+            print(f"🧬 Applied migration: {description}")
+        print(f"✅ All tables created successfully! (schema version {migrations.SCHEMA_VERSION})")
     
     def _insert_sample_data(self):
         """Insert comprehensive sample data"""
         print("📦 Inserting sample data...")
-        
-        # Categories
-        categories = [
-            (1, 'Electronics', 'Electronic devices and gadgets'),
-            (2, 'Clothing', 'Fashion and apparel'),
-            (3, 'Books', 'Books and educational materials'),
-            (4, 'Home & Garden', 'Home improvement supplies'),
-            (5, 'Sports', 'Sports and fitness equipment')
-        ]
-        
-        self.cursor.executemany('INSERT OR IGNORE INTO categories (id, name, description) VALUES (?, ?, ?)', categories)
-        
-        # Products
-        products = [
-            (1, 'Smartphone Pro Max', 'Latest flagship smartphone with AI-powered camera', 999.99, 1, 'PHONE-001', 50, 1),
-            (2, 'Wireless Headphones', 'Premium noise-cancelling headphones', 299.99, 1, 'AUDIO-001', 25, 1),
-            (3, 'Ultra-Slim Laptop', 'High-performance laptop for professionals', 1299.99, 1, 'LAPTOP-001', 15, 1),
-            (4, 'Smart Watch', 'Advanced smartwatch with health monitoring', 399.99, 1, 'WATCH-001', 30, 0),
-            (5, 'Organic Cotton T-Shirt', 'Comfortable organic cotton t-shirt', 29.99, 2, 'SHIRT-001', 100, 0),
-            (6, 'Designer Jeans', 'Premium denim jeans with perfect fit', 89.99, 2, 'JEANS-001', 75, 0),
-            (7, 'Running Shoes Pro', 'Professional running shoes', 149.99, 2, 'SHOES-001', 60, 1),
-            (8, 'Programming Guide', 'Complete guide to modern programming', 49.99, 3, 'BOOK-001', 40, 0),
-            (9, 'AI & ML Handbook', 'Comprehensive AI and Machine Learning guide', 59.99, 3, 'BOOK-002', 35, 0),
-            (10, 'Garden Tools Set', 'Professional gardening tools set', 129.99, 4, 'GARDEN-001', 20, 0)
-        ]
-        
-        self.cursor.executemany('''
-            INSERT OR IGNORE INTO products 
-            (id, name, description, price, category_id, sku, stock_quantity, is_featured) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', products)
-        
-        # Sample users (password: "password123")
-        password_hash = hashlib.sha256('password123'.encode()).hexdigest()
-        users = [
-            (1, 'johndoe', 'john@example.com', password_hash, 'John', 'Doe'),
-            (2, 'janesmit', 'jane@example.com', password_hash, 'Jane', 'Smith'),
-            (3, 'bobwilson', 'bob@example.com', password_hash, 'Bob', 'Wilson')
-        ]
-        
-        self.cursor.executemany('''
-            INSERT OR IGNORE INTO users 
-            (id, username, email, password_hash, first_name, last_name) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', users)
-        
-        # Sample cart items
-        cart_items = [
-            (1, 1, 2),  # John has 2 smartphones
-            (1, 2, 1),  # John has 1 headphones
-            (2, 3, 1),  # Jane has 1 laptop
-        ]
-        
-        self.cursor.executemany(
-            "INSERT OR IGNORE INTO cart (user_id, product_id, quantity) VALUES (?, ?, ?)",
-            cart_items
-        )
-        
-        # Sample orders
-        orders = [
-            (1, 1599.98, 'completed', 'credit_card', 'paid', '123 Main St, New York, NY'),
-            (2, 1299.99, 'pending', 'paypal', 'pending', '456 Oak Ave, Los Angeles, CA'),
-        ]
-        
-        for order in orders:
-            self.cursor.execute("""
-                INSERT OR IGNORE INTO orders 
-                (user_id, total_amount, status, payment_method, payment_status, shipping_address) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, order)
-        
-        # Sample AI recommendations
-        ai_recommendations = [
-            (1, 4, 'similar_product', 0.85, 'Users who bought smartphones also liked smartwatches'),
-            (1, 5, 'content_based', 0.72, 'Based on electronics preference'),
-            (2, 6, 'collaborative', 0.90, 'Users with similar profiles liked this'),
-            (3, 7, 'trending', 0.78, 'Currently trending in sports category'),
-        ]
-        
-        self.cursor.executemany("""
-            INSERT OR IGNORE INTO ai_recommendations 
-            (user_id, product_id, recommendation_type, confidence_score, reasoning) 
-            VALUES (?, ?, ?, ?, ?)
-        """, ai_recommendations)
-        
-        self.conn.commit()
+        sample_data.insert_sample_data(self.conn)
         print("✅ Sample data inserted successfully!")
     
     def show_summary(self):
@@ -260,6 +138,7 @@ class DatabaseSetup:
             except:
                 print(f"❌ {table.capitalize()}: Table not found")
         
+        print(f"🧬 Schema version: {migrations.schema_version(self.conn)} (latest {migrations.SCHEMA_VERSION})")
         print(f"\n📁 Database location: {os.path.abspath(DATABASE_PATH)}")
         if os.path.exists(DATABASE_PATH):
             size = os.path.getsize(DATABASE_PATH)
@@ -294,11 +173,315 @@ class DatabaseSetup:
             except Exception as e:
                 print(f"❌ Error viewing {table}: {e}")
     
+    def rebuild_search_index(self):
+        """Rebuild the product full-text search index from scratch"""
+        print("🔎 Rebuilding product search index...")
+        search_index.ensure_search_index(self.conn)
+        count = search_index.rebuild_search_index(self.conn)
+        self.conn.commit()
+        print(f"✅ Search index rebuilt: {count} products indexed")
+    
+    def backfill_analytics(self):
+        """Recompute the analytics rollups from users, orders and carts"""
+        print("📊 Backfilling analytics rollups...")
+        started = time.perf_counter()
+        analytics.rebuild_rollups(self.conn)
+        self.conn.commit()
+        users, orders = self.cursor.execute(
+            "SELECT total_users, total_orders FROM analytics_totals WHERE id = 1"
+        ).fetchone()
+        print(f"✅ Analytics rebuilt in {time.perf_counter() - started:.1f}s: {users} users, {orders} orders")
+    
+    def apply_indexes(self):
+        """Create any missing declared index, then refresh the planner statistics"""
+        print("🗂️  Applying declared indexes...")
+        for description in migrations.migrate(self.conn):
+            print(f"🧬 Applied migration: {description}")
+        created = migrations.create_indexes(self.conn)
+        self.conn.commit()
+        for name in created:
+            print(f"➕ Created {name}: {migrations.index_sql(name)}")
+        
+        undeclared = self.cursor.execute('''
+            SELECT name, tbl_name FROM sqlite_master
+            WHERE type = 'index' AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ''').fetchall()
+        for name, table in undeclared:
+            if name not in migrations.INDEXES:
+                print(f"⚠️  Index {name} on {table} is not declared in schema_indexes.INDEXES")
+        
+        self._analyze()
+        print(f"✅ {len(migrations.INDEXES)} declared indexes in place ({len(created)} created), statistics updated")
+    
+    def _analyze(self):
+        """Refresh sqlite_stat1 so the planner sees real table and index sizes"""
+        started = time.perf_counter()
+        self.cursor.execute("ANALYZE")
+        self.cursor.execute("PRAGMA optimize")
+        self.conn.commit()
+        print(f"📐 ANALYZE and PRAGMA optimize took {time.perf_counter() - started:.1f}s")
+    
+    def check_query_plans(self, min_rows=query_plans.PLAN_CHECK_MIN_ROWS):
+        """EXPLAIN every statement the API issues; True when none scans a large table.
+
+        Each route of benchmarks/bench_endpoints.py runs a few times through
+        Flask's test client against a copy of the database, with a trace
+        callback on the API's connections collecting the statements. A copy
+        without generated shoppers gets PLAN_CHECK_DATA appended first, so
+        every route has rows to work on and the main tables are large
+        enough to matter.
+        """
+        print("🔬 Checking query plans of the API's statements...")
+        with tempfile.TemporaryDirectory(prefix='anufa-plans-') as directory:
+            database = os.path.join(directory, 'ecommerce.db')
+            copy = sqlite3.connect(database)
+            self.conn.backup(copy)
+            migrations.migrate(copy)
+            if not copy.execute("SELECT 1 FROM users WHERE username LIKE 'shopper%' LIMIT 1").fetchone():
+                print(f"🧪 Adding synthetic data to the copy: {PLAN_CHECK_DATA}")
+                synthetic_data.generate(copy, **PLAN_CHECK_DATA)
+                copy.execute("ANALYZE")
+                copy.commit()
+            copy.close()
+            
+            statements = self._trace_api(directory)
+            conn = sqlite3.connect(database)
+            scans = query_plans.full_scans(conn, statements.values(), min_rows)
+            conn.close()
+        
+        for sql, detail in scans:
+            print(f"❌ {detail}\n   {' '.join(sql.split())[:300]}")
+        if scans:
+            print(f"❌ {len(scans)} of {len(statements)} statements scan a table of {min_rows:,}+ rows")
+            return False
+        print(f"✅ {len(statements)} statements checked, no full scans of tables with {min_rows:,}+ rows")
+        return True
+    
+    def _trace_api(self, directory):
+        """Drive every benchmark route against directory/ecommerce.db; returns the traced statements by shape.
+
+        The app is imported in-process, so the environment, working directory,
+        sys.path and module cache are put back afterwards for later menu actions.
+        """
+        previous_path = list(sys.path)
+        sys.path.insert(0, os.path.join(os.path.dirname(migrations.__file__), 'benchmarks'))
+        previous_snapshot = os.environ.get('CATALOG_SNAPSHOT')
+        previous = os.getcwd()
+        try:
+            import bench_endpoints
+            
+            fixtures = bench_endpoints.load_fixtures(os.path.join(directory, 'ecommerce.db'))
+            # Catalog reads must go through the (traced) pool, not an in-memory snapshot
+            os.environ['CATALOG_SNAPSHOT'] = '0'
+            # app_sqlite opens ./ecommerce.db on import
+            os.chdir(directory)
+            import app_sqlite
+            try:
+                log = query_plans.StatementLog()
+                app_sqlite.pool.trace = log
+                client = bench_endpoints.TestClient(app_sqlite.app)
+                status, body = client.call('POST', '/auth/login', {'username': fixtures['usernames'][0],
+                                                                   'password': synthetic_data.PASSWORD})
+                if status != 200:
+                    raise RuntimeError(f"login as {fixtures['usernames'][0]} failed with {status}")
+                session = {'index': 0, 'token': json.loads(body)['token']}
+                rng = random.Random(42)
+                for name, prepare in bench_endpoints.scenarios(fixtures, run_tag=f'plans{os.getpid()}').items():
+                    for _ in range(PLAN_CHECK_REQUESTS):
+                        method, path, body, token, expected = prepare(client, rng, session)
+                        status = client.call(method, path, body, token)[0]
+                        if status not in expected:
+                            print(f"⚠️  {name}: {method} {path} returned {status}")
+            finally:
+                app_sqlite.pool.close()
+        finally:
+            os.chdir(previous)
+            if previous_snapshot is None:
+                os.environ.pop('CATALOG_SNAPSHOT', None)
+            else:
+                os.environ['CATALOG_SNAPSHOT'] = previous_snapshot
+            sys.path[:] = previous_path
+            # A later check must import the app afresh against its own database
+            sys.modules.pop('app_sqlite', None)
+        return log.statements
+    
+    def import_catalog(self, path, fmt=None, batch_size=IMPORT_BATCH_SIZE, checkpoint_path=None, restart=False,
+                       defer=None):
+        """Stream a CSV/JSONL product feed into the catalog, upserting by SKU.
+
+        Records are written in large executemany() batches, one transaction per
+        batch. For large feeds (or defer=True) product triggers and secondary
+        indexes are dropped for the load and restored afterwards, with the
+        search index and catalog versions rebuilt once. Progress is
+        checkpointed after every committed batch so an interrupted import
+        resumes where it stopped.
+        """
+        fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        checkpoint_path = checkpoint_path or path + '.checkpoint.json'
+        stat = os.stat(path)
+        if defer is None:
+            defer = stat.st_size >= IMPORT_DEFER_MIN_BYTES
+        feed_id = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        
+        migrations.migrate(self.conn)
+        
+        checkpoint = None
+        if not restart and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('feed') != feed_id:
+                print("⚠️  Checkpoint belongs to a different or modified feed - starting over")
+                checkpoint = None
+        
+        if checkpoint:
+            # Keep the DDL saved by the interrupted run; its objects may still be dropped
+            deferred = checkpoint['deferred']
+            print(f"⏩ Resuming after {checkpoint['records']:,} records")
+        else:
+            deferred = []
+            if defer:
+                deferred = self.cursor.execute('''
+                    SELECT type, name, sql FROM sqlite_master
+                    WHERE tbl_name = 'products' AND type IN ('trigger', 'index') AND sql IS NOT NULL
+                ''').fetchall()
+            checkpoint = {'feed': feed_id, 'records': 0, 'imported': 0, 'rejected': 0, 'deferred': deferred}
+        
+        print(f"📥 Importing {fmt.upper()} feed {path} (batch size {batch_size:,})")
+        self.cursor.execute('PRAGMA journal_mode=WAL')
+        self.cursor.execute('PRAGMA synchronous=NORMAL')
+        self.cursor.execute(f'PRAGMA cache_size=-{IMPORT_CACHE_SIZE_KB}')
+        self.cursor.execute('PRAGMA temp_store=MEMORY')
+        
+        # Defer trigger (FTS, change counters) and index maintenance until the end
+        for object_type, name, _ in deferred:
+            self.cursor.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+        self.conn.commit()
+        
+        categories = {name.lower(): category_id for category_id, name in
+                      self.cursor.execute('SELECT id, name FROM categories')}
+        started = time.perf_counter()
+        loaded = 0
+        completed = False
+        try:
+            batch = []
+            for record in iter_feed(path, fmt, skip=checkpoint['records']):
+                try:
+                    batch.append(self._product_params(record, categories))
+                except (KeyError, TypeError, ValueError) as e:
+                    checkpoint['rejected'] += 1
+                    if checkpoint['rejected'] <= 10:
+                        print(f"⚠️  Skipping record {checkpoint['records'] + len(batch) + 1}: {e!r}")
+                    batch.append(None)
+                
+                if len(batch) >= batch_size:
+                    loaded += self._write_import_batch(batch, checkpoint, checkpoint_path)
+                    batch = []
+                    elapsed = time.perf_counter() - started
+                    print(f"📦 {checkpoint['records']:,} records • {loaded / elapsed:,.0f} rows/s")
+            
+            if batch:
+                loaded += self._write_import_batch(batch, checkpoint, checkpoint_path)
+            completed = True
+        finally:
+            self.conn.rollback()
+            rebuild_started = time.perf_counter()
+            if deferred:
+                print("🔧 Rebuilding indexes, triggers and search index...")
+                for _, _, sql in deferred:
+                    self.cursor.execute(sql.replace('CREATE TRIGGER ', 'CREATE TRIGGER IF NOT EXISTS ', 1)
+                                           .replace('CREATE INDEX ', 'CREATE INDEX IF NOT EXISTS ', 1)
+                                           .replace('CREATE UNIQUE INDEX ', 'CREATE UNIQUE INDEX IF NOT EXISTS ', 1))
+                self._refresh_derived_data()
+                self.conn.commit()
+                if completed:
+                    self._analyze()
+            rebuild_elapsed = time.perf_counter() - rebuild_started
+            
+            elapsed = time.perf_counter() - started
+            rate = loaded / elapsed if elapsed else 0
+            print(f"✅ Loaded {loaded:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s, "
+                  f"index rebuild {rebuild_elapsed:.1f}s); {checkpoint['rejected']:,} records rejected")
+            if completed and os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+            elif not completed:
+                print(f"💾 Progress saved to {checkpoint_path}; rerun the same command to resume")
+        return loaded
+    
+    def generate_data(self, products, users, order_items, categories=50, carts=None, seed=42):
+        """Append a deterministic synthetic data set sized for performance testing"""
+        print(f"🧪 Generating {products:,} products, {users:,} users and {order_items:,} order items (seed {seed})...")
+        started = time.perf_counter()
+        reported = {}
+        
+        def progress(table, rows):
+            # One line per table every ~10% or so, not per batch
+            if rows - reported.get(table, 0) >= max(synthetic_data.BATCH_SIZE, order_items // 10, products // 10):
+                reported[table] = rows
+                print(f"📦 {table}: {rows:,} rows • {time.perf_counter() - started:.0f}s")
+        
+        counts = synthetic_data.generate(self.conn, products=products, users=users, order_items=order_items,
+                                         categories=categories, carts=carts, seed=seed, progress=progress)
+        print(f"✅ Generated in {time.perf_counter() - started:.1f}s: " +
+              ", ".join(f"{rows:,} {table}" for table, rows in counts.items()))
+        print(f"🔑 Generated users log in as shopper<id> with password '{synthetic_data.PASSWORD}'")
+        self._analyze()
+    
+    def _product_params(self, record, categories):
+        """Validate one feed record and map it to UPSERT_PRODUCT_SQL parameters"""
+        sku = str(record['sku']).strip()
+        name = str(record['name']).strip()
+        if not sku or not name:
+            raise ValueError('name and sku are required')
+        
+        category_id = record.get('category_id')
+        if category_id in (None, ''):
+            category_name = (record.get('category') or '').strip()
+            if category_name:
+                category_id = categories.get(category_name.lower())
+                if category_id is None:
+                    self.cursor.execute('INSERT INTO categories (name) VALUES (?)', (category_name,))
+                    category_id = categories[category_name.lower()] = self.cursor.lastrowid
+            else:
+                category_id = None
+        else:
+            category_id = int(category_id)
+        
+        return (
+            name,
+            record.get('description') or None,
+            float(record['price']),
+            category_id,
+            sku,
+            int(record.get('stock_quantity') or 0),
+            parse_flag(record.get('is_featured')),
+        )
+    
+    def _write_import_batch(self, batch, checkpoint, checkpoint_path):
+        """Upsert one batch in a single transaction, then record the checkpoint"""
+        rows = [params for params in batch if params is not None]
+        self.cursor.executemany(UPSERT_PRODUCT_SQL, rows)
+        self.conn.commit()
+        
+        checkpoint['records'] += len(batch)
+        checkpoint['imported'] += len(rows)
+        temp_path = checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, checkpoint_path)
+        return len(rows)
+    
+    def _refresh_derived_data(self):
+        """Rebuild data normally maintained by product triggers after a bulk load"""
+        search_index.rebuild_search_index(self.conn)
+        product_filters.rebuild_product_facets(self.conn)
+        self.cursor.execute("UPDATE catalog_versions SET version = version + 1")
+        similar_products.mark_bulk_change(self.conn)
+    
     def reset_database(self):
         """Reset database by dropping all tables and recreating"""
         print("🔄 Resetting database...")
         
-        tables = ['ai_recommendations', 'order_items', 'orders', 'cart', 'products', 'categories', 'users']
+        tables = ['ai_recommendations', 'order_items', 'orders', 'cart', 'cart_changes', 'products_fts', 'catalog_versions', 'product_changes', 'product_facets', *analytics.ROLLUP_TABLES, 'products', 'categories', 'users']
         
         for table in tables:
             try:
@@ -306,13 +489,65 @@ class DatabaseSetup:
             except:
                 pass
         
+        self.cursor.execute("PRAGMA user_version = 0")
         self.conn.commit()
         print("✅ Database reset complete!")
         
         # Reinitialize
         self.init_database()
 
+def run_command(db, args):
+    """Run a single non-interactive management command"""
+    if args.command == 'init':
+        db.init_database()
+    elif args.command == 'summary':
+        db.show_summary()
+    elif args.command == 'rebuild-search':
+        db.rebuild_search_index()
+    elif args.command == 'backfill-analytics':
+        db.backfill_analytics()
+    elif args.command == 'import':
+        db.import_catalog(args.file, fmt=args.format, batch_size=args.batch_size,
+                          checkpoint_path=args.checkpoint, restart=args.restart, defer=args.defer_indexes)
+    elif args.command == 'generate':
+        db.generate_data(args.products, args.users, args.order_items, categories=args.categories,
+                         carts=args.carts, seed=args.seed)
+    elif args.command == 'indexes':
+        db.apply_indexes()
+    elif args.command == 'check-plans':
+        return db.check_query_plans(min_rows=args.min_rows)
+    return True
+
 def main():
+    parser = argparse.ArgumentParser(description='ANUFA AI E-commerce database management')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('init', help='Create tables and insert sample data')
+    subparsers.add_parser('summary', help='Show record counts and database info')
+    subparsers.add_parser('rebuild-search', help='Rebuild the product full-text search index')
+    subparsers.add_parser('backfill-analytics', help='Recompute the user-behavior analytics rollups')
+    import_parser = subparsers.add_parser('import', help='Bulk import/refresh products from a CSV or JSONL feed')
+    import_parser.add_argument('file', help='Feed with name, description, price, sku, stock_quantity, '
+                                            'is_featured and category_id or category columns')
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'], help='Feed format (default: from extension)')
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per transaction')
+    import_parser.add_argument('--checkpoint', help='Checkpoint file (default: <file>.checkpoint.json)')
+    import_parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+    import_parser.add_argument('--defer-indexes', action=argparse.BooleanOptionalAction, default=None,
+                               help='Drop triggers/indexes during the load (default: only for feeds over 16 MB)')
+    generate_parser = subparsers.add_parser('generate', help='Append deterministic synthetic data for load testing')
+    generate_parser.add_argument('--products', type=int, default=10000)
+    generate_parser.add_argument('--users', type=int, default=1000)
+    generate_parser.add_argument('--order-items', type=int, default=30000)
+    generate_parser.add_argument('--categories', type=int, default=50)
+    generate_parser.add_argument('--carts', type=int, help='Users with an open cart (default: users / 10)')
+    generate_parser.add_argument('--seed', type=int, default=42, help='Same seed and sizes give the same rows')
+    subparsers.add_parser('indexes', help='Create missing declared indexes, then ANALYZE and PRAGMA optimize')
+    plans_parser = subparsers.add_parser('check-plans', help='EXPLAIN every API statement; exit 1 on full scans '
+                                                             'of large tables')
+    plans_parser.add_argument('--min-rows', type=int, default=query_plans.PLAN_CHECK_MIN_ROWS,
+                              help='Scans of tables smaller than this are allowed')
+    args = parser.parse_args()
+    
     print("🚀 ANUFA AI E-commerce Platform - Database Setup")
     print("="*60)
     
@@ -321,6 +556,13 @@ def main():
     if not db.connect():
         return
     
+    if args.command:
+        ok = run_command(db, args)
+        db.disconnect()
+        if not ok:
+            sys.exit(1)
+        return
+    
     while True:
         print("\n" + "="*40)
         print("DATABASE MANAGEMENT OPTIONS")
@@ -330,9 +572,13 @@ def main():
         print("3. 👀 View All Data")
         print("4. 🔍 View Specific Table")
         print("5. 🔄 Reset Database")
+        print("6. 🔎 Rebuild Search Index")
+        print("7. 📈 Backfill Analytics Rollups")
+        print("8. 🗂️  Apply Indexes & Update Statistics")
+        print("9. 🔬 Check API Query Plans")
         print("0. ❌ Exit")
         
-        choice = input("\nSelect option (0-5): ").strip()
+        choice = input("\nSelect option (0-9): ").strip()
         
         if choice == '0':
             break
@@ -352,6 +598,14 @@ def main():
                 db.reset_database()
             else:
                 print("❌ Reset cancelled")
+        elif choice == '6':
+            db.rebuild_search_index()
+        elif choice == '7':
+            db.backfill_analytics()
+        elif choice == '8':
+            db.apply_indexes()
+        elif choice == '9':
+            db.check_query_plans()
         else:
             print("❌ Invalid option!")
     
@@ -275,17 +275,26 @@ export default function Home() {
                 <div className="metric-label">Active Users</div>
               </div>
               <div className="analytics-card">
-                <div className="metric-value">{formatCurrency(analytics.user_behavior.avg_order_value)}</div>
-                <div className="metric-label">Avg. Order Value</div>
+                <div className="metric-value">{analytics.ai_insights.conversion_rate}</div>
+                <div className="metric-label">Users Who Ordered</div>
               </div>
               <div className="analytics-card">
-                <div className="metric-value">{analytics.ai_insights.recommendation_accuracy}</div>
-                <div className="metric-label">AI Accuracy</div>
-              </div>
-              <div className="analytics-card">
-                <div className="metric-value">{analytics.ai_insights.conversion_rate_increase}</div>
-                <div className="metric-label">Conversion Boost</div>
+                <div className="metric-value">{analytics.ai_insights.recommended_items_share}</div>
+                <div className="metric-label">Items Sold from AI Picks</div>
               </div>
+              {/* Revenue figures are only returned to signed-in users */}
+              {analytics.ai_insights.recommended_revenue_share && (
+                <>
+                  <div className="analytics-card">
+                    <div className="metric-value">{formatCurrency(analytics.user_behavior.avg_order_value)}</div>
+                    <div className="metric-label">Avg. Order Value</div>
+                  </div>
+                  <div className="analytics-card">
+                    <div className="metric-value">{analytics.ai_insights.recommended_revenue_share}</div>
+                    <div className="metric-label">Revenue from AI Picks</div>
+                  </div>
+                </>
+              )}
             </div>
           </div>
         </motion.section>